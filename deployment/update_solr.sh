@@ -1,6 +1,9 @@
 #!/bin/bash
 # Usage: ./update_solr.sh /path/to/project solr_container_name
+# Copies the configuration into the configset of a running solr container (until it is
+# restarted, rebuild the solr image to keep it). Apply it to the live core afterwards:
+#   python manage.py solr_schema --apply
 
 for f in synonyms.txt schema.xml solrconfig.xml; do
-  docker cp $1/configsets/ris/conf/$f $2:/var/solr/data/ris/conf/$f
+  docker cp $1/configsets/ris/conf/$f $2:/var/solr/data/configsets/ris/conf/$f
 done
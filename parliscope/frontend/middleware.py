@@ -0,0 +1,30 @@
+from collections.abc import Callable
+
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse
+
+from . import tracing
+
+
+class TracingMiddleware:
+    """Traces each request and reports the time spent per component
+    (Solr, result parsing, template rendering) in a Server-Timing header"""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with tracing.start_trace(request.headers.get("traceparent")) as trace:
+            with tracing.span(
+                "http.request",
+                kind=tracing.SPAN_KIND_SERVER,
+                **{"http.request.method": request.method, "url.path": request.path},
+            ) as span:
+                response = self.get_response(request)
+                if span is not None:
+                    span.attributes["http.response.status_code"] = response.status_code
+
+        if getattr(settings, "TRACING_SERVER_TIMING", True):
+            response["Server-Timing"] = trace.server_timing()
+        tracing.finish_trace(trace, f"{request.method} {request.get_full_path()}")
+        return response
@@ -1,4 +1,6 @@
-from os import makedirs
+from collections import Counter
+from collections.abc import Iterable
+from os import makedirs, replace, scandir
 from os.path import basename, dirname, exists, join
 from typing import cast
 
@@ -8,6 +10,8 @@ from django.conf import settings
 class CacheRepository:
     def __init__(self) -> None:
         self.base_path = settings.CACHE_DIR
+        # (postfix, hit/miss) -> number of lookups
+        self.stats: Counter[tuple[str, str]] = Counter()
 
     def _uri_to_cache_path(self, uri: str, postfix: str) -> str:
         name = basename(uri)
@@ -22,18 +26,39 @@ class CacheRepository:
     def exists_in_cache(self, uri: str, postfix: str) -> bool:
         return self.get_cache_file_path(uri, postfix) is not None
 
-    def insert_in_cache(self, uri: str, postfix: str, content: str | bytes, mode: str = "w") -> str:
+    def lookup_cache_file_path(self, uri: str, postfix: str) -> str | None:
+        """Same as get_cache_file_path, but counts the lookup as cache hit or miss"""
+        path = self.get_cache_file_path(uri, postfix)
+        self.stats[(postfix, "hit" if path else "miss")] += 1
+        return path
+
+    def insert_in_cache(
+        self, uri: str, postfix: str, content: str | bytes, mode: str = "w"
+    ) -> str:
         cache_path = self._uri_to_cache_path(uri, postfix)
         makedirs(dirname(cache_path), exist_ok=True)
         with open(cache_path, mode) as f:
             f.write(content)
         return cache_path
 
-    def get_cache_content(self, uri: str, postfix: str, mode: str = "r") -> str | bytes | None:
-        if not self.exists_in_cache(uri, postfix):
-            return None
+    def insert_chunks_in_cache(
+        self, uri: str, postfix: str, chunks: Iterable[bytes]
+    ) -> str:
+        """Writes a streamed binary content to the cache. The file is moved into
+        place once complete, so an interrupted stream leaves no partial entry."""
+        cache_path = self._uri_to_cache_path(uri, postfix)
+        makedirs(dirname(cache_path), exist_ok=True)
+        partial_path = f"{cache_path}.part"
+        with open(partial_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        replace(partial_path, cache_path)
+        return cache_path
 
-        path = self.get_cache_file_path(uri, postfix)
+    def get_cache_content(
+        self, uri: str, postfix: str, mode: str = "r"
+    ) -> str | bytes | None:
+        path = self.lookup_cache_file_path(uri, postfix)
         if not path:
             return None
         with open(path, mode) as f:
@@ -41,3 +66,16 @@ class CacheRepository:
                 return cast(bytes, f.read())
             else:
                 return cast(str, f.read())
+
+    def usage(self) -> tuple[int, int]:
+        """Number of files and bytes in the cache"""
+        files = size = 0
+        try:
+            with scandir(self.base_path) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        files += 1
+                        size += entry.stat(follow_symlinks=False).st_size
+        except FileNotFoundError:
+            pass
+        return files, size
@@ -1,5 +1,8 @@
 import base64
 import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, cast
 
 import requests
@@ -9,6 +12,11 @@ from tika import parser
 
 from frontend.processing.cache_repository import CacheRepository
 from frontend.processing.file_repository import FileRepository
+from frontend.processing.multipart import CHUNK_SIZE, MultipartFile
+from frontend.processing.pdf_inspection import split_pages
+from frontend.processing.processing import Paragraph
+
+logger = logging.getLogger(__name__)
 
 cache = CacheRepository()
 files = FileRepository()
@@ -21,6 +29,25 @@ class ExternalServiceUnsuccessfulException(Exception):
     pass
 
 
+TIKA_OCR_HEADERS = {
+    "X-Tika-PDFOcrStrategy": "OCR_ONLY",
+    "X-Tika-OCRLanguage": "deu",
+    "X-Tika-OCRTimeout": str(30 * 60),
+}
+
+
+def post_file(
+    url: str, file_path: str, field: str = "file", **kwargs: Any
+) -> requests.Response:
+    """Posts a file as multipart/form-data, streamed from disk instead of
+    being read into memory. The file is closed once the request is done."""
+    with files.stream(file_path) as f:
+        body = MultipartFile(field, f, os.path.basename(file_path))
+        return requests.post(
+            url, data=body, headers={"Content-Type": body.content_type}, **kwargs
+        )
+
+
 def get_preview_image_for_doc(file_path: str, skip_cache: bool = False) -> str:
     """Perform a request against the external preview image service
     to generate a preview thumbnail for the document"""
@@ -30,13 +57,11 @@ def get_preview_image_for_doc(file_path: str, skip_cache: bool = False) -> str:
         if cached:
             return cast(str, cached)
 
-    binary = files.get_file_content(file_path)
-
     resolution: str | None = getattr(settings, "PREVIEW_RESOLUTION", None)
     if not resolution:
         raise ValueError("PREVIEW_RESOLUTION not set in settings")
     url = f"{settings.PREVIEW_HOST}/preview/{resolution}"
-    response = requests.post(url, files={"file": binary})
+    response = post_file(url, file_path)
 
     if response.status_code == 200:
         image_base64 = base64.b64encode(response.content).decode("utf-8")
@@ -61,11 +86,7 @@ def analyze_document_tika(
             "X-Tika-PDFSuppressDuplicateOverlappingText": "true",
         }
     else:
-        headers = {
-            "X-Tika-PDFOcrStrategy": "OCR_ONLY",
-            "X-Tika-OCRLanguage": "deu",
-            "X-Tika-OCRTimeout": str(30 * 60),
-        }
+        headers = dict(TIKA_OCR_HEADERS)
 
     if not skip_cache:
         cached = cache.get_cache_content(file_path, f"tika{'.ocr' if ocr else ''}")
@@ -89,26 +110,109 @@ def analyze_document_tika(
         )
 
 
-def analyze_document_pdfact(file_path: str, skip_cache: bool = False) -> list[str]:
-    """Analyze document with pdfact and return the whole text"""
+def cached_ocr_tika(file_path: str) -> dict[str, Any] | None:
+    """Cached OCR of a whole document by analyze_document_tika, which was used
+    for PDFs without a text layer before their pages were OCRed separately"""
+    cached = cache.get_cache_content(file_path, "tika.ocr")
+    return cast(dict[str, Any], json.loads(cached)) if cached else None
+
+
+def _ocr_page(file_path: str, number: int, page: bytes) -> str:
+    """OCR of a single page, sent to tika as a PDF of its own"""
+    parsed = parser.from_buffer(
+        page,
+        serverEndpoint=settings.TIKA_HOST,
+        headers=dict(TIKA_OCR_HEADERS),
+        requestOptions={"timeout": 30 * 60},
+    )
+    if not parsed or parsed.get("status") != 200:
+        raise ExternalServiceUnsuccessfulException(
+            f"Failed to OCR page {number} with tika: {file_path}"
+        )
+    return (parsed["content"] or "").strip()
+
+
+def ocr_pages_tika(
+    file_path: str, pages: list[int], skip_cache: bool = False
+) -> tuple[list[Paragraph], list[int]]:
+    """OCR of the given pages of a PDF with tika/tesseract. The PDF is split
+    into single pages once, which are OCRed in parallel (settings.OCR_WORKERS),
+    one page per request, so that the OCR time depends on the number of
+    scanned pages only.
 
-    def is_valid_response(response: list[str]) -> bool:
+    Returns a paragraph per page with text and the numbers of the pages
+    which failed."""
+    texts: dict[str, str] = {}
+    if not skip_cache:
+        cached = cache.get_cache_content(file_path, "tika.ocr.pages")
+        if cached:
+            texts = json.loads(cached)
+    missing = [number for number in pages if str(number) not in texts]
+
+    def ocr(number: int, page: bytes) -> str | None:
+        try:
+            return _ocr_page(file_path, number, page)
+        except Exception as e:
+            logger.warning(f"Failed to OCR page {number} of {file_path}: {e}")
+            return None
+
+    failed = []
+    if missing:
+        try:
+            page_pdfs = split_pages(file_path, missing)
+        except Exception as e:
+            logger.warning(f"Failed to split the pages of {file_path}: {e}")
+            page_pdfs = {}
+        workers = min(getattr(settings, "OCR_WORKERS", 4), len(missing))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(ocr, page_pdfs, page_pdfs.values())
+            for number, text in zip(page_pdfs, results, strict=True):
+                if text is not None:
+                    texts[str(number)] = text
+        failed = [number for number in missing if str(number) not in texts]
+        cache.insert_in_cache(file_path, "tika.ocr.pages", json.dumps(texts, indent=4))
+
+    paragraphs = [
+        Paragraph(texts[str(number)], number)
+        for number in pages
+        if texts.get(str(number))
+    ]
+    return paragraphs, failed
+
+
+def _cached_paragraph(cached: str | dict[str, Any]) -> Paragraph:
+    # paragraphs were cached as plain strings before page numbers were kept
+    if isinstance(cached, str):
+        return Paragraph(cached)
+    return Paragraph(cached["text"], cached.get("page"))
+
+
+def _paragraph_page(paragraph: dict[str, Any]) -> int | None:
+    # the page of a paragraph spanning pages is the page it starts on
+    positions = paragraph.get("positions") or [{}]
+    page = positions[0].get("page")
+    return int(page) if page is not None else None
+
+
+def analyze_document_pdfact(
+    file_path: str, skip_cache: bool = False
+) -> list[Paragraph]:
+    """Analyze document with pdfact and return the paragraphs of the whole
+    text with their page numbers"""
+
+    def is_valid_response(response: list[Paragraph]) -> bool:
         return bool(response and len(response) > 0)
 
     if not skip_cache:
         cached = cache.get_cache_content(file_path, "pdfact")
         if cached:
-            content = json.loads(cached)
+            content = [_cached_paragraph(p) for p in json.loads(cached)]
             if is_valid_response(content):
-                return cast(list[str], content)
+                return content
             else:
                 raise ExternalServiceUnsuccessfulException("pdfact returned no text")
 
-    binary = files.get_file_content(file_path)
-
-    response = requests.post(
-        url=f"{settings.PDFACT_HOST}/analyze", files={"file": binary}
-    )
+    response = post_file(f"{settings.PDFACT_HOST}/analyze", file_path)
     if response.status_code != 200:  # something went wrong
         raise ExternalServiceUnsuccessfulException(
             f"Failed to extract text using pdfact: {file_path}"
@@ -118,9 +222,14 @@ def analyze_document_pdfact(file_path: str, skip_cache: bool = False) -> list[st
     json_response = response.json()
     snippets = []
     for paragraph in json_response["paragraphs"]:
-        snippets.append(paragraph["paragraph"]["text"])
+        paragraph = paragraph["paragraph"]
+        snippets.append(Paragraph(paragraph["text"], _paragraph_page(paragraph)))
 
-    cache.insert_in_cache(file_path, "pdfact", json.dumps(snippets, indent=4))
+    cache.insert_in_cache(
+        file_path,
+        "pdfact",
+        json.dumps([snippet._asdict() for snippet in snippets], indent=4),
+    )
     if is_valid_response(snippets):
         return snippets
     else:
@@ -128,15 +237,22 @@ def analyze_document_pdfact(file_path: str, skip_cache: bool = False) -> list[st
 
 
 def convert_to_pdf(file_path: str, skip_cache: bool = False) -> str:
-    if not skip_cache and cache.exists_in_cache(file_path, "converted.pdf"):
-        return cast(str, cache.get_cache_file_path(file_path, "converted.pdf"))
-
-    form_data = {"files": files.open_file(file_path, "rb")}
-    response = requests.post(
-        url=f"{settings.GOTENBERG_HOST}/forms/libreoffice/convert", files=form_data
-    )
-    if response.status_code != 200:  # something went wrong
-        raise ExternalServiceUnsuccessfulException("Failed to convert document to pdf.")
+    if not skip_cache:
+        cached = cache.lookup_cache_file_path(file_path, "converted.pdf")
+        if cached:
+            return cached
 
-    content = response.content
-    return cache.insert_in_cache(file_path, "converted.pdf", content, mode="wb")
+    # the file name tells gotenberg the format of the document
+    with post_file(
+        f"{settings.GOTENBERG_HOST}/forms/libreoffice/convert",
+        file_path,
+        field="files",
+        stream=True,
+    ) as response:
+        if response.status_code != 200:  # something went wrong
+            raise ExternalServiceUnsuccessfulException(
+                "Failed to convert document to pdf."
+            )
+        return cache.insert_chunks_in_cache(
+            file_path, "converted.pdf", response.iter_content(CHUNK_SIZE)
+        )
@@ -1,3 +1,5 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
 from os.path import join
 from typing import IO, Any, cast
 
@@ -12,10 +14,19 @@ class FileRepository:
         return join(self.base_path, uri)
 
     def open_file(self, uri: str, mode: str = "rb") -> IO[Any]:
+        """Opens a file, which the caller has to close. Prefer `stream`."""
         return open(self.get_file_path(uri), mode)
 
+    @contextmanager
+    def stream(self, uri: str) -> Iterator[IO[bytes]]:
+        """Opens a file for reading it in chunks and closes it afterwards"""
+        with open(self.get_file_path(uri), "rb") as f:
+            yield f
+
     def get_file_content(self, uri: str, mode: str = "rb") -> str | bytes:
-        if "b" in mode:
-            return cast(bytes, self.open_file(uri, mode).read())
-        else:
-            return cast(str, self.open_file(uri, mode).read())
+        """Reads a whole file into memory. Prefer `stream` for large files."""
+        with self.open_file(uri, mode) as f:
+            if "b" in mode:
+                return cast(bytes, f.read())
+            else:
+                return cast(str, f.read())
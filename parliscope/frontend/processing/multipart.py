@@ -0,0 +1,61 @@
+import os
+import uuid
+from collections.abc import Iterator
+from io import BytesIO
+from typing import IO
+
+CHUNK_SIZE = 64 * 1024
+
+
+class MultipartFile:
+    """A multipart/form-data request body with a single file field, which
+    is read from the open file in chunks while it is sent.
+
+    requests builds the body of `files=` uploads in memory. This body is
+    passed as `data=` instead: it has a length, so it is sent with a
+    Content-Length header (not chunked), and is read with `read(size)`.
+    The file has to stay open until the request is sent.
+    """
+
+    def __init__(
+        self,
+        field: str,
+        file: IO[bytes],
+        filename: str | None = None,
+        content_type: str = "application/octet-stream",
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        filename = filename or os.path.basename(getattr(file, "name", field))
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+        size = os.fstat(file.fileno()).st_size - file.tell()
+        self.len = len(head) + size + len(tail)
+        self.parts: list[IO[bytes]] = [BytesIO(head), file, BytesIO(tail)]
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def read(self, size: int = -1) -> bytes:
+        """Reads up to `size` bytes of the body (all remaining if negative)"""
+        chunks = []
+        while self.parts and (size < 0 or size > 0):
+            chunk = self.parts[0].read(size)
+            if not chunk:
+                self.parts.pop(0)
+                continue
+            chunks.append(chunk)
+            if size > 0:
+                size -= len(chunk)
+        return b"".join(chunks)
+
+    def __len__(self) -> int:
+        return self.len
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(CHUNK_SIZE):
+            yield chunk
@@ -0,0 +1,238 @@
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from io import BytesIO
+from typing import Any
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DictionaryObject
+
+from frontend.processing.file_repository import FileRepository
+
+logger = logging.getLogger(__name__)
+
+# pages with fewer characters in their text layer have no usable text
+MIN_TEXT_CHARS = 20
+# pages mostly covered by images with little text are scans, e.g. with a
+# page number or stamp as text
+SCAN_IMAGE_COVERAGE = 0.8
+SCAN_MAX_TEXT_CHARS = 200
+# nesting of form XObjects followed for text and images
+MAX_FORM_DEPTH = 3
+
+Matrix = tuple[float, float, float, float, float, float]
+IDENTITY: Matrix = (1, 0, 0, 1, 0, 0)
+
+# tokens of a content stream; strings and inline images are matched as a whole,
+# so that their content isn't mistaken for operators
+TOKENS = re.compile(
+    rb"""
+    (?P<string>\((?:[^()\\]|\\.|\((?:[^()\\]|\\.)*\))*\))
+    |(?P<hex><[0-9A-Fa-f\s]*>)
+    |(?P<inline>\bBI\b.*?\bID\b.*?\bEI\b)
+    |(?P<name>/[^\s/\[\]()<>{}%]+)
+    |(?P<number>[+-]?(?:\d+\.?\d*|\.\d+))
+    |(?P<op>[A-Za-z'"*]+)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+TEXT_OPERATORS = {b"Tj", b"TJ", b"'", b'"'}
+
+
+@dataclass(slots=True)
+class PageInspection:
+    """Text layer and images of a PDF page"""
+
+    number: int
+    text_chars: int  # approximate number of characters shown by text operators
+    image_coverage: float  # share of the page covered by images (overlaps add up)
+
+    @property
+    def needs_ocr(self) -> bool:
+        return self.text_chars < MIN_TEXT_CHARS or (
+            self.image_coverage >= SCAN_IMAGE_COVERAGE
+            and self.text_chars < SCAN_MAX_TEXT_CHARS
+        )
+
+
+@dataclass(slots=True)
+class PdfInspection:
+    """Result of reading a PDF locally, used to choose its text extraction"""
+
+    pages: list[PageInspection] = field(default_factory=list)
+    metadata: dict[str, str] = field(default_factory=dict)  # with Tika's keys
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    @property
+    def ocr_pages(self) -> list[int]:
+        """Numbers of the pages without a usable text layer"""
+        return [page.number for page in self.pages if page.needs_ocr]
+
+    @property
+    def has_text_layer(self) -> bool:
+        """True if any page has text, which pdfact and Tika can extract"""
+        return len(self.ocr_pages) < self.page_count
+
+    def report(self) -> str:
+        ocr_pages = self.ocr_pages
+        return (
+            f"{self.page_count} pages, {self.page_count - len(ocr_pages)} with text"
+            + (f", OCR needed for pages {ocr_pages}" if ocr_pages else "")
+        )
+
+
+def _multiply(m: Matrix, n: Matrix) -> Matrix:
+    """Concatenates the transformation m with n (m applied first)"""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + b * c2,
+        a * b2 + b * d2,
+        c * a2 + d * c2,
+        c * b2 + d * d2,
+        e * a2 + f * c2 + e2,
+        e * b2 + f * d2 + f2,
+    )
+
+
+def _matrix(values: Any) -> Matrix:
+    a, b, c, d, e, f = (float(v) for v in values)
+    return (a, b, c, d, e, f)
+
+
+def _area(m: Matrix) -> float:
+    """Area of the unit square, in which images are drawn, transformed by m"""
+    return abs(m[0] * m[3] - m[1] * m[2])
+
+
+def scan_content(
+    data: bytes,
+    resources: DictionaryObject | None,
+    ctm: Matrix = IDENTITY,
+    depth: int = 0,
+) -> tuple[int, float]:
+    """Characters shown by text operators and area covered by images of a
+    content stream, following the images and forms it draws (Do)"""
+    text_chars = 0
+    image_area = 0.0
+    stack: list[Matrix] = []
+    operands: list[Any] = []
+    string_chars = 0  # characters of the strings since the last operator
+
+    xobjects = resources.get("/XObject") if resources is not None else None
+    xobjects = xobjects.get_object() if xobjects is not None else None
+
+    for token in TOKENS.finditer(data):
+        kind = token.lastgroup
+        value = token.group()
+        if kind == "string":
+            string_chars += len(value) - 2 - value.count(b"\\")
+        elif kind == "hex":
+            string_chars += len(re.sub(rb"\s", b"", value[1:-1])) // 2
+        elif kind == "number":
+            operands.append(float(value))
+        elif kind == "name":
+            operands.append(value.decode("latin-1"))
+        elif kind == "inline":
+            image_area += _area(ctm)
+        else:
+            if value in TEXT_OPERATORS:
+                text_chars += string_chars
+            elif value == b"q":
+                stack.append(ctm)
+            elif value == b"Q":
+                ctm = stack.pop() if stack else ctm
+            elif value == b"cm" and len(operands) >= 6:
+                ctm = _multiply(_matrix(operands[-6:]), ctm)
+            elif value == b"Do" and operands and xobjects is not None:
+                xobject: Any = xobjects.get(operands[-1])
+                xobject = xobject.get_object() if xobject is not None else {}
+                subtype = xobject.get("/Subtype")
+                if subtype == "/Image":
+                    image_area += _area(ctm)
+                elif subtype == "/Form" and depth < MAX_FORM_DEPTH:
+                    form_resources = xobject.get("/Resources")
+                    chars, area = scan_content(
+                        xobject.get_data(),
+                        form_resources.get_object() if form_resources else resources,
+                        _multiply(_matrix(xobject.get("/Matrix", IDENTITY)), ctm),
+                        depth + 1,
+                    )
+                    text_chars += chars
+                    image_area += area
+            operands.clear()
+            string_chars = 0
+    return text_chars, image_area
+
+
+def _pdf_date(value: datetime | None) -> str | None:
+    """Formats a date like Tika does (UTC, ISO 8601)"""
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _metadata(reader: PdfReader) -> dict[str, str]:
+    """Document information of the PDF with the keys of Tika's metadata"""
+    info = reader.metadata
+    if info is None:
+        return {}
+    values: dict[str, str | None] = {"dc:creator": info.author}
+    try:
+        values["dcterms:created"] = _pdf_date(info.creation_date)
+        values["dcterms:modified"] = values["meta:save-date"] = _pdf_date(
+            info.modification_date
+        )
+    except ValueError:
+        pass  # malformed date
+    return {key: value for key, value in values.items() if value}
+
+
+def inspect_pdf(file_path: str) -> PdfInspection | None:
+    """Reads the text layer and images of the pages of a PDF, without
+    extracting the text. Returns None if the file can't be read as PDF."""
+    try:
+        with FileRepository().stream(file_path) as f:
+            reader = PdfReader(f)
+            if reader.is_encrypted:
+                reader.decrypt("")
+            inspection = PdfInspection(metadata=_metadata(reader))
+            for number, page in enumerate(reader.pages, start=1):
+                contents = page.get_contents()
+                resources = page.get("/Resources")
+                text_chars, image_area = scan_content(
+                    contents.get_data() if contents is not None else b"",
+                    resources.get_object() if resources is not None else None,
+                )
+                box = page.cropbox
+                page_area = float(box.width * box.height) or 1.0
+                inspection.pages.append(
+                    PageInspection(number, text_chars, min(image_area / page_area, 1.0))
+                )
+            return inspection
+    except Exception as e:
+        logger.warning(f"Failed to inspect PDF {file_path}: {e}")
+        return None
+
+
+def split_pages(file_path: str, numbers: list[int]) -> dict[int, bytes]:
+    """PDFs of single pages of a PDF, e.g. to OCR them separately. The PDF
+    is parsed once for all pages."""
+    pages = {}
+    with FileRepository().stream(file_path) as f:
+        reader = PdfReader(f)
+        if reader.is_encrypted:
+            reader.decrypt("")
+        for number in numbers:
+            writer = PdfWriter()
+            writer.add_page(reader.pages[number - 1])
+            out = BytesIO()
+            writer.write(out)
+            pages[number] = out.getvalue()
+    return pages
@@ -1,11 +1,23 @@
 import re
+from collections import Counter
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Any, cast
+from functools import lru_cache
+from typing import Any, ClassVar, NamedTuple, cast
 
 from models.models import AgendaItem, Consultation, Document, Meeting, Organization
 
 SOLR_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
 
+WHITESPACE = re.compile(r"\s+")
+
+
+class Paragraph(NamedTuple):
+    """A paragraph of the text of a document and its page number, if known"""
+
+    text: str
+    page: int | None = None
+
 
 def get_relevant_events(
     doc: Document,
@@ -31,84 +43,160 @@ def get_relevant_events(
     return consultation, meetings, agenda_items
 
 
-# TODO Create a proper data class for SolrImportDoc
-type SolrImportDoc = dict[str, Any]
+@dataclass(slots=True)
+class SolrPageDoc:
+    """A page of a document, indexed as a nested child document of it"""
 
+    id: str
+    page_content: str
+    page: int | None = None
 
-def parse_solr_document(
-    doc: Document,
-    content: list[str] | None,
-    metadata: dict[str, str] | None,
-    preview_image: str | None,
-) -> SolrImportDoc:
-    solr_doc: SolrImportDoc = {
-        "id": str(doc.id),
-        "last_analyzed": datetime.now().strftime(SOLR_DATE_FORMAT),
-        "document_id": doc.document_id,
-        "size": doc.size,
-        "content_type": doc.content_type,
-        "doc_title": doc.title,
-        "agenda_item_id": [],
-        "agenda_item_title": [],
-        "agenda_item_text": [],
-        "meeting_id": [],
-        "meeting_title": [],
-        "meeting_title_short": [],
-        "meeting_date": [],
-        "meeting_organization_name": [],
-        "filename": doc.file_name,
-        "preview_image": preview_image,
-        "content": [],
-    }
+    def to_solr(self) -> dict[str, Any]:
+        solr_doc: dict[str, Any] = {"id": self.id, "page_content": self.page_content}
+        if self.page is not None:
+            solr_doc["page"] = self.page
+        return solr_doc
 
-    # include data from associated events
-    consultation, meetings, agenda_items = get_relevant_events(doc)
 
-    if consultation is not None:
-        solr_doc["consultation_id"] = consultation.consultation_id
-        solr_doc["consultation_name"] = consultation.name
-        solr_doc["consultation_type"] = consultation.type
-        solr_doc["consultation_text"] = consultation.text
-        solr_doc["doc_type"] = consultation.type
+@dataclass(slots=True)
+class SolrImportDoc:
+    """A document of the Solr index, see solr/configsets/ris/conf/schema.xml.
+    Copy field destinations are filled by Solr and not part of this class."""
 
-        # find antragssteller for consultations
-        found = re.search(
-            r"\"?(.*?)\"?,?\s(Gemeinsamer\s)?Antrag (der|des) (.*)", consultation.topic
-        )
-        if found:
-            title, organizations = found.group(1), found.group(4)
-            solr_doc["consultation_topic"] = title
-            organizations = parse_consultation_organization(organizations)
-            solr_doc["consultation_organization"] = organizations
-        else:
-            solr_doc["consultation_topic"] = consultation.topic
+    REQUIRED_FIELDS: ClassVar[tuple[str, ...]] = (
+        "id",
+        "last_analyzed",
+        "document_id",
+        "size",
+        "content_type",
+        "filename",
+    )
 
-    for agenda_item in agenda_items:
-        solr_doc["agenda_item_id"].append(agenda_item.agenda_item_id)
-        solr_doc["agenda_item_title"].append(agenda_item.title.split(":")[-1].strip())
-        solr_doc["agenda_item_text"].append(agenda_item.text)
+    id: str
+    last_analyzed: datetime
+    document_id: int
+    size: int
+    content_type: str | None
+    filename: str | None
+    doc_type: str | None = None
+    doc_title: str | None = None
+    preview_image: str | None = None
+    failed_analysis: list[str] = field(default_factory=list)
+    content: list[str] = field(default_factory=list)
+    first_seen: datetime | None = None
+    last_seen: datetime | None = None
+    author: str | None = None
+    creation_date: str | None = None
+    last_modified: str | None = None
+    last_saved: str | None = None
+    consultation_id: int | None = None
+    consultation_name: str | None = None
+    consultation_organization: list[str] = field(default_factory=list)
+    consultation_type: str | None = None
+    consultation_topic: str | None = None
+    consultation_text: str | None = None
+    agenda_item_id: list[int] = field(default_factory=list)
+    agenda_item_title: list[str] = field(default_factory=list)
+    agenda_item_text: list[str | None] = field(default_factory=list)
+    meeting_id: list[int] = field(default_factory=list)
+    meeting_title: list[str] = field(default_factory=list)
+    meeting_title_short: list[str] = field(default_factory=list)
+    meeting_date: list[datetime] = field(default_factory=list)
+    meeting_organization_name: list[str] = field(default_factory=list)
+    meeting_count: int = 0
+    suggest_text: list[str] = field(default_factory=list)
+    pages: list[SolrPageDoc] = field(default_factory=list)
+
+    def missing_fields(self) -> list[str]:
+        """Returns the required fields without a value"""
+        return [name for name in self.REQUIRED_FIELDS if getattr(self, name) is None]
+
+    def to_solr(self) -> dict[str, Any]:
+        """Serializes the document to a JSON compatible dict for Solr.
+        Empty fields and empty values of multivalued fields are left out."""
+        solr_doc: dict[str, Any] = {}
+        for name in SOLR_IMPORT_DOC_FIELDS:
+            value = getattr(self, name)
+            if isinstance(value, list):
+                value = [format_solr_value(v) for v in value if not is_empty(v)]
+                if len(value) == 0:
+                    continue
+            elif is_empty(value):
+                continue
+            else:
+                value = format_solr_value(value)
+            solr_doc[name] = value
+        return solr_doc
+
+    def to_atomic_update(self, names: tuple[str, ...]) -> dict[str, Any]:
+        """Serializes the given fields as a Solr atomic update of this document.
+        Empty fields are removed from the indexed document."""
+        serialized = self.to_solr()
+        update: dict[str, Any] = {"id": self.id}
+        for name in names:
+            update[name] = {"set": serialized.get(name)}
+        return update
+
+
+SOLR_IMPORT_DOC_FIELDS = tuple(f.name for f in fields(SolrImportDoc))
+
+# fields that depend on the meetings, consultations and agenda items of a
+# document, but not on its file
+RELATION_FIELDS = (
+    "doc_type",
+    "first_seen",
+    "last_seen",
+    "consultation_id",
+    "consultation_name",
+    "consultation_organization",
+    "consultation_type",
+    "consultation_topic",
+    "consultation_text",
+    "agenda_item_id",
+    "agenda_item_title",
+    "agenda_item_text",
+    "meeting_id",
+    "meeting_title",
+    "meeting_title_short",
+    "meeting_date",
+    "meeting_organization_name",
+    "meeting_count",
+    "suggest_text",
+)
+
+
+def is_empty(value: Any) -> bool:
+    return value is None or value == ""
+
+
+def format_solr_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.strftime(SOLR_DATE_FORMAT)
+    if isinstance(value, SolrPageDoc):
+        return value.to_solr()
+    return value
 
-    last_seen = None
-    first_seen = None
-    for meeting in meetings:
-        solr_doc["meeting_id"].append(meeting.meeting_id)
-        solr_doc["meeting_title"].append(meeting.title)
-        solr_doc["meeting_title_short"].append(meeting.title_short)
-        solr_doc["meeting_date"].append(meeting.date.strftime(SOLR_DATE_FORMAT))
-        solr_doc["meeting_organization_name"].append(
-            cast(Organization, meeting.organization).name
-        )
-        if last_seen is None or last_seen < meeting.date:
-            last_seen = meeting.date
-        if first_seen is None or first_seen > meeting.date:
-            first_seen = meeting.date
 
-    if last_seen is not None:
-        solr_doc["last_seen"] = last_seen.strftime(SOLR_DATE_FORMAT)
-    if first_seen is not None:
-        solr_doc["first_seen"] = first_seen.strftime(SOLR_DATE_FORMAT)
+def parse_solr_document(
+    doc: Document,
+    content: list[Paragraph] | None,
+    metadata: dict[str, str] | None,
+    preview_image: str | None,
+    events: tuple[Consultation | None, set[Meeting], set[AgendaItem]] | None = None,
+) -> SolrImportDoc:
+    solr_doc = SolrImportDoc(
+        id=str(doc.id),
+        last_analyzed=datetime.now(),
+        document_id=doc.document_id,
+        size=doc.size,
+        content_type=doc.content_type,
+        doc_title=doc.title,
+        filename=doc.file_name,
+        preview_image=preview_image,
+    )
 
-    solr_doc["meeting_count"] = len(solr_doc["meeting_id"])
+    # include data from associated events
+    set_relation_fields(solr_doc, doc, events or get_relevant_events(doc))
 
     def get_metadata_value(
         metadata: dict[str, str] | None, fields: list[str]
@@ -121,14 +209,11 @@ def parse_solr_document(
         return None
 
     if metadata is not None:
-        author = get_metadata_value(
+        solr_doc.author = get_metadata_value(
             metadata,
             ["Author", "creator", "dc:creator", "meta:author", "pdf:docinfo:creator"],
         )
-        if author is not None:
-            solr_doc["author"] = author
-
-        creation_date = get_metadata_value(
+        solr_doc.creation_date = get_metadata_value(
             metadata,
             [
                 "Creation-Date",
@@ -138,77 +223,204 @@ def parse_solr_document(
                 "pdf:docinfo:created",
             ],
         )
-        if creation_date is not None:
-            solr_doc["creation_date"] = creation_date
-
-        last_modified = get_metadata_value(
+        solr_doc.last_modified = get_metadata_value(
             metadata,
             ["Last-Modified", "dcterms:modified", "modified", "pdf:docinfo:modified"],
         )
-        if last_modified is not None:
-            solr_doc["last_modified"] = last_modified
-
-        last_save_date = get_metadata_value(
+        solr_doc.last_saved = get_metadata_value(
             metadata, ["Last-Save-Date", "meta:save-date"]
         )
-        if last_save_date is not None:
-            solr_doc["last_saved"] = last_save_date
-
-    # Niederschrift type recognized by keyword "Niederschrift" title
-    if "doc_type" not in solr_doc or solr_doc["doc_type"] is None:
-        if doc.title and "niederschrift" in doc.title.lower():
-            solr_doc["doc_type"] = "Niederschrift"
 
     # add content strings from tika/pdfact
     if content is not None:
-        content = [re.sub(r"\s+", " ", s).strip() for s in content]
-        content = process_content(
-            content, solr_doc["doc_type"] if "doc_type" in solr_doc else None
-        )
-        solr_doc["content"] = content
+        content = [
+            Paragraph(WHITESPACE.sub(" ", p.text).strip(), p.page) for p in content
+        ]
+        solr_doc.content = process_content([p.text for p in content], solr_doc.doc_type)
+        solr_doc.pages = parse_pages(solr_doc.id, content)
 
     return solr_doc
 
 
-def process_content(content: list[str], doc_type: str | None) -> list[str]:
-    if doc_type == "Beschlussvorlage":
-        content = remove_by_regexes(
-            content,
-            [
-                r"die Stadtverordnetenversammlung möge beschließen[\s\:\.,]*",
-                r"wird folgende Beschlussfassung empfohlen[\s\:\.,]*",
-            ],
+def parse_pages(id: str, content: list[Paragraph]) -> list[SolrPageDoc]:
+    """Groups the paragraphs of a document into its pages. The pages keep
+    their boilerplate, as they are only searched for the page of a match.
+    Paragraphs without a page number (text from tika) form a single page
+    without a number."""
+    pages: dict[int | None, list[str]] = {}
+    for paragraph in content:
+        if paragraph.text:
+            pages.setdefault(paragraph.page, []).append(paragraph.text)
+    return [
+        SolrPageDoc(
+            id=f"{id}/page-{page}" if page is not None else f"{id}/text",
+            page_content="\n".join(texts),
+            page=page,
         )
-    elif doc_type == "Informationsvorlage":
-        content = remove_by_regexes(
-            content,
-            [
-                r"die Stadtverordnetenversammlung wird über folgendes Thema informiert:[\s\:\.,]*",
-            ],
+        for page, texts in pages.items()
+    ]
+
+
+def set_relation_fields(
+    solr_doc: SolrImportDoc,
+    doc: Document,
+    events: tuple[Consultation | None, set[Meeting], set[AgendaItem]],
+) -> None:
+    """Sets the fields derived from the consultation, meetings and agenda
+    items of a document (see RELATION_FIELDS)"""
+    consultation, meetings, agenda_items = events
+
+    if consultation is not None:
+        solr_doc.consultation_id = consultation.consultation_id
+        solr_doc.consultation_name = consultation.name
+        solr_doc.consultation_type = consultation.type
+        solr_doc.consultation_text = consultation.text
+        solr_doc.doc_type = consultation.type
+
+        # find antragssteller for consultations
+        found = re.search(
+            r"\"?(.*?)\"?,?\s(Gemeinsamer\s)?Antrag (der|des) (.*)", consultation.topic
         )
-    elif doc_type == "Antragsvorlage":
-        content = remove_by_regexes(
-            content,
-            [
-                r"die Stadtverordnetenversammlung möge beschließen[\s\:\.,]*",
-                r"Sehr geehrte[r]? (Herr|Frau) Stadtverordnetenvorsteher(in)?[\s\.,]*",
-            ],
+        if found:
+            title, organizations = found.group(1), found.group(4)
+            solr_doc.consultation_topic = title
+            solr_doc.consultation_organization = parse_consultation_organization(
+                organizations
+            )
+        else:
+            solr_doc.consultation_topic = consultation.topic
+
+    for agenda_item in agenda_items:
+        solr_doc.agenda_item_id.append(agenda_item.agenda_item_id)
+        solr_doc.agenda_item_title.append(agenda_item.title.split(":")[-1].strip())
+        solr_doc.agenda_item_text.append(agenda_item.text)
+
+    for meeting in meetings:
+        solr_doc.meeting_id.append(meeting.meeting_id)
+        solr_doc.meeting_title.append(meeting.title)
+        solr_doc.meeting_title_short.append(meeting.title_short)
+        solr_doc.meeting_date.append(meeting.date)
+        solr_doc.meeting_organization_name.append(
+            cast(Organization, meeting.organization).name
         )
-    content = remove_by_regexes(
-        content,
-        [
-            r"gez.\s[A-Z]",
-            r"((Mit)\s)?(freundliche[mn]?|beste[n]?)\sGr[üu]ß[en]{0,2}",
-            r"Hochachtungsvoll\,\s",
-        ],
-        from_end=True,
+
+    if solr_doc.meeting_date:
+        solr_doc.last_seen = max(solr_doc.meeting_date)
+        solr_doc.first_seen = min(solr_doc.meeting_date)
+
+    solr_doc.meeting_count = len(solr_doc.meeting_id)
+
+    # Niederschrift type recognized by keyword "Niederschrift" title
+    if solr_doc.doc_type is None:
+        if doc.title and "niederschrift" in doc.title.lower():
+            solr_doc.doc_type = "Niederschrift"
+
+    # values of the suggester, set here instead of copy fields in the schema,
+    # which atomic updates would add to the stored values
+    solr_doc.suggest_text = [
+        value
+        for value in [
+            doc.title,
+            solr_doc.consultation_name,
+            solr_doc.consultation_topic,
+            *solr_doc.agenda_item_title,
+            *solr_doc.meeting_title_short,
+            *solr_doc.meeting_title,
+            *solr_doc.meeting_organization_name,
+        ]
+        if value
+    ]
+
+
+def parse_relation_update(
+    doc: Document,
+    events: tuple[Consultation | None, set[Meeting], set[AgendaItem]] | None = None,
+) -> dict[str, Any]:
+    """Returns a Solr atomic update of the relation fields of an indexed document"""
+    solr_doc = SolrImportDoc(
+        id=str(doc.id),
+        last_analyzed=datetime.now(),
+        document_id=doc.document_id,
+        size=doc.size,
+        content_type=doc.content_type,
+        filename=doc.file_name,
     )
+    set_relation_fields(solr_doc, doc, events or get_relevant_events(doc))
+    return solr_doc.to_atomic_update(RELATION_FIELDS)
+
+
+class BoilerplatePattern:
+    """A set of boilerplate regexes, compiled once.
+    Lines are prefiltered with a combined alternation of all regexes, the single
+    regexes are only evaluated for lines in which any of them matches."""
+
+    def __init__(self, regexes: list[str]) -> None:
+        self.regexes = [re.compile(regex, re.IGNORECASE) for regex in regexes]
+        self.combined = re.compile(
+            "|".join(f"(?:{regex})" for regex in regexes), re.IGNORECASE
+        )
+
+    def first_matches(
+        self, content: list[str], first_line_only: bool = False
+    ) -> list[tuple[int, int, int]]:
+        """Returns tuples (line, regex_start, regex_end) for the first match of each regex.
+        If first_line_only is set, the scan stops at the first line with a match."""
+        matches = []
+        pending = self.regexes
+        for idx, line in enumerate(content):
+            if not self.combined.search(line):
+                continue
+            not_found = []
+            for regex in pending:
+                res = regex.search(line)
+                if res:
+                    matches.append((idx, res.start(), res.end()))
+                else:
+                    not_found.append(regex)
+            pending = not_found
+            if first_line_only or len(pending) == 0:
+                break
+        return matches
+
+
+# header boilerplate by doc type, content before the last match is removed
+HEADER_RULES: dict[str, list[str]] = {
+    "Beschlussvorlage": [
+        r"die Stadtverordnetenversammlung möge beschließen[\s\:\.,]*",
+        r"wird folgende Beschlussfassung empfohlen[\s\:\.,]*",
+    ],
+    "Informationsvorlage": [
+        r"die Stadtverordnetenversammlung wird über folgendes Thema informiert:[\s\:\.,]*",
+    ],
+    "Antragsvorlage": [
+        r"die Stadtverordnetenversammlung möge beschließen[\s\:\.,]*",
+        r"Sehr geehrte[r]? (Herr|Frau) Stadtverordnetenvorsteher(in)?[\s\.,]*",
+    ],
+}
+
+# footer boilerplate of all documents, content after the first match is removed
+FOOTER_RULES: list[str] = [
+    r"gez.\s[A-Z]",
+    r"((Mit)\s)?(freundliche[mn]?|beste[n]?)\sGr[üu]ß[en]{0,2}",
+    r"Hochachtungsvoll\,\s",
+]
+
+HEADER_PATTERNS = {
+    doc_type: BoilerplatePattern(regexes) for doc_type, regexes in HEADER_RULES.items()
+}
+FOOTER_PATTERN = BoilerplatePattern(FOOTER_RULES)
+
+
+def process_content(content: list[str], doc_type: str | None) -> list[str]:
+    if doc_type in HEADER_PATTERNS:
+        content = remove_boilerplate(content, HEADER_PATTERNS[doc_type])
+    content = remove_boilerplate(content, FOOTER_PATTERN, from_end=True)
 
     return content
 
 
-def remove_by_regexes(
-    content: list[str], regexes: list[str], from_end: bool = False
+def remove_boilerplate(
+    content: list[str], pattern: BoilerplatePattern, from_end: bool = False
 ) -> list[str]:
     """Removes the header of documents based on given regex patterns.
     The content lines are scanned for the first occurance of all regexes and the returned output
@@ -217,13 +429,9 @@ def remove_by_regexes(
     If two regexes match, the content is cut for the last match of the two.
     If from_end is set, the regex removes from the end of the content.
     """
-    matches = []  # tuples (line, regex_start, regex_end) for all first matches
-    for regex in regexes:
-        for idx, line in enumerate(content):
-            res = re.search(regex, line, re.IGNORECASE)
-            if res:
-                matches.append((idx, res.start(), res.end()))
-                break
+    # tuples (line, regex_start, regex_end) for all first matches. When removing
+    # from the end, only the first line containing a regex is relevant.
+    matches = pattern.first_matches(content, first_line_only=from_end)
 
     if len(matches) == 0:
         return content
@@ -264,27 +472,61 @@ def remove_by_regexes(
     return content
 
 
-def parse_consultation_organization(organizations_base: str) -> list[str]:
-    # SPD-Fraktion -> SPD
-    # Fraktionen CDU, SPD und B90/Die Grünen -> CDU, SPD, B90/Die Grünen
-    organizations_base = re.sub(r"\-?Fraktion(en)?\s*", "", organizations_base).replace(
-        " und ", ", "
-    )
-    organizations = [org.strip() for org in organizations_base.split(",")]
-    replacements = [
-        (r"Bürgermeister.*", "Bürgermeister"),
-        (r".*Grüne.*", "B90/Grüne"),
-        (r"Seniorenbeirat.*", "Seniorenbeirat"),
-        (r"Ausländerbeirat.*", "Ausländerbeirat"),
-        (r"Stadtverwaltung.*", "Stadtverwaltung Griesheim"),
+class OrganizationNormalizer:
+    """Normalizes the organizations named in consultation topics to the names of
+    known organizations. The valid names are loaded once and the results are
+    memoized, as the same few organization strings repeat across documents.
+    Names that are not valid organizations are skipped and counted in `skipped`."""
+
+    FRACTION = re.compile(r"\-?Fraktion(en)?\s*")
+    REPLACEMENTS = [
+        (re.compile(r"Bürgermeister.*"), "Bürgermeister"),
+        (re.compile(r".*Grüne.*"), "B90/Grüne"),
+        (re.compile(r"Seniorenbeirat.*"), "Seniorenbeirat"),
+        (re.compile(r"Ausländerbeirat.*"), "Ausländerbeirat"),
+        (re.compile(r"Stadtverwaltung.*"), "Stadtverwaltung Griesheim"),
     ]
-    for replacement in replacements:
-        organizations = [re.sub(*replacement, org) for org in organizations]
 
-    checked_organizations = []
-    for org in organizations:
-        if Organization.objects.filter(name=org).count() == 1:
-            checked_organizations.append(org)
-        else:
-            print(f"!! Invalid organization skipped: {org} !!")
-    return checked_organizations
+    def __init__(self) -> None:
+        self.valid_names: set[str] | None = None
+        self.skipped: Counter[str] = Counter()
+        self._normalize = lru_cache(maxsize=1024)(self._normalize_uncached)
+
+    def reset(self) -> None:
+        """Reloads the valid names on next use and clears memo and skipped names"""
+        self.valid_names = None
+        self.skipped.clear()
+        self._normalize.cache_clear()
+
+    def normalize(self, organizations_base: str) -> list[str]:
+        organizations, skipped = self._normalize(organizations_base)
+        self.skipped.update(skipped)
+        return list(organizations)
+
+    def report(self) -> str:
+        return ", ".join(f"{org} ({count}x)" for org, count in self.skipped.items())
+
+    def _normalize_uncached(
+        self, organizations_base: str
+    ) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        # SPD-Fraktion -> SPD
+        # Fraktionen CDU, SPD und B90/Die Grünen -> CDU, SPD, B90/Die Grünen
+        organizations_base = self.FRACTION.sub("", organizations_base).replace(
+            " und ", ", "
+        )
+        organizations = [org.strip() for org in organizations_base.split(",")]
+        for pattern, replacement in self.REPLACEMENTS:
+            organizations = [pattern.sub(replacement, org) for org in organizations]
+
+        if self.valid_names is None:
+            self.valid_names = set(Organization.objects.values_list("name", flat=True))
+        checked = tuple(org for org in organizations if org in self.valid_names)
+        skipped = tuple(org for org in organizations if org not in self.valid_names)
+        return checked, skipped
+
+
+organization_normalizer = OrganizationNormalizer()
+
+
+def parse_consultation_organization(organizations_base: str) -> list[str]:
+    return organization_normalizer.normalize(organizations_base)
@@ -21,6 +21,7 @@ class SearchResult:
         date: datetime | None,
         preview_image: str | None,
         filetype: str | None,
+        pages: list[int] | None = None,
     ) -> None:
         self.id = id
         self.document_id = document_id
@@ -34,6 +35,19 @@ class SearchResult:
         self.date = date
         self.preview_image = preview_image
         self.filetype = filetype
+        self.pages = pages or []  # best matching pages first
+
+    @property
+    def page_links(self) -> list[tuple[int, str]]:
+        """Links to the best matching pages of the file"""
+        return [(page, f"{self.download_link}#page={page}") for page in self.pages]
+
+    @property
+    def file_link(self) -> str:
+        """Link to the file, opened at the best matching page"""
+        if self.pages:
+            return f"{self.download_link}#page={self.pages[0]}"
+        return self.download_link
 
 
 class SearchResults:
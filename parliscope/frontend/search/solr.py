@@ -1,13 +1,17 @@
+import logging
 from datetime import datetime
 from enum import Enum
 from typing import Any, cast
 
 import pysolr
 
+from frontend import tracing
 from frontend.search import SearchResult, SearchResults
 from frontend.search.search_results import Facets
 from frontend.search.utils import pairwise, solr_connection, solr_page
 
+logger = logging.getLogger(__name__)
+
 # default number of documents to return
 NUM_ROWS = 10
 
@@ -28,13 +32,37 @@ FACET_ARGS: dict[str, str | int | list[str]] = {
     "facet.mincount": 1,
 }
 
-# highlighting
-HL_FIELDS = (
-    "content content_hr consultation_text consultation_text_hr"  # order matters!
-)
+# Highlight source fields by size. Large fields are indexed with the offsets
+# of their terms (storeOffsetsWithPositions in schema.xml), which the unified
+# highlighter uses instead of analyzing the stored text of each hit again.
+# Small fields are analyzed, offsets would only grow their index.
+HL_LARGE_FIELDS = frozenset({"content", "page_content"})
+# the summary of large fields only needs their beginning
+HL_SUMMARY_CHARS = 10_000
+
+
+def highlight_fields(fields: str, summary: bool = False) -> dict[str, str | int]:
+    """Highlighting arguments for the given fields, depending on their size.
+    The offsets of large fields are picked up by Solr automatically, so
+    documents indexed before they were stored can still be highlighted."""
+    args: dict[str, str | int] = {"hl.fl": fields}
+    large = False
+    for field in fields.split(" "):
+        if field in HL_LARGE_FIELDS:
+            large = True
+        else:
+            args[f"f.{field}.hl.offsetSource"] = "ANALYSIS"
+    if summary and large:
+        args["hl.maxAnalyzedChars"] = HL_SUMMARY_CHARS
+    return args
+
+
+# highlighting, the content is highlighted on the best matching page instead
+# (see search_pages), so the cost doesn't depend on the size of documents
+HL_FIELDS = "consultation_text consultation_text_hr"  # order matters!
 HL_ARGS: dict[str, str | int | list[str]] = {
     "hl": "true",
-    "hl.fl": HL_FIELDS,
+    **highlight_fields(HL_FIELDS),
     "hl.snippets": 5,
     "hl.fragsize": 200,
     "hl.fragsizeIsMinimum": "false",
@@ -45,13 +73,25 @@ HL_ARGS: dict[str, str | int | list[str]] = {
 # highlighting for landing page
 HL_NEWEST_ARGS: dict[str, str | int] = {
     "hl": "true",
-    "hl.fl": "content",
+    **highlight_fields("content", summary=True),
     "hl.bs.type": "WORD",
     "hl.fragsize": 200,
     "hl.snippets": 10,
     "hl.defaultSummary": "true",
 }
 
+# best matching pages of documents, see the /pages handler in solrconfig.xml
+PAGE_HL_FIELDS = "page_content"
+PAGE_ARGS: dict[str, str | int | list[str]] = {
+    "search_handler": "/pages",
+    "expand.rows": 2,  # next best pages after the highlighted one
+    **highlight_fields(PAGE_HL_FIELDS),
+    "hl.snippets": 5,
+    "hl.fragsize": 200,
+    "hl.fragsizeIsMinimum": "false",
+    "hl.defaultSummary": "false",
+}
+
 # spellchecking arguments
 SPELLCHECK_ARGS: dict[str, str | int] = {
     "spellcheck": "true",
@@ -68,7 +108,10 @@ class SortOrder(Enum):
 
 
 def _parse_highlights(
-    highlights: dict[str, list[str]], max_len: int, separator: str = " "
+    highlights: dict[str, list[str]],
+    max_len: int,
+    separator: str = " ",
+    fields: str = HL_FIELDS,
 ) -> str | None:
     # remove empty string highlights
     for key in highlights:
@@ -82,7 +125,7 @@ def _parse_highlights(
     # as a soft limit (stopping once max_len is exceeded)
     def highlight2str(highlights: dict[str, list[str]]) -> str:
         hl = ""
-        for field in HL_FIELDS.split(" "):
+        for field in fields.split(" "):
             if hl:
                 return hl
             elif field in highlights:
@@ -221,6 +264,16 @@ def _parse_spellcheck(result: pysolr.Results) -> tuple[str, int] | tuple[None, N
     return None, None
 
 
+def _search(solr_conn: pysolr.Solr, query: str, **args: Any) -> pysolr.Results:
+    """send a search request to solr, traced as a span"""
+    with tracing.span("solr.search", **{"solr.handler": solr_conn.search_handler}):
+        result = solr_conn.search(query, **args)
+        tracing.set_attributes(
+            **{"solr.qtime": result.qtime or 0, "solr.hits": result.hits}
+        )
+    return result
+
+
 def _create_solr_args(
     query: str,
     page: int,
@@ -245,7 +298,7 @@ def _create_solr_args(
         filter(
             lambda fq: fq[-2] != "*",
             (
-                "{!tag=facetignore}" f'{FACET_FIELDS[name]}:"{facet_filter[name]}"'
+                f'{{!tag=facetignore}}{FACET_FIELDS[name]}:"{facet_filter[name]}"'
                 for name in facet_filter.keys()
             ),
         )
@@ -288,7 +341,7 @@ def count(query: str, solr_conn: pysolr.Solr | None = None) -> int:
     """get a count of documents matching the query"""
     if solr_conn is None:
         solr_conn = solr_connection()
-    result = solr_conn.search(query, rows=0)
+    result = _search(solr_conn, query, rows=0)
     return int(result.hits)
 
 
@@ -312,12 +365,20 @@ def search(
     args = _create_solr_args(
         query, page, sort, limit, facet_filter, hl, facet, spellcheck
     )
-    result = solr_conn.search(query, **args)
-
-    documents = [_parse_search_result(doc, result) for doc in result.docs]
-    facets = _parse_facets(result.facets)
-
-    spellcheck_query, spellcheck_hits = _parse_spellcheck(result)
+    result = _search(solr_conn, query, **args)
+
+    with tracing.span("solr.parse_results"):
+        documents = [_parse_search_result(doc, result) for doc in result.docs]
+    if hl and documents and query not in ("*", "*:*"):
+        pages = search_pages(query, [doc.id for doc in documents], solr_conn)
+        for doc in documents:
+            if doc.id in pages:
+                doc.pages, page_highlight = pages[doc.id]
+                doc.highlight = page_highlight or doc.highlight
+    with tracing.span("solr.parse_facets"):
+        facets = _parse_facets(result.facets)
+    with tracing.span("solr.parse_spellcheck"):
+        spellcheck_query, spellcheck_hits = _parse_spellcheck(result)
 
     return SearchResults(
         documents,
@@ -331,6 +392,43 @@ def search(
     )
 
 
+def search_pages(
+    query: str, ids: list[str], solr_conn: pysolr.Solr | None = None
+) -> dict[str, tuple[list[int], str | None]]:
+    """Searches the pages of the given documents. Returns the numbers of the
+    best matching pages per document id, with the highlight of the best page.
+    Documents without matching pages are left out."""
+    if solr_conn is None:
+        solr_conn = solr_connection()
+    args = dict(PAGE_ARGS)
+    args["fq"] = "{!terms f=_root_}" + ",".join(ids)
+    args["rows"] = len(ids)
+    try:
+        result = _search(solr_conn, query, **args)
+    except pysolr.SolrError as e:
+        # the results are still usable, just without pages
+        logger.warning(f"Failed to search the pages of the results: {e}")
+        return {}
+
+    with tracing.span("solr.parse_pages"):
+        expanded = result.raw_response.get("expanded", {})
+        pages = {}
+        for doc in result.docs:
+            root = doc["_root_"]
+            matches = [doc, *expanded.get(root, {}).get("docs", [])]
+            if result.highlighting and doc["id"] in result.highlighting:
+                hl = _parse_highlights(
+                    result.highlighting[doc["id"]],
+                    max_len=200,
+                    separator=" … ",
+                    fields=PAGE_HL_FIELDS,
+                )
+            else:
+                hl = None
+            pages[root] = ([match["page"] for match in matches if "page" in match], hl)
+    return pages
+
+
 # same as `search` but fills highlight with content
 def doc_id(
     query: str = "*:*", limit: int = 5, solr_conn: pysolr.Solr | None = None
@@ -345,15 +443,16 @@ def doc_id(
     )
     args |= HL_NEWEST_ARGS  # set HL to get an extraction of the content
 
-    result = solr_conn.search(query, **args)
+    result = _search(solr_conn, query, **args)
 
-    documents = [_parse_search_result(doc, result) for doc in result.docs]
-    # For newest, we want to concatenate highlighting data up to a max. len
-    for doc in documents:
-        if doc.id in result.highlighting:
-            doc.highlight = _parse_highlights(
-                result.highlighting[doc.id], max_len=10000, separator=" "
-            )
+    with tracing.span("solr.parse_results"):
+        documents = [_parse_search_result(doc, result) for doc in result.docs]
+        # For newest, we want to concatenate highlighting data up to a max. len
+        for doc in documents:
+            if doc.id in result.highlighting:
+                doc.highlight = _parse_highlights(
+                    result.highlighting[doc.id], max_len=10000, separator=" "
+                )
     facets: Facets = {}
 
     return SearchResults(
@@ -370,6 +469,8 @@ def suggest(query: str, solr_conn: pysolr.Solr | None = None) -> list[str]:
     """Get search suggestions for the given query"""
     if solr_conn is None:
         solr_conn = solr_connection("/suggest")
-    response = solr_conn.search(query, **SUGGEST_ARGS)
-    suggestions = response.raw_response["suggest"]["default"][query]["suggestions"]
+    response = _search(solr_conn, query, **SUGGEST_ARGS)
+    # the response is keyed by the name of the active dictionary
+    (dictionary,) = response.raw_response["suggest"].values()
+    suggestions = dictionary[query]["suggestions"]
     return [s["term"] for s in suggestions]
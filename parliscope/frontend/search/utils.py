@@ -1,17 +1,37 @@
 from collections.abc import Sequence
+from typing import Any
 
 import pysolr
+import requests
 from django.conf import settings
 
+from frontend import tracing
+
 
 def pairwise(iterable: Sequence[str | int]) -> list[tuple[str | int, str | int]]:
     """converts a list to a list of pairs"""
     return list(zip(iterable[0::2], iterable[1::2], strict=False))
 
+
+def _trace_response(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+    """records network time and response size of a solr request on the current span"""
+    tracing.set_attributes(
+        **{
+            "http.response.status_code": response.status_code,
+            "http.response.body.size": len(response.content),
+            "solr.network_ms": response.elapsed.total_seconds() * 1000,
+        }
+    )
+
+
 def solr_connection(handler: str = "/select") -> pysolr.Solr:
     """connect to solr"""
+    session = requests.Session()
+    session.hooks["response"].append(_trace_response)
     return pysolr.Solr(
-        f"{settings.SOLR_HOST}/{settings.SOLR_COLLECTION}", search_handler=handler
+        f"{settings.SOLR_HOST}/{settings.SOLR_COLLECTION}",
+        search_handler=handler,
+        session=session,
     )
 
 
@@ -0,0 +1,46 @@
+from io import BytesIO
+
+from pypdf import PdfWriter
+from pypdf.generic import (
+    DecodedStreamObject,
+    DictionaryObject,
+    NameObject,
+    NumberObject,
+)
+
+TEXT_PAGE = (
+    b"BT /F1 12 Tf 72 700 Td (Antrag der Fraktion zur Sanierung der Schule) Tj ET"
+)
+SCANNED_PAGE = b"q 595 0 0 842 0 0 cm /Im0 Do Q"
+
+
+def make_pdf(pages: list[bytes], metadata: dict[str, str] | None = None) -> bytes:
+    """A PDF of A4 pages with the given content streams, which can draw a
+    1x1 pixel image as /Im0"""
+    writer = PdfWriter()
+    image = DecodedStreamObject()
+    image.set_data(b"\x00")
+    image.update(
+        {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(1),
+            NameObject("/Height"): NumberObject(1),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+        }
+    )
+    image_ref = writer._add_object(image)
+    for content in pages:
+        page = writer.add_blank_page(width=595, height=842)
+        stream = DecodedStreamObject()
+        stream.set_data(content)
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject(
+            {NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): image_ref})}
+        )
+    if metadata:
+        writer.add_metadata(metadata)
+    out = BytesIO()
+    writer.write(out)
+    return out.getvalue()
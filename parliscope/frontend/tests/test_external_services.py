@@ -0,0 +1,130 @@
+import email
+import threading
+from email.message import Message
+from pathlib import Path
+from typing import Any, cast
+from unittest.mock import Mock
+
+import pytest
+from django.conf import settings
+
+from frontend.processing import external_services
+from frontend.processing.multipart import MultipartFile
+from frontend.processing.pdf_inspection import inspect_pdf
+from frontend.processing.processing import Paragraph
+from frontend.tests.pdf_factory import SCANNED_PAGE, TEXT_PAGE, make_pdf
+
+
+@pytest.fixture
+def document(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    monkeypatch.setattr(settings, "DOCUMENT_STORE", str(tmp_path))
+    monkeypatch.setattr(external_services.files, "base_path", str(tmp_path))
+    monkeypatch.setattr(external_services.cache, "base_path", str(tmp_path / "cache"))
+    path = tmp_path / "antrag.docx"
+    path.write_bytes(b"%PDF-1.7\n" + bytes(range(256)) * 1000)
+    return path
+
+
+def test_multipart_body_is_read_in_chunks(document: Path) -> None:
+    with document.open("rb") as f:
+        body = MultipartFile("files", f)
+        chunks = list(body)
+        assert not f.closed
+
+    data = b"".join(chunks)
+    assert len(data) == len(body)
+    assert max(len(chunk) for chunk in chunks) < len(document.read_bytes())
+    message = email.message_from_bytes(
+        f"Content-Type: {body.content_type}\r\n\r\n".encode() + data
+    )
+    (part,) = cast(list[Message], message.get_payload())
+    assert part.get_param("name", header="Content-Disposition") == "files"
+    assert part.get_filename() == "antrag.docx"
+    assert part.get_payload(decode=True) == document.read_bytes()
+
+
+def test_post_file_streams_and_closes_the_file(
+    document: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    sent: dict[str, Any] = {}
+
+    def post(url: str, data: MultipartFile, **kwargs: Any) -> Mock:
+        sent["file"] = data.parts[1]
+        sent["length"] = len(data)
+        sent["body"] = data.read()
+        sent["headers"] = kwargs["headers"]
+        return Mock(status_code=200)
+
+    monkeypatch.setattr(external_services.requests, "post", post)
+
+    external_services.post_file("http://pdfact/analyze", "antrag.docx")
+
+    assert sent["file"].closed
+    assert sent["length"] == len(sent["body"])
+    assert document.read_bytes() in sent["body"]
+    assert sent["headers"]["Content-Type"].startswith("multipart/form-data")
+
+
+def test_converted_pdf_is_streamed_to_the_cache(
+    document: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    response = Mock(status_code=200)
+    response.__enter__ = Mock(return_value=response)
+    response.__exit__ = Mock(return_value=None)
+    response.iter_content.return_value = iter([b"%PDF", b"-1.7"])
+    post = Mock(return_value=response)
+    monkeypatch.setattr(external_services.requests, "post", post)
+
+    path = external_services.convert_to_pdf("antrag.docx", skip_cache=True)
+
+    assert Path(path).read_bytes() == b"%PDF-1.7"
+    assert not Path(f"{path}.part").exists()
+    assert post.call_args.kwargs["stream"] is True
+    response.__exit__.assert_called_once()
+
+
+def test_pages_are_ocred_separately_in_parallel(
+    document: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    document.write_bytes(make_pdf([SCANNED_PAGE, TEXT_PAGE, SCANNED_PAGE]))
+    barrier = threading.Barrier(2, timeout=5)
+    calls: list[str] = []
+
+    def from_buffer(data: bytes, **kwargs: Any) -> dict[str, Any]:
+        barrier.wait()  # both pages are sent at once
+        path = document.with_name(f"page{len(calls)}.pdf")
+        path.write_bytes(data)
+        inspection = inspect_pdf(str(path))
+        assert inspection is not None and inspection.page_count == 1
+        calls.append(kwargs["headers"]["X-Tika-PDFOcrStrategy"])
+        if len(calls) == 2:
+            return {"status": 500, "content": None}
+        return {"status": 200, "content": " Unterschrift\n", "metadata": {}}
+
+    monkeypatch.setattr(external_services.parser, "from_buffer", from_buffer)
+    split_pages = Mock(wraps=external_services.split_pages)
+    monkeypatch.setattr(external_services, "split_pages", split_pages)
+
+    paragraphs, failed = external_services.ocr_pages_tika("antrag.docx", [1, 3])
+
+    # the PDF is parsed once for both pages
+    split_pages.assert_called_once_with("antrag.docx", [1, 3])
+    assert calls == ["OCR_ONLY", "OCR_ONLY"]
+    assert len(paragraphs) == 1 and len(failed) == 1
+    assert paragraphs[0].text == "Unterschrift"
+    assert {paragraphs[0].page, failed[0]} == {1, 3}
+
+
+def test_ocred_pages_are_cached(
+    document: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    document.write_bytes(make_pdf([SCANNED_PAGE, SCANNED_PAGE]))
+    from_buffer = Mock(return_value={"status": 200, "content": "Seite"})
+    monkeypatch.setattr(external_services.parser, "from_buffer", from_buffer)
+
+    external_services.ocr_pages_tika("antrag.docx", [1])
+    paragraphs, failed = external_services.ocr_pages_tika("antrag.docx", [1, 2])
+
+    assert paragraphs == [Paragraph("Seite", 1), Paragraph("Seite", 2)]
+    assert failed == []
+    assert from_buffer.call_count == 2
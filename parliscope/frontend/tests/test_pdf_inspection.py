@@ -0,0 +1,85 @@
+from pathlib import Path
+
+from frontend.processing.pdf_inspection import (
+    inspect_pdf,
+    scan_content,
+    split_pages,
+)
+from frontend.tests.pdf_factory import SCANNED_PAGE, TEXT_PAGE, make_pdf
+
+
+def test_text_and_scanned_pages(tmp_path: Path) -> None:
+    path = tmp_path / "anlage.pdf"
+    path.write_bytes(
+        make_pdf(
+            [TEXT_PAGE, SCANNED_PAGE + b" BT (Seite 2) Tj ET", b""],
+            {"/Author": "Stadt", "/CreationDate": "D:20240102030405+01'00'"},
+        )
+    )
+
+    inspection = inspect_pdf(str(path))
+
+    assert inspection is not None
+    assert inspection.page_count == 3
+    assert [page.image_coverage for page in inspection.pages] == [0.0, 1.0, 0.0]
+    assert inspection.pages[0].text_chars == 44
+    assert inspection.ocr_pages == [2, 3]
+    assert inspection.has_text_layer
+    assert inspection.metadata == {
+        "dc:creator": "Stadt",
+        "dcterms:created": "2024-01-02T02:04:05Z",
+    }
+
+
+def test_scan_with_invisible_text_layer_has_text(tmp_path: Path) -> None:
+    path = tmp_path / "scan.pdf"
+    text = b"3 Tr BT [(Text einer frueheren Texterkennung) -250 (der Seite)] TJ ET"
+    path.write_bytes(make_pdf([SCANNED_PAGE + b" " + text * 5]))
+
+    inspection = inspect_pdf(str(path))
+
+    assert inspection is not None
+    assert inspection.ocr_pages == []
+
+
+def test_scanned_document_has_no_text_layer(tmp_path: Path) -> None:
+    path = tmp_path / "scan.pdf"
+    path.write_bytes(make_pdf([SCANNED_PAGE, SCANNED_PAGE]))
+
+    inspection = inspect_pdf(str(path))
+
+    assert inspection is not None
+    assert not inspection.has_text_layer
+    assert inspection.report() == "2 pages, 0 with text, OCR needed for pages [1, 2]"
+
+
+def test_split_pages(tmp_path: Path) -> None:
+    path = tmp_path / "anlage.pdf"
+    path.write_bytes(make_pdf([TEXT_PAGE, SCANNED_PAGE, SCANNED_PAGE]))
+
+    pages = split_pages(str(path), [2, 3])
+
+    assert list(pages) == [2, 3]
+    for number, data in pages.items():
+        page = tmp_path / f"seite{number}.pdf"
+        page.write_bytes(data)
+        inspection = inspect_pdf(str(page))
+        assert inspection is not None
+        assert inspection.ocr_pages == [1]
+
+
+def test_scan_content_follows_transformations() -> None:
+    content = b"q 2 0 0 2 0 0 cm q 10 0 0 5 0 0 cm BI /W 1 /H 1 ID \x00 EI Q Q"
+    content += b" BT <00410042> Tj (a\\)b) ' ET q 0 0 0 0 0 0 cm Q"
+
+    text_chars, image_area = scan_content(content, None)
+
+    assert image_area == 200.0
+    assert text_chars == 4 + 3
+
+
+def test_not_a_pdf(tmp_path: Path) -> None:
+    path = tmp_path / "antrag.docx"
+    path.write_bytes(b"PK\x03\x04")
+
+    assert inspect_pdf(str(path)) is None
@@ -0,0 +1,172 @@
+import random
+import re
+from typing import Any
+
+import pytest
+
+from frontend.processing.processing import (
+    FOOTER_RULES,
+    HEADER_RULES,
+    BoilerplatePattern,
+    OrganizationNormalizer,
+    process_content,
+    remove_boilerplate,
+)
+from models.models import Organization
+
+
+def test_remove_header_after_last_match() -> None:
+    content = [
+        "Sehr geehrte Frau Stadtverordnetenvorsteherin,",
+        "Einleitung",
+        "die Stadtverordnetenversammlung möge beschließen: Der Antrag wird angenommen.",
+        "Begründung",
+    ]
+
+    result = process_content(content, "Antragsvorlage")
+
+    assert result == ["Der Antrag wird angenommen.", "Begründung"]
+
+
+def test_remove_header_only_first_occurrence() -> None:
+    content = [
+        "Die Stadtverordnetenversammlung möge beschließen:",
+        "Text",
+        "die Stadtverordnetenversammlung möge beschließen: erneut",
+    ]
+
+    result = process_content(content, "Beschlussvorlage")
+
+    assert result == content[1:]
+
+
+def test_remove_footer_from_first_match() -> None:
+    content = [
+        "Text",
+        "Weiterer Text. Mit freundlichen Grüßen gez. Müller",
+        "Mit freundlichen Grüßen",
+        "Anlage",
+    ]
+
+    result = process_content(content, None)
+
+    assert result == ["Text", "Weiterer Text. "]
+
+
+def test_unknown_doc_type_keeps_header() -> None:
+    content = ["die Stadtverordnetenversammlung möge beschließen:", "Text"]
+
+    assert process_content(content, "Niederschrift") == content
+
+
+def test_remove_boilerplate_without_match() -> None:
+    content = ["Text"]
+    pattern = BoilerplatePattern([r"nicht enthalten"])
+
+    assert remove_boilerplate(content, pattern) is content
+    assert remove_boilerplate(content, pattern, from_end=True) is content
+
+
+def test_remove_boilerplate_same_line() -> None:
+    pattern = BoilerplatePattern([r"eins:\s*", r"zwei:\s*"])
+    content = ["a", "zwei: eins: b", "c"]
+
+    assert remove_boilerplate(content, pattern) == ["b", "c"]
+    assert remove_boilerplate(content, pattern, from_end=True) == ["a"]
+
+
+def remove_by_regexes(
+    content: list[str], regexes: list[str], from_end: bool = False
+) -> list[str]:
+    """The implementation before BoilerplatePattern, which scanned the content
+    once per regex, as reference for remove_boilerplate"""
+    matches = []
+    for regex in regexes:
+        for idx, line in enumerate(content):
+            res = re.search(regex, line, re.IGNORECASE)
+            if res:
+                matches.append((idx, res.start(), res.end()))
+                break
+    if len(matches) == 0:
+        return content
+    if not from_end:
+        last = max(match[0] for match in matches)
+        end = max(e for idx, _, e in matches if idx == last)
+        content = content[last:]
+        content[0] = content[0][end:]
+        if content[0].strip() == "":
+            content = content[1:]
+    else:
+        first = min(match[0] for match in matches)
+        start = min(s for idx, s, _ in matches if idx == first)
+        content = content[: first + 1]
+        content[-1] = content[-1][:start]
+        if content[-1].strip() == "":
+            content = content[:-1]
+    return content
+
+
+BOILERPLATE = [
+    "Die Stadtverordnetenversammlung möge beschließen:",
+    "Dem Magistrat wird folgende Beschlussfassung empfohlen.",
+    "Die Stadtverordnetenversammlung wird über folgendes Thema informiert:",
+    "Sehr geehrter Herr Stadtverordnetenvorsteher,",
+    "Sehr geehrte Frau Stadtverordnetenvorsteherin.",
+    "gez. Müller",
+    "Mit freundlichen Grüßen",
+    "beste Grüße",
+    "Hochachtungsvoll, ",
+]
+TEXT = "Der Magistrat wird beauftragt die Sanierung der Schule zu prüfen".split()
+
+
+def generate_document(rng: random.Random) -> list[str]:
+    """Paragraphs of a document with boilerplate at random places"""
+    paragraphs = []
+    for _ in range(rng.randint(1, 60)):
+        words = rng.choices(TEXT, k=rng.randint(0, 30))
+        for _ in range(rng.choice([0, 0, 0, 1, 2])):
+            phrase = rng.choice(BOILERPLATE)
+            phrase = phrase.upper() if rng.random() < 0.1 else phrase
+            words.insert(rng.randint(0, len(words)), phrase)
+        paragraphs.append(" ".join(words))
+    return paragraphs
+
+
+def test_remove_boilerplate_matches_previous_implementation() -> None:
+    rng = random.Random(0)
+    patterns = [
+        (regexes, BoilerplatePattern(regexes)) for regexes in HEADER_RULES.values()
+    ]
+    patterns.append((FOOTER_RULES, BoilerplatePattern(FOOTER_RULES)))
+
+    for _ in range(500):
+        content = generate_document(rng)
+        for regexes, pattern in patterns:
+            for from_end in (False, True):
+                expected = remove_by_regexes(list(content), regexes, from_end)
+                assert remove_boilerplate(list(content), pattern, from_end) == expected
+
+
+@pytest.mark.django_db
+def test_organization_normalizer(django_assert_num_queries: Any) -> None:
+    Organization.objects.create(name="SPD")
+    Organization.objects.create(name="B90/Grüne")
+    Organization.objects.create(name="Bürgermeister")
+    normalizer = OrganizationNormalizer()
+
+    with django_assert_num_queries(1):
+        for _ in range(3):
+            result = normalizer.normalize(
+                "Fraktionen SPD, Bündnis 90/Die Grünen und FDP"
+            )
+            assert result == ["SPD", "B90/Grüne"]
+        assert normalizer.normalize("Bürgermeister Müller") == ["Bürgermeister"]
+
+    assert normalizer.skipped == {"FDP": 3}
+    assert normalizer.report() == "FDP (3x)"
+
+    normalizer.reset()
+    Organization.objects.create(name="FDP")
+    assert normalizer.normalize("FDP-Fraktion") == ["FDP"]
+    assert not normalizer.skipped
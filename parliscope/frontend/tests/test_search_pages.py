@@ -0,0 +1,84 @@
+from typing import Any
+from unittest.mock import Mock
+
+import pysolr
+
+from frontend.search import solr
+
+SEARCH_RESPONSE = {
+    "responseHeader": {"QTime": 5},
+    "response": {
+        "numFound": 2,
+        "docs": [
+            {"id": "1", "document_id": 11, "doc_title": "Haushaltsplan"},
+            {"id": "2", "document_id": 12, "doc_title": "Antrag"},
+        ],
+    },
+    "highlighting": {"2": {"consultation_text": ["Antrag zum Haushalt"]}},
+    "spellcheck": {"correctlySpelled": True},
+}
+
+PAGES_RESPONSE = {
+    "responseHeader": {"QTime": 2},
+    "response": {
+        "numFound": 1,
+        "docs": [{"id": "1/page-12", "page": 12, "_root_": "1"}],
+    },
+    "highlighting": {"1/page-12": {"page_content": ["Der Haushalt 2024."]}},
+    "expanded": {
+        "1": {
+            "numFound": 2,
+            "docs": [
+                {"id": "1/page-3", "page": 3, "_root_": "1"},
+                {"id": "1/text", "_root_": "1"},
+            ],
+        }
+    },
+}
+
+
+def solr_conn(pages: Any) -> Mock:
+    def search(query: str, **args: Any) -> pysolr.Results:
+        if args["search_handler"] == "/pages":
+            if isinstance(pages, Exception):
+                raise pages
+            return pysolr.Results(pages)
+        return pysolr.Results(SEARCH_RESPONSE)
+
+    return Mock(search_handler="/select", search=Mock(side_effect=search))
+
+
+def test_results_link_to_best_matching_pages() -> None:
+    conn = solr_conn(PAGES_RESPONSE)
+
+    result = solr.search("haushalt", facet=False, spellcheck=False, solr_conn=conn)
+
+    first, second = result.documents
+    assert first.pages == [12, 3]
+    assert first.highlight == "Der Haushalt 2024."
+    assert first.file_link.endswith("getfile.asp?id=11#page=12")
+    assert [page for page, _ in first.page_links] == [12, 3]
+    # documents without matching pages keep their own highlight
+    assert second.pages == []
+    assert second.highlight == "Antrag zum Haushalt …"
+    assert second.file_link == second.download_link
+
+    _, pages_args = conn.search.call_args
+    assert pages_args["fq"] == "{!terms f=_root_}1,2"
+    assert pages_args["rows"] == 2
+
+
+def test_results_without_pages_on_errors() -> None:
+    conn = solr_conn(pysolr.SolrError("unknown handler /pages"))
+
+    result = solr.search("haushalt", facet=False, spellcheck=False, solr_conn=conn)
+
+    assert [doc.pages for doc in result.documents] == [[], []]
+
+
+def test_newest_documents_dont_search_pages() -> None:
+    conn = solr_conn(PAGES_RESPONSE)
+
+    solr.search("*", facet=False, spellcheck=False, solr_conn=conn)
+
+    assert conn.search.call_count == 1
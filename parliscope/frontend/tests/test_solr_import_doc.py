@@ -0,0 +1,118 @@
+import typing
+import xml.etree.ElementTree as ET
+from dataclasses import fields
+from datetime import UTC, datetime
+from pathlib import Path
+
+import pytest
+
+from frontend.processing.processing import (
+    Paragraph,
+    SolrImportDoc,
+    SolrPageDoc,
+    parse_pages,
+)
+
+SCHEMA_PATH = (
+    Path(__file__).resolve().parents[3]
+    / "solr"
+    / "configsets"
+    / "ris"
+    / "conf"
+    / "schema.xml"
+)
+
+
+def create_doc(**kwargs: typing.Any) -> SolrImportDoc:
+    values: dict[str, typing.Any] = {
+        "id": "1",
+        "last_analyzed": datetime(2024, 1, 2, 3, 4, 5),
+        "document_id": 11,
+        "size": 100,
+        "content_type": "application/pdf",
+        "filename": "test.pdf",
+    }
+    values.update(kwargs)
+    return SolrImportDoc(**values)
+
+
+def test_matches_schema() -> None:
+    if not SCHEMA_PATH.exists():
+        pytest.skip("Solr schema not available")
+    schema = ET.parse(SCHEMA_PATH).getroot()
+    copy_destinations = {e.get("dest") for e in schema.iter("copyField")}
+    internal_fields = {"_version_", "_root_", "_nest_path_"}
+    schema_fields = {
+        str(e.get("name")): e
+        for e in schema.iter("field")
+        if e.get("name") not in copy_destinations | internal_fields
+    }
+    # pages are nested child documents with fields of their own
+    doc_fields = {f.name: f for f in fields(SolrPageDoc)} | {
+        f.name: f for f in fields(SolrImportDoc) if f.name != "pages"
+    }
+
+    assert set(doc_fields) == set(schema_fields)
+    for name, schema_field in schema_fields.items():
+        field_type = doc_fields[name].type
+        multi_valued = schema_field.get("multiValued") == "true"
+        assert (typing.get_origin(field_type) is list) == multi_valued, name
+        # only the id is required of pages as well, the other required
+        # fields of documents are checked by SolrImportDoc
+        required = schema_field.get("required") == "true"
+        assert required == (name == "id"), name
+    assert set(SolrImportDoc.REQUIRED_FIELDS) <= set(schema_fields)
+
+
+def test_to_solr_omits_empty_fields() -> None:
+    doc = create_doc(
+        doc_title="",
+        agenda_item_text=[None, "Text"],
+        meeting_date=[datetime(2024, 5, 6, 18, 0, tzinfo=UTC)],
+    )
+
+    assert doc.to_solr() == {
+        "id": "1",
+        "last_analyzed": "2024-01-02T03:04:05Z",
+        "document_id": 11,
+        "size": 100,
+        "content_type": "application/pdf",
+        "filename": "test.pdf",
+        "agenda_item_text": ["Text"],
+        "meeting_date": ["2024-05-06T18:00:00Z"],
+        "meeting_count": 0,
+    }
+
+
+def test_missing_fields() -> None:
+    assert create_doc().missing_fields() == []
+    assert create_doc(content_type=None, filename=None).missing_fields() == [
+        "content_type",
+        "filename",
+    ]
+
+
+def test_pages_are_nested_documents() -> None:
+    doc = create_doc(
+        pages=parse_pages(
+            "1",
+            [
+                Paragraph("Haushalt", 1),
+                Paragraph("Einleitung", 1),
+                Paragraph("", 2),
+                Paragraph("Ergebnishaushalt", 3),
+            ],
+        )
+    )
+
+    assert doc.to_solr()["pages"] == [
+        {"id": "1/page-1", "page_content": "Haushalt\nEinleitung", "page": 1},
+        {"id": "1/page-3", "page_content": "Ergebnishaushalt", "page": 3},
+    ]
+
+
+def test_text_without_page_numbers_is_a_single_page() -> None:
+    pages = parse_pages("1", [Paragraph("Eins"), Paragraph("Zwei")])
+
+    assert pages == [SolrPageDoc(id="1/text", page_content="Eins\nZwei")]
+    assert pages[0].to_solr() == {"id": "1/text", "page_content": "Eins\nZwei"}
@@ -0,0 +1,166 @@
+import json
+import logging
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pysolr
+import pytest
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, override_settings
+
+from frontend import tracing
+from frontend.middleware import TracingMiddleware
+
+SOLR_RESPONSE = {
+    "responseHeader": {"QTime": 7},
+    "response": {
+        "numFound": 1,
+        "docs": [
+            {
+                "id": "1",
+                "document_id": 1,
+                "doc_type": "Anlage",
+                "doc_title": "Haushalt",
+                "filename": "haushalt.pdf",
+            }
+        ],
+    },
+    "facet_counts": {"facet_fields": {"doc_type": ["Anlage", 1]}},
+    "highlighting": {},
+    "spellcheck": {"correctlySpelled": True},
+}
+
+PAGES_RESPONSE = {
+    "responseHeader": {"QTime": 3},
+    "response": {
+        "numFound": 1,
+        "docs": [{"id": "1/page-4", "page": 4, "_root_": "1"}],
+    },
+    "highlighting": {"1/page-4": {"page_content": ["Der <strong>Haushalt</strong>"]}},
+}
+
+
+def test_spans_are_nested() -> None:
+    with tracing.start_trace() as trace:
+        with tracing.span("outer"):
+            with tracing.span("inner", key="value"):
+                tracing.set_attributes(extra=1)
+
+    inner, outer = trace.spans
+    assert inner.parent_id == outer.span_id
+    assert outer.parent_id is None
+    assert inner.attributes == {"key": "value", "extra": 1}
+    assert trace.root is outer
+    assert list(trace.durations()) == ["inner"]
+
+
+def test_span_outside_of_trace() -> None:
+    with tracing.span("noop") as span:
+        tracing.set_attributes(ignored=True)
+    assert span is None
+
+
+def test_span_records_errors() -> None:
+    with tracing.start_trace() as trace:
+        with pytest.raises(ValueError), tracing.span("failing"):
+            raise ValueError()
+    assert trace.spans[0].error
+    assert trace.spans[0].to_otlp()["status"] == {"code": 2}
+
+
+def test_traceparent_is_continued() -> None:
+    trace = tracing.Trace("00-" + "a" * 32 + "-" + "b" * 16 + "-01")
+    assert trace.trace_id == "a" * 32
+    assert trace.parent_id == "b" * 16
+    assert trace.sampled
+
+    with override_settings(TRACING_SAMPLE_RATE=1.0):
+        assert not tracing.Trace("00-" + "a" * 32 + "-" + "b" * 16 + "-00").sampled
+        assert tracing.Trace("invalid").sampled
+
+
+def test_continued_request_span_is_server_span() -> None:
+    traceparent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+    request = RequestFactory().get("/search", HTTP_TRACEPARENT=traceparent)
+    middleware = TracingMiddleware(lambda request: HttpResponse())
+
+    with patch.object(tracing, "finish_trace") as finish_trace:
+        middleware(request)
+
+    trace = finish_trace.call_args.args[0]
+    root = trace.root.to_otlp()
+    assert root["name"] == "http.request"
+    assert root["kind"] == tracing.SPAN_KIND_SERVER
+    assert root["traceId"] == "a" * 32
+    assert root["parentSpanId"] == "b" * 16
+
+
+@pytest.mark.django_db
+@patch("frontend.search.solr.solr_connection")
+def test_search_request_is_traced(
+    mock_connection: Mock,
+    client: Client,
+    tmp_path: Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    solr_conn = Mock(search_handler="/select")
+    solr_conn.search.side_effect = lambda query, **args: pysolr.Results(
+        PAGES_RESPONSE if args["search_handler"] == "/pages" else SOLR_RESPONSE
+    )
+    mock_connection.return_value = solr_conn
+    export_file = tmp_path / "traces.jsonl"
+
+    with (
+        override_settings(
+            TRACING_EXPORT_FILE=str(export_file),
+            TRACING_SAMPLE_RATE=1.0,
+            TRACING_SLOW_REQUEST_MS=0,
+        ),
+        patch.object(tracing, "_exporters", None),
+        caplog.at_level(logging.WARNING, logger="frontend.tracing"),
+    ):
+        response = client.get("/search", {"query": "haushalt"})
+
+    assert response.status_code == 200
+    timings = response["Server-Timing"]
+    for name in [
+        "solr.search",
+        "solr.parse_results",
+        "solr.parse_pages",
+        "solr.parse_facets",
+        "solr.parse_spellcheck",
+        "db.query_log",
+        "render",
+        "total",
+    ]:
+        assert f"{name};dur=" in timings
+    # summed over the search and the pages request
+    assert 'solr.qtime;dur=10;desc="Solr QTime"' in timings
+
+    # exported as OTLP/JSON
+    spans = json.loads(export_file.read_text())["resourceSpans"][0]["scopeSpans"][0][
+        "spans"
+    ]
+    root = spans[-1]
+    assert root["name"] == "http.request"
+    assert root["kind"] == tracing.SPAN_KIND_SERVER
+    assert {"key": "http.response.status_code", "value": {"intValue": "200"}} in root[
+        "attributes"
+    ]
+    assert all(span["traceId"] == root["traceId"] for span in spans)
+
+    # slow request log
+    assert "Slow request GET /search?query=haushalt" in caplog.text
+
+
+def test_solr_response_hook_records_size() -> None:
+    from frontend.search.utils import _trace_response
+
+    response = Mock(status_code=200, content=b"12345")
+    response.elapsed.total_seconds.return_value = 0.01
+    with tracing.start_trace() as trace:
+        with tracing.span("solr.search"):
+            _trace_response(response)
+
+    assert trace.spans[0].attributes["http.response.body.size"] == 5
+    assert trace.spans[0].attributes["solr.network_ms"] == 10
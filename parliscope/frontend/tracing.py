@@ -0,0 +1,287 @@
+"""Lightweight request tracing for the web tier.
+
+Spans follow the OpenTelemetry data model (W3C trace context ids, nanosecond
+timestamps, attributes) and are exported as OTLP/JSON, either appended to a
+file (`TRACING_EXPORT_FILE`) or posted to an OTLP/HTTP collector
+(`TRACING_OTLP_ENDPOINT`, e.g. http://localhost:4318/v1/traces).
+"""
+
+import json
+import logging
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = "parliscope"
+
+# W3C traceparent header: version-trace_id-parent_id-flags
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+@dataclass(slots=True)
+class Span:
+    """A timed operation within a trace"""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: bool = False
+    kind: int = SPAN_KIND_INTERNAL
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict[str, Any]:
+        """Span in the OTLP/JSON encoding"""
+        otlp: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2 if self.error else 0},
+        }
+        if self.parent_id:
+            otlp["parentSpanId"] = self.parent_id
+        return otlp
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Trace:
+    """The spans of a single request"""
+
+    def __init__(self, traceparent: str | None = None) -> None:
+        self.parent_id: str | None = None
+        sampled = None
+        found = TRACEPARENT.match(traceparent or "")
+        if found:
+            self.trace_id, self.parent_id, flags = found.groups()
+            sampled = int(flags, 16) & 1 == 1
+        else:
+            self.trace_id = secrets.token_hex(16)
+
+        # follow the sampling decision of the caller
+        if sampled is None:
+            sampled = random.random() < getattr(settings, "TRACING_SAMPLE_RATE", 1.0)
+        self.sampled = sampled
+        self.spans: list[Span] = []
+        self.stack: list[Span] = []
+
+    @property
+    def root(self) -> Span | None:
+        return self.spans[-1] if self.spans else None
+
+    def durations(self) -> dict[str, float]:
+        """Total duration in ms per span name, excluding the root span"""
+        durations: dict[str, float] = defaultdict(float)
+        for span in self.spans:
+            if span is not self.root:
+                durations[span.name] += span.duration_ms
+        return durations
+
+    def server_timing(self) -> str:
+        """Value of the Server-Timing header"""
+        timings = [
+            f"{name};dur={duration:.1f}" for name, duration in self.durations().items()
+        ]
+        qtime = sum(
+            qtime
+            for span in self.spans
+            if isinstance(qtime := span.attributes.get("solr.qtime"), int)
+        )
+        if qtime:
+            timings.append(f'solr.qtime;dur={qtime};desc="Solr QTime"')
+        if self.root:
+            timings.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(timings)
+
+    def to_otlp(self) -> dict[str, Any]:
+        """ExportTraceServiceRequest in the OTLP/JSON encoding"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {"key": "service.name", "value": _otlp_value(SERVICE_NAME)}
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def start_trace(traceparent: str | None = None) -> Iterator[Trace]:
+    """Collects the spans created in this context into a new trace"""
+    trace = Trace(traceparent)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(
+    name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any
+) -> Iterator[Span | None]:
+    """Times an operation as a span of the current trace. The span handling
+    the request is opened with kind SPAN_KIND_SERVER.
+
+    Outside of a trace (e.g. in Celery tasks), nothing is recorded."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parent_id = trace.stack[-1].span_id if trace.stack else trace.parent_id
+    current = Span(
+        name,
+        trace.trace_id,
+        secrets.token_hex(8),
+        parent_id,
+        time.time_ns(),
+        attributes=attributes,
+        kind=kind,
+    )
+    trace.stack.append(current)
+    try:
+        yield current
+    except Exception:
+        current.error = True
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        trace.stack.pop()
+        trace.spans.append(current)
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Sets attributes on the innermost open span of the current trace"""
+    trace = _current_trace.get()
+    if trace is not None and trace.stack:
+        trace.stack[-1].attributes.update(attributes)
+
+
+class FileExporter:
+    """Appends traces as OTLP/JSON lines to a file"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_otlp())
+        with self.lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class OTLPExporter:
+    """Posts traces to an OTLP/HTTP collector from a background thread,
+    so that requests never wait for the collector"""
+
+    MAX_QUEUE_SIZE = 1000
+
+    def __init__(self, endpoint: str) -> None:
+        self.endpoint = endpoint
+        self.queue: queue.Queue[dict[str, Any]] = queue.Queue(self.MAX_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def export(self, trace: Trace) -> None:
+        try:
+            self.queue.put_nowait(trace.to_otlp())
+        except queue.Full:
+            logger.debug("Trace export queue is full, dropping trace")
+
+    def _run(self) -> None:
+        session = requests.Session()
+        while True:
+            payload = self.queue.get()
+            try:
+                session.post(self.endpoint, json=payload, timeout=5)
+            except requests.RequestException as e:
+                logger.debug(f"Failed to export trace to {self.endpoint}: {e}")
+
+
+_exporters: list[FileExporter | OTLPExporter] | None = None
+
+
+def get_exporters() -> list[FileExporter | OTLPExporter]:
+    """Exporters configured in the settings (created on first use)"""
+    global _exporters
+    if _exporters is None:
+        _exporters = []
+        path = getattr(settings, "TRACING_EXPORT_FILE", None)
+        if path:
+            _exporters.append(FileExporter(path))
+        endpoint = getattr(settings, "TRACING_OTLP_ENDPOINT", None)
+        if endpoint:
+            _exporters.append(OTLPExporter(endpoint))
+    return _exporters
+
+
+def finish_trace(trace: Trace, description: str) -> None:
+    """Exports a sampled trace and logs a sample of slow requests"""
+    if trace.sampled:
+        for exporter in get_exporters():
+            exporter.export(trace)
+
+    root = trace.root
+    threshold = getattr(settings, "TRACING_SLOW_REQUEST_MS", 1000)
+    if root is None or root.duration_ms < threshold:
+        return
+    if random.random() < getattr(settings, "TRACING_SLOW_REQUEST_SAMPLE_RATE", 1.0):
+        breakdown = ", ".join(
+            f"{name}={duration:.0f}ms" for name, duration in trace.durations().items()
+        )
+        logger.warning(
+            f"Slow request {description} took {root.duration_ms:.0f}ms "
+            f"({breakdown}) trace_id={trace.trace_id}"
+        )
@@ -6,6 +6,7 @@ from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect, render
 from django.views.generic import TemplateView
 
+from . import tracing
 from .models import Query
 from .search import solr
 
@@ -52,16 +53,19 @@ class MainView(TemplateView):
                 sort,
                 facet_filter={"doc_type": doc_type, "organization": organization},
             )
-            Query(
-                query=query,
-                user=request.user.username if request.user.is_authenticated else None,
-                organization=organization,
-                doc_type=doc_type,
-                sort=sort.value,
-                page=page,
-                num_results=result.hits,
-                query_time=result.qtime,
-            ).save()  # Query log
+            with tracing.span("db.query_log"):
+                Query(
+                    query=query,
+                    user=request.user.username
+                    if request.user.is_authenticated
+                    else None,
+                    organization=organization,
+                    doc_type=doc_type,
+                    sort=sort.value,
+                    page=page,
+                    num_results=result.hits,
+                    query_time=result.qtime,
+                ).save()  # Query log
         else:
             context["num_docs"] = solr.count("*:*")
             result = solr.doc_id("*:*", limit=5)
@@ -72,7 +76,8 @@ class MainView(TemplateView):
         context["sort"] = sort.value
         context["result"] = result
         context["autofocus"] = self.autofocus
-        return render(request, self.template_name, context=context)
+        with tracing.span("render"):
+            return render(request, self.template_name, context=context)
 
 
 class SearchView(MainView):
@@ -108,12 +113,13 @@ class SuggestView(TemplateView):
         else:
             status = 404
 
-        return render(
-            request,
-            self.template_name,
-            context={"suggestions": suggestions},
-            status=status,
-        )
+        with tracing.span("render"):
+            return render(
+                request,
+                self.template_name,
+                context={"suggestions": suggestions},
+                status=status,
+            )
 
 
 def error_handler(request: HttpRequest, code: int, message: str) -> HttpResponse:
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.cache import cache
+from health_check.backends import BaseHealthCheckBackend
+
+
+class CachedHealthCheckBackend(BaseHealthCheckBackend):
+    """Probes a service with a timeout and caches the result for
+    HEALTHCHECK_CACHE_SECONDS, so that frequent polling of /healthcheck
+    doesn't reach the service on every request."""
+
+    @property
+    def timeout(self) -> float:
+        return float(getattr(settings, "HEALTHCHECK_TIMEOUT", 3))
+
+    def run_check(self) -> None:
+        key = f"healthcheck:{self.identifier()}"
+        cached = cache.get(key)
+        if cached is not None:
+            errors, self.time_taken = cached
+            # exceptions can't be pickled, store their type and message
+            self.errors = [error_type(message) for error_type, message in errors]
+            return
+
+        super().run_check()
+        errors = [(type(error), str(error.message)) for error in self.errors]
+        ttl = getattr(settings, "HEALTHCHECK_CACHE_SECONDS", 30)
+        if ttl > 0:
+            cache.set(key, (errors, self.time_taken), ttl)
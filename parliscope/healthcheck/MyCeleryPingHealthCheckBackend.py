@@ -1,12 +1,13 @@
 from celery.app import app_or_default  # type: ignore
-from health_check.backends import BaseHealthCheckBackend
 from health_check.exceptions import ServiceUnavailable
 
+from healthcheck.CachedHealthCheckBackend import CachedHealthCheckBackend
+
 
 # This health check was copied from:
 # https://github.com/revsys/django-health-check/blob/master/health_check/contrib/celery_ping/backends.py
 # and modified to use app_or_default() instead of default_app to get the current Celery app.
-class MyCeleryPingHealthCheckBackend(BaseHealthCheckBackend):
+class MyCeleryPingHealthCheckBackend(CachedHealthCheckBackend):
     critical_service = True
     CORRECT_PING_RESPONSE = {"ok": "pong"}
 
@@ -16,7 +17,7 @@ class MyCeleryPingHealthCheckBackend(BaseHealthCheckBackend):
     def check_status(self) -> None:
         app = app_or_default()
         try:
-            ping_result: list[dict] | None = app.control.ping(timeout=3)
+            ping_result: list[dict] | None = app.control.ping(timeout=self.timeout)
         except OSError as e:
             self.add_error(ServiceUnavailable("IOError"), e)
         except NotImplementedError as exc:
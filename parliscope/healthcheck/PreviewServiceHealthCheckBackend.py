@@ -1,11 +1,12 @@
 import urllib.request
 
 from django.conf import settings
-from health_check.backends import BaseHealthCheckBackend
 from health_check.exceptions import ServiceUnavailable
 
+from healthcheck.CachedHealthCheckBackend import CachedHealthCheckBackend
 
-class PreviewServiceHealthCheckBackend(BaseHealthCheckBackend):
+
+class PreviewServiceHealthCheckBackend(CachedHealthCheckBackend):
     critical_service = True
 
     def identifier(self) -> str:
@@ -14,7 +15,7 @@ class PreviewServiceHealthCheckBackend(BaseHealthCheckBackend):
     def check_status(self) -> None:
         url = self._get_healthcheck_url()
         try:
-            r = urllib.request.urlopen(url)
+            r = urllib.request.urlopen(url, timeout=self.timeout)
             if r.status != 200:
                 raise ServiceUnavailable(f"Unavailable (status={r.status})")
 
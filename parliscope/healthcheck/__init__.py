@@ -1,3 +1,4 @@
+from .CachedHealthCheckBackend import CachedHealthCheckBackend
 from .GotenbergHealthCheckBackend import GotenbergHealthCheckBackend
 from .MyCeleryPingHealthCheckBackend import MyCeleryPingHealthCheckBackend
 from .PDFActHealthCheckBackend import PDFActHealthCheckBackend
@@ -6,6 +7,7 @@ from .SolrHealthCheckBackend import SolrHealthCheckBackend
 from .TikaHealthCheckBackend import TikaHealthCheckBackend
 
 __all__ = [
+    "CachedHealthCheckBackend",
     "GotenbergHealthCheckBackend",
     "PDFActHealthCheckBackend",
     "PreviewServiceHealthCheckBackend",
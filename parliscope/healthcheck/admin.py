@@ -1,4 +1,5 @@
 import logging
+from itertools import cycle
 from typing import Any
 
 from django.contrib import admin
@@ -7,53 +8,152 @@ from django.http import HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.urls import path
 
-from frontend.search.utils import solr_connection
-from models.models import Document
+from models.models import IndexHealthSnapshot
+from parliscope.tasks.index_health import recent_snapshots
+from parliscope.tasks.metrics import last_indexing_run
+from parliscope.tasks.reconcile import last_reconciliation
 
 logger = logging.getLogger(__name__)
 
+FAILED_ANALYSIS_STEPS = ["convert", "pdfact", "ocr", "preview"]
+
+CHART_WIDTH = 600
+CHART_HEIGHT = 120
+CHART_COLORS = ["#417690", "#ba2121", "#e8a33d", "#5b8a3c", "#7a5195"]
+
 
 def get_detailed_system_health() -> dict:
-    """Get system health information"""
+    """Get system health information from the latest index health snapshot
+    (see parliscope/tasks/index_health.py), without querying Solr"""
     health_data: dict[str, Any] = {}
 
-    # Database document count
-    try:
-        db_document_count = Document.objects.count()
-        health_data["database_document_count"] = db_document_count
-        health_data["database_available"] = True
-    except Exception as e:
-        logger.error(f"Error accessing database: {e}")
-        health_data["database_document_count"] = 0
-        health_data["database_available"] = False
-        health_data["database_error"] = str(e)
-
-    # Solr document count
     try:
-        solr_conn = solr_connection()
-        stats_query = solr_conn.search("*:*", rows=0)
-        health_data["solr_document_count"] = stats_query.hits
-        health_data["solr_available"] = True
+        snapshots = recent_snapshots()
+        snapshot = snapshots[-1] if snapshots else IndexHealthSnapshot.objects.latest()
+    except IndexHealthSnapshot.DoesNotExist:
+        snapshot = None
     except Exception as e:
-        logger.error(f"Error connecting to Solr: {e}")
-        health_data["solr_document_count"] = 0
-        health_data["solr_available"] = False
-        health_data["solr_error"] = str(e)
+        logger.error(f"Error reading index health snapshots: {e}")
+        snapshots, snapshot = [], None
+    health_data["snapshot"] = snapshot
 
     # Sync status
-    if health_data["database_available"] and health_data["solr_available"]:
-        db_count = health_data["database_document_count"]
-        solr_count = health_data["solr_document_count"]
+    if snapshot is not None and snapshot.solr_documents is not None:
+        difference = snapshot.solr_documents - snapshot.database_documents
         health_data["sync_status"] = {
-            "in_sync": db_count == solr_count,
-            "difference": solr_count - db_count,
+            "in_sync": difference == 0,
+            "difference": difference,
         }
+        for row in snapshot.doc_types:
+            row["difference"] = row["solr"] - row["database"]
     else:
         health_data["sync_status"] = {"in_sync": False, "difference": 0}
 
+    health_data["history"] = {
+        "charts": [
+            line_chart(
+                {
+                    "Database": [s.database_documents for s in snapshots],
+                    "Search Index": [s.solr_documents for s in snapshots],
+                }
+            ),
+            line_chart(
+                {
+                    "Without Content": [s.documents_without_content for s in snapshots],
+                    **{
+                        f"Failed {step}": [
+                            s.failed_analysis.get(step, 0) for s in snapshots
+                        ]
+                        for step in FAILED_ANALYSIS_STEPS
+                    },
+                }
+            ),
+        ],
+        "start": snapshots[0].created_at if snapshots else None,
+        "end": snapshots[-1].created_at if snapshots else None,
+    }
+
+    # Exact differences found by the last reconciliation
+    try:
+        health_data["reconciliation"] = last_reconciliation()
+    except Exception as e:
+        logger.error(f"Error reading reconciliation result: {e}")
+        health_data["reconciliation"] = None
+
+    # Metrics of the last indexing run
+    try:
+        health_data["indexing"] = get_indexing_overview()
+    except Exception as e:
+        logger.error(f"Error reading indexing metrics: {e}")
+        health_data["indexing"] = None
+
     return health_data
 
 
+def line_chart(series: dict[str, list[int | None]]) -> dict[str, Any]:
+    """Points of SVG polylines of the series, scaled to their common maximum.
+    Missing values (None) are left out."""
+    top = max((v for values in series.values() for v in values if v), default=0)
+    length = max((len(values) for values in series.values()), default=0)
+    step = CHART_WIDTH / max(length - 1, 1)
+    lines = []
+    for (name, values), color in zip(series.items(), cycle(CHART_COLORS)):
+        points = " ".join(
+            f"{i * step:.1f},{CHART_HEIGHT - (v / top if top else 0) * CHART_HEIGHT:.1f}"
+            for i, v in enumerate(values)
+            if v is not None
+        )
+        lines.append(
+            {
+                "name": name,
+                "color": color,
+                "points": points,
+                "last": values[-1] if values else None,
+            }
+        )
+    return {"width": CHART_WIDTH, "height": CHART_HEIGHT, "max": top, "lines": lines}
+
+
+def get_indexing_overview() -> dict[str, Any] | None:
+    """Stage timings and cache hit rates of the last indexing run"""
+    last_run = last_indexing_run()
+    if last_run is None:
+        return None
+
+    metrics = last_run["metrics"]
+    total_seconds = sum(stats["seconds"] for stats in metrics["stages"].values())
+    stages = [
+        {
+            "name": name,
+            **stats,
+            "mean_seconds": stats["seconds"] / stats["calls"] if stats["calls"] else 0,
+            "share": 100 * stats["seconds"] / total_seconds if total_seconds else 0,
+        }
+        for name, stats in metrics["stages"].items()
+    ]
+    stages.sort(key=lambda stage: -stage["seconds"])
+    caches = [
+        {
+            "name": name,
+            **results,
+            "hit_rate": 100 * results["hit"] / (results["hit"] + results["miss"])
+            if results["hit"] + results["miss"]
+            else 0,
+        }
+        for name, results in sorted(metrics["cache"].items())
+    ]
+    return {
+        **last_run,
+        "duration": metrics["duration"],
+        "documents": metrics["documents"],
+        "failed_documents": metrics["failed_documents"],
+        "bytes": metrics["bytes"],
+        "stages": stages,
+        "caches": caches,
+        "slowest_documents": metrics["slowest_documents"],
+    }
+
+
 @staff_member_required
 def system_health_view(request: HttpRequest) -> HttpResponse:
     """Dedicated system health monitoring page"""
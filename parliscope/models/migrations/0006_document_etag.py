@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0005_alter_document_last_modified'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='etag',
+            field=models.TextField(null=True),
+        ),
+    ]
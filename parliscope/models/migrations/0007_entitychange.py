@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0006_document_etag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EntityChange',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('entity_type', models.TextField()),
+                ('entity_id', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'entity_changes',
+            },
+        ),
+    ]
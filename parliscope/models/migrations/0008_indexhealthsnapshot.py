@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('models', '0007_entitychange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexHealthSnapshot',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('duration', models.FloatField(default=0)),
+                ('database_documents', models.IntegerField()),
+                ('solr_documents', models.IntegerField(null=True)),
+                ('documents_without_content', models.IntegerField(null=True)),
+                ('failed_analysis', models.JSONField(default=dict)),
+                ('doc_types', models.JSONField(default=list)),
+                ('cache_files', models.IntegerField(default=0)),
+                ('cache_bytes', models.BigIntegerField(default=0)),
+                ('last_index_run', models.DateTimeField(null=True)),
+                ('errors', models.JSONField(default=list)),
+            ],
+            options={
+                'db_table': 'index_health_snapshots',
+                'get_latest_by': 'created_at',
+            },
+        ),
+    ]
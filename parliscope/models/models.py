@@ -56,6 +56,7 @@ class Document(BaseModel):
     size = models.IntegerField()
     title = models.TextField(null=True)
     checksum = models.TextField()
+    etag = models.TextField(null=True)
 
 
 class Consultation(BaseModel):
@@ -104,3 +105,49 @@ class AgendaItem(BaseModel):
     consultation = models.ForeignKey(
         Consultation, null=True, on_delete=models.CASCADE, db_constraint=False
     )
+
+
+class EntityChange(models.Model):
+    """Outbox of entities changed by the scraper.
+    Entries are consumed by the indexer to re-index the affected documents."""
+
+    class Meta:
+        db_table = "entity_changes"
+
+    DOCUMENT = "document"
+    # the document was linked to a meeting, consultation or agenda item, its
+    # file is unchanged
+    DOCUMENT_RELATIONS = "document_relations"
+    MEETING = "meeting"
+    CONSULTATION = "consultation"
+    AGENDA_ITEM = "agenda_item"
+
+    id = models.AutoField(primary_key=True)
+    entity_type = models.TextField()
+    entity_id = models.IntegerField()  # SessionNet id of the entity
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class IndexHealthSnapshot(models.Model):
+    """Statistics of the Solr index compared to the database, computed
+    periodically by the update_index_health task for the admin health page."""
+
+    class Meta:
+        db_table = "index_health_snapshots"
+        get_latest_by = "created_at"
+
+    id = models.AutoField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    duration = models.FloatField(default=0)  # seconds to compute the snapshot
+    database_documents = models.IntegerField()
+    # Solr statistics are null if Solr was unavailable (see errors)
+    solr_documents = models.IntegerField(null=True)
+    documents_without_content = models.IntegerField(null=True)
+    # documents per failed analysis step (convert, pdfact, ocr, preview)
+    failed_analysis = models.JSONField(default=dict)
+    # [{"doc_type": ..., "database": ..., "solr": ...}]
+    doc_types = models.JSONField(default=list)
+    cache_files = models.IntegerField(default=0)
+    cache_bytes = models.BigIntegerField(default=0)
+    last_index_run = models.DateTimeField(null=True)  # last successful indexing task
+    errors = models.JSONField(default=list)
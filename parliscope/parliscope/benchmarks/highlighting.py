@@ -0,0 +1,115 @@
+import statistics
+from dataclasses import dataclass, field
+from typing import Any
+
+import pysolr
+
+from frontend.search import solr
+from frontend.search.utils import solr_connection
+
+QUERIES = ["Haushalt", "Bebauungsplan", "Stadtverordnetenversammlung", "Satzung"]
+
+# offset source of the large highlight fields: "analysis" analyzes the stored
+# text of each hit (as without stored offsets), "offsets" lets Solr use the
+# offsets stored in the index
+VARIANTS: dict[str, dict[str, str]] = {
+    "analysis": {"hl.offsetSource": "ANALYSIS"},
+    "offsets": {},
+}
+
+
+@dataclass
+class HighlightResult:
+    name: str
+    variant: str
+    highlight: list[float] = field(default_factory=list)  # ms in the highlighter
+    qtime: list[float] = field(default_factory=list)
+
+    def report(self) -> str:
+        durations = sorted(self.highlight)
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        return (
+            f"{self.name} [{self.variant}]: highlight mean "
+            f"{statistics.mean(durations):.2f} ms, median "
+            f"{statistics.median(durations):.2f} ms, p95 {p95:.2f} ms, "
+            f"QTime mean {statistics.mean(self.qtime):.2f} ms "
+            f"({len(durations)} requests)"
+        )
+
+
+def largest_documents(solr_conn: pysolr.Solr, count: int) -> list[str]:
+    """Ids of the documents with the largest files"""
+    result = solr_conn.search("*:*", fl="id", sort="size desc", rows=count)
+    return [doc["id"] for doc in result.docs]
+
+
+def highlight_requests(ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Highlighting requests restricted to the given documents: the content
+    of whole documents and the best matching pages (see search_pages)"""
+    terms = ",".join(ids)
+    return {
+        "content": {
+            **solr.HL_ARGS,
+            **solr.highlight_fields("content"),
+            "search_handler": "/select",
+            "fq": "{!terms f=id}" + terms,
+            "rows": len(ids),
+        },
+        "pages": {
+            **solr.PAGE_ARGS,
+            "fq": "{!terms f=_root_}" + terms,
+            "rows": len(ids),
+        },
+    }
+
+
+def run_highlight_benchmark(
+    documents: int = 10,
+    iterations: int = 20,
+    queries: list[str] | None = None,
+    solr_conn: pysolr.Solr | None = None,
+) -> list[HighlightResult]:
+    """Measures the time Solr spends highlighting the largest documents of the
+    live core per request, with and without the offsets stored in the index.
+    The variants alternate, so that they see the same cache state."""
+    solr_conn = solr_conn or solr_connection()
+    ids = largest_documents(solr_conn, documents)
+    results: list[HighlightResult] = []
+    for name, args in highlight_requests(ids).items():
+        by_variant = {variant: HighlightResult(name, variant) for variant in VARIANTS}
+        for _ in range(iterations):
+            for query in queries or QUERIES:
+                for variant, variant_args in VARIANTS.items():
+                    response = solr_conn.search(
+                        query,
+                        **{
+                            **args,
+                            **variant_args,
+                            "debug": "timing",
+                            "facet": "false",
+                            "spellcheck": "false",
+                        },
+                    )
+                    timing = response.debug["timing"]["process"]
+                    result = by_variant[variant]
+                    result.highlight.append(float(timing["highlight"]["time"]))
+                    result.qtime.append(float(response.qtime or 0))
+        results += by_variant.values()
+    return results
+
+
+def compare(results: list[HighlightResult]) -> list[str]:
+    """Highlighting time with stored offsets relative to analysis per request"""
+    means = {
+        (result.name, result.variant): statistics.mean(result.highlight)
+        for result in results
+    }
+    lines = []
+    for name in dict.fromkeys(result.name for result in results):
+        analysis, offsets = means[(name, "analysis")], means[(name, "offsets")]
+        if analysis > 0:
+            lines.append(
+                f"{name}: offsets take {offsets / analysis * 100:.0f}% of the "
+                f"highlighting time of analysis"
+            )
+    return lines
@@ -0,0 +1,322 @@
+import os
+import random
+import resource
+import tempfile
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from time import perf_counter
+from typing import Any
+from unittest.mock import patch
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+
+from frontend.processing import external_services
+from frontend.tests.pdf_factory import SCANNED_PAGE, TEXT_PAGE, make_pdf
+from models.models import AgendaItem, Consultation, Document, Meeting, Organization
+from parliscope.benchmarks.services import (
+    SCANNED_MARKER,
+    ServiceLatency,
+    StandInServices,
+    run_stand_in_services,
+)
+from parliscope.benchmarks.timing import StageTimer
+from parliscope.tasks import indexing
+from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.solr_writer import SolrBulkWriter
+
+COMMITTEES = [
+    "Stadtverordnetenversammlung",
+    "Haupt- und Finanzausschuss",
+    "Bau-, Umwelt- und Verkehrsausschuss",
+    "Sozial-, Kultur- und Sportausschuss",
+]
+PARTIES = ["SPD", "CDU", "B90/Grüne", "FDP"]
+CONSULTATION_TYPES = ["Beschlussvorlage", "Informationsvorlage", "Antragsvorlage"]
+# pages of the documents of the corpus, the last page of a mixed document is a scan
+PAGES = 4
+
+# timed stages of the indexing pipeline (stage -> function in the indexing module),
+# tika calls are timed as "tika" and "tika_ocr"
+STAGES = {
+    "convert": "convert_to_pdf",
+    "inspect": "inspect_pdf",
+    "pdfact": "analyze_document_pdfact",
+    "tika_ocr": "ocr_pages_tika",
+    "preview": "get_preview_image_for_doc",
+    "relations": "get_relevant_events",
+    "parse": "parse_solr_document",
+}
+
+
+def create_corpus(
+    documents: int,
+    document_store: str,
+    scanned_every: int = 20,
+    office_every: int = 10,
+    seed: int = 0,
+    mixed_every: int = 5,
+) -> None:
+    """Creates a synthetic corpus of documents with meetings, consultations and
+    agenda items in the database and the document files in the document store.
+    Every `scanned_every`th document has no text layer (OCR of all pages), every
+    `mixed_every`th other document has a scanned page (OCR of that page) and
+    every `office_every`th document is an office document (conversion path)."""
+    rng = random.Random(seed)
+
+    organizations = Organization.objects.bulk_create(
+        Organization(organization_id=i, name=name)
+        for i, name in enumerate(COMMITTEES + PARTIES)
+    )
+    committees = organizations[: len(COMMITTEES)]
+
+    start = datetime(2020, 1, 1, 18, tzinfo=UTC)
+    meetings = Meeting.objects.bulk_create(
+        Meeting(
+            meeting_id=i,
+            title=f"{i}. Sitzung",
+            title_short=f"S-{i}",
+            date=start + timedelta(days=7 * i),
+            organization=rng.choice(committees),
+        )
+        for i in range(max(1, documents // 10))
+    )
+
+    consultations = []
+    for i in range(max(1, documents // 3)):
+        consultation_type = rng.choice(CONSULTATION_TYPES)
+        topic = f"Vorlage {i}"
+        if consultation_type == "Antragsvorlage":
+            parties = " und ".join(rng.sample(PARTIES, rng.randint(1, 2)))
+            topic = f'"Antrag {i}", Antrag der Fraktionen {parties}'
+        consultations.append(
+            Consultation(
+                consultation_id=i,
+                name=f"V-{i}",
+                topic=topic,
+                type=consultation_type,
+                text=f"Text der Vorlage {i}",
+            )
+        )
+    consultations = Consultation.objects.bulk_create(consultations)
+
+    agenda_items: list[AgendaItem] = []
+    meeting_consultations = []
+    for consultation in consultations:
+        for meeting in rng.sample(meetings, min(len(meetings), rng.randint(1, 2))):
+            agenda_items.append(
+                AgendaItem(
+                    agenda_item_id=len(agenda_items),
+                    title=f"TOP {len(agenda_items)}: {consultation.topic}",
+                    meeting=meeting,
+                    consultation=consultation,
+                )
+            )
+            meeting_consultations.append(
+                Meeting.consultations.through(
+                    meeting_id=meeting.id, consultation_id=consultation.id
+                )
+            )
+    agenda_items = AgendaItem.objects.bulk_create(agenda_items)
+    Meeting.consultations.through.objects.bulk_create(
+        meeting_consultations, ignore_conflicts=True
+    )
+
+    os.makedirs(document_store, exist_ok=True)
+    docs = []
+    for i in range(documents):
+        office = office_every > 0 and i % office_every == office_every - 1
+        uri = f"{i}.docx" if office else f"{i}.pdf"
+        if scanned_every > 0 and i % scanned_every == scanned_every - 1:
+            # the stand-in services return no text for documents with the marker
+            content = make_pdf(
+                [SCANNED_PAGE] * PAGES, {"/Keywords": SCANNED_MARKER.decode()}
+            )
+        elif mixed_every > 0 and i % mixed_every == mixed_every - 1:
+            content = make_pdf([TEXT_PAGE] * (PAGES - 1) + [SCANNED_PAGE])
+        else:
+            content = make_pdf([TEXT_PAGE] * PAGES)
+        with open(os.path.join(document_store, uri), "wb") as f:
+            f.write(content)
+        docs.append(
+            Document(
+                document_id=i,
+                file_name=uri,
+                uri=uri,
+                content_type=(
+                    "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+                    if office
+                    else "application/pdf"
+                ),
+                size=len(content),
+                title=f"Dokument {i}",
+                checksum=str(i),
+            )
+        )
+    docs = Document.objects.bulk_create(docs)
+
+    # documents belong to a consultation, a meeting or an agenda item
+    consultation_documents = []
+    meeting_documents = []
+    agenda_item_documents = []
+    for doc in docs:
+        relation = rng.random()
+        if relation < 0.7:
+            consultation_documents.append(
+                Consultation.documents.through(
+                    consultation_id=rng.choice(consultations).id, document_id=doc.id
+                )
+            )
+        elif relation < 0.9:
+            meeting_documents.append(
+                Meeting.documents.through(
+                    meeting_id=rng.choice(meetings).id, document_id=doc.id
+                )
+            )
+        else:
+            agenda_item_documents.append(
+                AgendaItem.documents.through(
+                    agendaitem_id=rng.choice(agenda_items).id, document_id=doc.id
+                )
+            )
+    Consultation.documents.through.objects.bulk_create(consultation_documents)
+    Meeting.documents.through.objects.bulk_create(meeting_documents)
+    AgendaItem.documents.through.objects.bulk_create(agenda_item_documents)
+
+
+@dataclass
+class IndexingBenchmarkResult:
+    documents: int
+    elapsed: float = 0.0
+    stages: StageTimer = field(default_factory=StageTimer)
+    queries: int = 0
+    peak_memory: int = 0  # bytes
+    memory_source: str = "max rss"
+    requests: Counter[str] = field(default_factory=Counter)
+    solr_documents: int = 0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self) -> str:
+        lines = [
+            f"Documents:      {self.documents} ({self.solr_documents} sent to solr)",
+            f"Elapsed:        {self.elapsed:.2f}s",
+            f"Throughput:     {self.docs_per_second:.2f} docs/s",
+            f"DB queries:     {self.queries} ({self.queries / max(1, self.documents):.1f} per document)",
+            f"Peak memory:    {self.peak_memory / 1024 / 1024:.1f} MiB ({self.memory_source})",
+            "Stages:",
+        ]
+        lines += self.stages.report(self.elapsed)
+        lines.append(
+            "Service requests: "
+            + ", ".join(
+                f"{name}={count}" for name, count in sorted(self.requests.items())
+            )
+        )
+        return "\n".join(lines)
+
+
+def run_indexing_benchmark(
+    documents: int = 100,
+    latency: ServiceLatency | None = None,
+    paragraphs: int = 100,
+    chunk_size: int = 500,
+    allow_ocr: bool = True,
+    trace_memory: bool = False,
+    scanned_every: int = 20,
+    office_every: int = 10,
+    seed: int = 0,
+    mixed_every: int = 5,
+) -> IndexingBenchmarkResult:
+    """Runs update_solr_index on a synthetic corpus in the current database
+    against local stand-ins of the external services."""
+    result = IndexingBenchmarkResult(documents=documents)
+    services = StandInServices(
+        latency=latency or ServiceLatency(), paragraphs=paragraphs
+    )
+
+    def count_queries(
+        execute: Callable[..., Any],
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict[str, Any],
+    ) -> Any:
+        result.queries += 1
+        return execute(sql, params, many, context)
+
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        run_stand_in_services(services),
+    ):
+        document_store = os.path.join(tmp, "documents")
+        cache_dir = os.path.join(tmp, "cache")
+        create_corpus(
+            documents, document_store, scanned_every, office_every, seed, mixed_every
+        )
+
+        analyze_tika = indexing.analyze_document_tika
+
+        def timed_tika(
+            file_path: str, ocr: bool = False, skip_cache: bool = False
+        ) -> Any:
+            stage = "tika_ocr" if ocr else "tika"
+            return result.stages.timed(stage, analyze_tika)(file_path, ocr, skip_cache)
+
+        with ExitStack() as stack:
+            stack.enter_context(
+                override_settings(
+                    DOCUMENT_STORE=document_store,
+                    CACHE_DIR=cache_dir,
+                    SOLR_HOST=f"{services.url}/solr",
+                    TIKA_HOST=services.url,
+                    PDFACT_HOST=services.url,
+                    GOTENBERG_HOST=services.url,
+                    PREVIEW_HOST=services.url,
+                    PREVIEW_RESOLUTION=getattr(settings, "PREVIEW_RESOLUTION", None)
+                    or "256x256",
+                )
+            )
+            stack.enter_context(
+                patch.object(external_services.cache, "base_path", cache_dir)
+            )
+            for stage, name in STAGES.items():
+                timed = result.stages.timed(stage, getattr(indexing, name))
+                stack.enter_context(patch.object(indexing, name, timed))
+            stack.enter_context(
+                patch.object(indexing, "analyze_document_tika", timed_tika)
+            )
+            # time the indexing task spends serializing and waiting for solr
+            for name in ["add", "close"]:
+                timed = result.stages.timed("solr", getattr(SolrBulkWriter, name))
+                stack.enter_context(patch.object(SolrBulkWriter, name, timed))
+            # the stand-in services don't emulate the suggester
+            stack.enter_context(patch.object(indexing, "refresh_suggester"))
+            stack.enter_context(connection.execute_wrapper(count_queries))
+
+            if trace_memory:
+                tracemalloc.start()
+            start = perf_counter()
+            update_solr_index.apply(
+                kwargs={"allow_ocr": allow_ocr, "chunk_size": chunk_size}
+            ).get()
+            result.elapsed = perf_counter() - start
+            if trace_memory:
+                result.peak_memory = tracemalloc.get_traced_memory()[1]
+                result.memory_source = "tracemalloc"
+                tracemalloc.stop()
+            else:
+                result.peak_memory = (
+                    resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+                )
+
+    result.requests = services.requests
+    result.solr_documents = services.solr_documents
+    return result
@@ -0,0 +1,295 @@
+import json
+import random
+import statistics
+from collections.abc import Callable
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+from unittest.mock import patch
+
+import pysolr
+from django.test import Client, override_settings
+
+from frontend import views
+from frontend.search import solr
+from parliscope.benchmarks.services import (
+    WORDS,
+    StandInServices,
+    run_stand_in_services,
+)
+from parliscope.benchmarks.timing import StageTimer
+
+# timed stages of a search request (stage -> function in frontend.search.solr)
+STAGES = {
+    "parse_result": "_parse_search_result",
+    "highlights": "_parse_highlights",
+    "facets": "_parse_facets",
+    "spellcheck": "_parse_spellcheck",
+}
+
+QUERY = "Bebauungsplan"
+
+
+@dataclass(frozen=True)
+class PayloadSize:
+    """Size of the recorded Solr responses"""
+
+    rows: int  # documents per response
+    snippets: int  # highlight snippets per highlight field
+    snippet_length: int
+    facet_values: int  # values per facet field
+    preview_size: int  # length of the base64 preview image per document
+    suggestions: int
+
+
+PAYLOAD_SIZES = {
+    "small": PayloadSize(
+        rows=10,
+        snippets=1,
+        snippet_length=100,
+        facet_values=5,
+        preview_size=2_000,
+        suggestions=3,
+    ),
+    "medium": PayloadSize(
+        rows=10,
+        snippets=5,
+        snippet_length=200,
+        facet_values=30,
+        preview_size=10_000,
+        suggestions=10,
+    ),
+    "large": PayloadSize(
+        rows=10,
+        snippets=20,
+        snippet_length=1_000,
+        facet_values=200,
+        preview_size=40_000,
+        suggestions=25,
+    ),
+}
+
+
+def _text(rng: random.Random, length: int) -> str:
+    text = ""
+    while len(text) < length:
+        word = rng.choice(WORDS)
+        text += f" <em>{word}</em>" if rng.random() < 0.05 else f" {word}"
+    return text.strip()
+
+
+def select_response(size: PayloadSize, seed: int = 0) -> dict[str, Any]:
+    """Returns a Solr response of the select handler with highlighting,
+    facets and spellcheck collations of the given size"""
+    rng = random.Random(seed)
+    docs = []
+    highlighting = {}
+    for i in range(size.rows):
+        doc_id = str(i)
+        docs.append(
+            {
+                "id": doc_id,
+                "document_id": 1000 + i,
+                "doc_type": "Beschlussvorlage",
+                "doc_title": f"Dokument {i}",
+                "content_type": "application/pdf",
+                "consultation_id": 2000 + i,
+                "consultation_topic": f"Vorlage {i}",
+                "consultation_name": f"V-{i}",
+                "consultation_type": "Beschlussvorlage",
+                "consultation_organization": "SPD",
+                "meeting_id": [3000 + i],
+                "meeting_title": [f"{i}. Sitzung der Stadtverordnetenversammlung"],
+                "meeting_title_short": [f"S-{i}"],
+                "meeting_date": ["2024-03-12T17:00:00Z"],
+                "meeting_organization_name": ["Stadtverordnetenversammlung"],
+                "meeting_count": 1,
+                "first_seen": "2024-03-12T17:00:00Z",
+                "last_seen": "2024-03-12T17:00:00Z",
+                "filename": f"{i}.pdf",
+                "preview_image": "data:image/jpeg;base64, " + "A" * size.preview_size,
+            }
+        )
+        highlighting[doc_id] = {
+            name: [_text(rng, size.snippet_length) for _ in range(size.snippets)]
+            for name in solr.HL_FIELDS.split(" ")
+        }
+
+    def facet_values(prefix: str) -> list[str | int]:
+        values: list[str | int] = []
+        for i in range(size.facet_values):
+            values += [f"{prefix} {i}", size.facet_values - i]
+        return values
+
+    return {
+        "responseHeader": {"status": 0, "QTime": 12},
+        "response": {"numFound": 1234, "start": 0, "docs": docs},
+        "highlighting": highlighting,
+        "facet_counts": {
+            "facet_queries": {},
+            "facet_fields": {
+                "doc_type": facet_values("Vorlage"),
+                "meeting_organization_name_s": facet_values("Ausschuss"),
+            },
+        },
+        "spellcheck": {
+            "suggestions": [],
+            "correctlySpelled": False,
+            "collations": [
+                "collation",
+                {"collationQuery": QUERY.lower(), "hits": 5000},
+            ],
+        },
+    }
+
+
+def pages_response(size: PayloadSize, seed: int = 0) -> dict[str, Any]:
+    """Returns a Solr response of the pages handler with the highlighted best
+    page and two more pages of each document of the select response"""
+    rng = random.Random(seed)
+    docs = []
+    highlighting = {}
+    expanded = {}
+    for i in range(size.rows):
+        root = str(i)
+        page_id = f"{root}/page-{i + 1}"
+        docs.append({"id": page_id, "page": i + 1, "_root_": root})
+        highlighting[page_id] = {
+            solr.PAGE_HL_FIELDS: [
+                _text(rng, size.snippet_length) for _ in range(size.snippets)
+            ]
+        }
+        expanded[root] = {
+            "numFound": 2,
+            "start": 0,
+            "docs": [
+                {"id": f"{root}/page-{page}", "page": page, "_root_": root}
+                for page in (i + 2, i + 3)
+            ],
+        }
+    return {
+        "responseHeader": {"status": 0, "QTime": 5},
+        "response": {"numFound": size.rows, "start": 0, "docs": docs},
+        "highlighting": highlighting,
+        "expanded": expanded,
+    }
+
+
+def suggest_response(size: PayloadSize) -> dict[str, Any]:
+    """Returns a Solr response of the suggest handler for QUERY"""
+    suggestions = [
+        {"term": f"{QUERY} {i}", "weight": size.suggestions - i, "payload": ""}
+        for i in range(size.suggestions)
+    ]
+    return {
+        "responseHeader": {"status": 0, "QTime": 1},
+        "suggest": {
+            "default": {
+                QUERY: {"numFound": len(suggestions), "suggestions": suggestions}
+            }
+        },
+    }
+
+
+@dataclass
+class LatencyResult:
+    name: str
+    durations: list[float] = field(default_factory=list)
+    stages: StageTimer = field(default_factory=StageTimer)
+    response_size: int = 0
+
+    def report(self) -> str:
+        total = sum(self.durations)
+        iterations = len(self.durations)
+        durations = sorted(self.durations)
+        p95 = durations[min(iterations - 1, int(iterations * 0.95))]
+        stage_time = sum(self.stages.time.values())
+        lines = [
+            f"{self.name}: mean {total / iterations * 1000:.2f} ms, "
+            f"median {statistics.median(durations) * 1000:.2f} ms, "
+            f"p95 {p95 * 1000:.2f} ms ({iterations} iterations, "
+            f"{self.response_size / 1024:.0f} KiB solr response)"
+        ]
+        lines += self.stages.report(total, per=iterations)
+        lines.append(
+            f"  {'other':<12} {(total - stage_time) / iterations * 1000:10.2f} ms"
+        )
+        return "\n".join(lines)
+
+
+def measure(
+    name: str,
+    request: Callable[[], Any],
+    iterations: int,
+    response_size: int,
+) -> LatencyResult:
+    """Measures the latency of a request with the stages of the search timed"""
+    result = LatencyResult(name=name, response_size=response_size)
+    with ExitStack() as stack:
+        stack.enter_context(
+            patch.object(
+                pysolr.Solr, "search", result.stages.timed("solr", pysolr.Solr.search)
+            )
+        )
+        for stage, function in STAGES.items():
+            timed = result.stages.timed(stage, getattr(solr, function))
+            stack.enter_context(patch.object(solr, function, timed))
+        stack.enter_context(
+            patch.object(views, "render", result.stages.timed("render", views.render))
+        )
+        for _ in range(iterations):
+            start = perf_counter()
+            request()
+            result.durations.append(perf_counter() - start)
+    return result
+
+
+def run_search_benchmark(
+    sizes: list[str] | None = None, iterations: int = 50, latency: float = 0.0
+) -> list[LatencyResult]:
+    """Measures search, doc_id, suggest and the main and search views against
+    recorded Solr responses of the given payload sizes. The views write to the
+    query log of the current database."""
+    results = []
+    client = Client()
+
+    def get(url: str) -> None:
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}")
+
+    for size_name in sizes or list(PAYLOAD_SIZES):
+        size = PAYLOAD_SIZES[size_name]
+        services = StandInServices()
+        services.latency.solr = latency
+        select = json.dumps(select_response(size)).encode()
+        suggest = json.dumps(suggest_response(size)).encode()
+        pages = json.dumps(pages_response(size)).encode()
+        services.search_responses = {
+            "select": select,
+            "suggest": suggest,
+            "pages": pages,
+        }
+
+        with (
+            run_stand_in_services(services),
+            override_settings(SOLR_HOST=f"{services.url}/solr"),
+        ):
+            # request -> size of the solr responses per request
+            requests: dict[str, tuple[Callable[[], Any], int]] = {
+                "search": (lambda: solr.search(QUERY), len(select) + len(pages)),
+                "doc_id": (lambda: solr.doc_id("*:*", limit=5), len(select)),
+                "suggest": (lambda: solr.suggest(QUERY), len(suggest)),
+                "MainView": (lambda: get("/"), len(select)),
+                "SearchView": (
+                    lambda: get(f"/search?query={QUERY}"),
+                    len(select) + len(pages),
+                ),
+            }
+            for name, (request, response_size) in requests.items():
+                request()  # warm up connections and template caches
+                results.append(
+                    measure(f"{name} [{size_name}]", request, iterations, response_size)
+                )
+    return results
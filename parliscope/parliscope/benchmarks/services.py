@@ -0,0 +1,180 @@
+import email
+import gzip
+import json
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from email.message import Message
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# marks documents without text layer in the synthetic corpus
+SCANNED_MARKER = b"%%scanned%%"
+
+# 1x1 pixel gif returned as preview image
+PREVIEW_IMAGE = (
+    b"GIF89a\x01\x00\x01\x00\x00\x00\x00!\xf9\x04\x01\n\x00\x01\x00,"
+    b"\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02L\x01\x00;"
+)
+
+WORDS = (
+    "Stadt Griesheim Haushalt Bebauungsplan Antrag Beschluss Verkehr Schule "
+    "Kindertagesstätte Satzung Gebühren Straße Ausschuss Magistrat Vorlage "
+    "der die das und mit für von zu im auf wird werden"
+).split()
+
+
+@dataclass
+class ServiceLatency:
+    """Latency in seconds added to the responses of the stand-in services"""
+
+    pdfact: float = 0.0
+    tika: float = 0.0
+    tika_ocr: float = 0.0
+    gotenberg: float = 0.0
+    preview: float = 0.0
+    solr: float = 0.0
+
+
+@dataclass
+class StandInServices:
+    """Fake Tika, PDFAct, Gotenberg, preview and Solr services on a local HTTP server"""
+
+    latency: ServiceLatency = field(default_factory=ServiceLatency)
+    paragraphs: int = 100
+    paragraphs_per_page: int = 5
+    requests: Counter[str] = field(default_factory=Counter)
+    solr_documents: int = 0
+    # recorded responses of the Solr search handlers (e.g. "select", "suggest")
+    search_responses: dict[str, bytes] = field(default_factory=dict)
+    url: str = ""
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def text(self) -> list[str]:
+        return [
+            " ".join(WORDS[(i * 7 + j) % len(WORDS)] for j in range(40))
+            for i in range(self.paragraphs)
+        ]
+
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> bytes:
+        """Returns the response body for a request, raises KeyError for unknown paths"""
+        if headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        scanned = SCANNED_MARKER in body
+        if path.startswith("/analyze"):
+            self.record("pdfact", self.latency.pdfact)
+            paragraphs = [] if scanned else self.text()
+            return json.dumps(
+                {
+                    "paragraphs": [
+                        {
+                            "paragraph": {
+                                "text": p,
+                                "positions": [
+                                    {"page": i // self.paragraphs_per_page + 1}
+                                ],
+                            }
+                        }
+                        for i, p in enumerate(paragraphs)
+                    ]
+                }
+            ).encode()
+        if path.startswith("/rmeta"):
+            ocr = headers.get("X-Tika-PDFOcrStrategy") == "OCR_ONLY"
+            if ocr:
+                self.record("tika_ocr", self.latency.tika_ocr)
+            else:
+                self.record("tika", self.latency.tika)
+            content = "\n\n".join(self.text()) if ocr or not scanned else ""
+            return json.dumps(
+                [
+                    {
+                        "X-TIKA:content": content,
+                        "Content-Type": "application/pdf",
+                        "Author": "Stadt Griesheim",
+                        "dcterms:created": "2024-01-01T10:00:00Z",
+                    }
+                ]
+            ).encode()
+        if path.startswith("/forms/libreoffice/convert"):
+            self.record("gotenberg", self.latency.gotenberg)
+            return uploaded_file(headers, body)
+        if path.startswith("/preview"):
+            self.record("preview", self.latency.preview)
+            return PREVIEW_IMAGE
+        if path.startswith("/solr/") and "/update" in path:
+            self.record("solr", self.latency.solr)
+            if headers.get("Content-Type", "").startswith("application/json"):
+                documents = json.loads(body or b"[]")
+                self.solr_documents += (
+                    len(documents) if isinstance(documents, list) else 1
+                )
+            else:
+                self.solr_documents += body.count(b"<doc>")
+            return json.dumps({"responseHeader": {"status": 0, "QTime": 0}}).encode()
+        if path.startswith("/solr/"):
+            handler = path.split("?")[0].rstrip("/").split("/")[-1]
+            self.record(f"solr_{handler}", self.latency.solr)
+            return self.search_responses[handler]
+        raise KeyError(path)
+
+    def record(self, service: str, latency: float) -> None:
+        with self.lock:
+            self.requests[service] += 1
+        if latency > 0:
+            time.sleep(latency)
+
+
+def uploaded_file(headers: Any, body: bytes) -> bytes:
+    """Content of the first file of a multipart/form-data request"""
+    message = email.message_from_bytes(
+        f"Content-Type: {headers.get('Content-Type')}\r\n\r\n".encode() + body
+    )
+    parts: list[Message] = message.get_payload()  # type: ignore[assignment]
+    payload: bytes = parts[0].get_payload(decode=True)  # type: ignore[assignment]
+    return payload
+
+
+def create_handler(services: StandInServices) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def respond(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            try:
+                response = services.handle(self.command, self.path, self.headers, body)
+                status = 200
+            except KeyError:
+                response = b"not found"
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(response)))
+            self.end_headers()
+            self.wfile.write(response)
+
+        do_GET = do_POST = do_PUT = respond
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+@contextmanager
+def run_stand_in_services(services: StandInServices) -> Iterator[StandInServices]:
+    """Serves the stand-in services on a free local port while the context is active"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), create_handler(services))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    services.url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        yield services
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
@@ -0,0 +1,46 @@
+import functools
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+
+
+@dataclass
+class StageTimer:
+    """Accumulates the time spent in wrapped functions per stage.
+    Nested stages are subtracted from the enclosing stage, so the stage
+    times of a run add up to at most its total time."""
+
+    time: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    calls: Counter[str] = field(default_factory=Counter)
+    _nested: list[float] = field(default_factory=lambda: [0.0])
+
+    def timed(self, stage: str, fn: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self._nested.append(0.0)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self.time[stage] += elapsed - self._nested.pop()
+                self.calls[stage] += 1
+                self._nested[-1] += elapsed
+
+        return wrapper
+
+    def report(self, total: float, per: int = 1) -> list[str]:
+        """Formats the stages by time, with times averaged over `per` runs"""
+        lines = []
+        for stage, elapsed in sorted(
+            self.time.items(), key=lambda item: item[1], reverse=True
+        ):
+            calls = self.calls[stage]
+            share = elapsed / total * 100 if total > 0 else 0
+            lines.append(
+                f"  {stage:<12} {elapsed / per * 1000:10.2f} ms {share:5.1f}%  "
+                f"{calls / per:8.1f} calls  {elapsed / calls * 1000:8.2f} ms/call"
+            )
+        return lines
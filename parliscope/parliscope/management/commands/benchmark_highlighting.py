@@ -0,0 +1,43 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from parliscope.benchmarks.highlighting import compare, run_highlight_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the highlighting latency of the largest documents of the live "
+        "Solr core, analyzing their text per request and using stored offsets"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=10,
+            help="number of largest documents highlighted per request (default: 10)",
+        )
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=20,
+            help="number of requests per query and variant (default: 20)",
+        )
+        parser.add_argument(
+            "--query",
+            action="append",
+            help="query to highlight, can be repeated (default: a set of topics)",
+        )
+
+    def handle(self, **options: Any) -> None:
+        results = run_highlight_benchmark(
+            documents=options["documents"],
+            iterations=options["iterations"],
+            queries=options["query"],
+        )
+        for result in results:
+            self.stdout.write(result.report())
+        for line in compare(results):
+            self.stdout.write(line)
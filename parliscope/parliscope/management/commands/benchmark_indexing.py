@@ -0,0 +1,92 @@
+import logging
+from dataclasses import fields
+from typing import Any
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db import connection
+
+from parliscope.benchmarks.indexing import run_indexing_benchmark
+from parliscope.benchmarks.services import ServiceLatency
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark update_solr_index on a synthetic corpus in a temporary test "
+        "database against local stand-ins of Tika, PDFAct, Gotenberg, the preview "
+        "service and Solr"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=100,
+            help="number of documents in the corpus (default: 100)",
+        )
+        parser.add_argument(
+            "--paragraphs",
+            type=int,
+            default=100,
+            help="number of paragraphs per document (default: 100)",
+        )
+        parser.add_argument(
+            "--chunk_size",
+            type=int,
+            default=500,
+            help="maximum number of documents per batch sent to solr (default: 500)",
+        )
+        parser.add_argument(
+            "--latency",
+            action="append",
+            default=[],
+            metavar="SERVICE=SECONDS",
+            help="response latency of a stand-in service, "
+            f"one of {', '.join(f.name for f in fields(ServiceLatency))} "
+            "(e.g. --latency tika=0.2, can be repeated)",
+        )
+        parser.add_argument(
+            "--no-ocr",
+            help="disable ocr for documents without text layer",
+            action="store_false",
+        )
+        parser.add_argument(
+            "--trace-memory",
+            help="measure the peak memory with tracemalloc (slows down the run)",
+            action="store_true",
+        )
+
+    def parse_latency(self, values: list[str]) -> ServiceLatency:
+        latency = ServiceLatency()
+        for value in values:
+            service, _, seconds = value.partition("=")
+            if not hasattr(latency, service):
+                raise CommandError(f"Unknown service: {service}")
+            try:
+                setattr(latency, service, float(seconds))
+            except ValueError:
+                raise CommandError(f"Invalid latency: {value}") from None
+        return latency
+
+    def handle(self, **options: Any) -> None:
+        latency = self.parse_latency(options["latency"])
+        if options["verbosity"] < 2:
+            logging.getLogger("parliscope.tasks.indexing").setLevel(logging.WARNING)
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            result = run_indexing_benchmark(
+                documents=options["documents"],
+                latency=latency,
+                paragraphs=options["paragraphs"],
+                chunk_size=options["chunk_size"],
+                allow_ocr=options["no_ocr"],
+                trace_memory=options["trace_memory"],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        self.stdout.write(result.report())
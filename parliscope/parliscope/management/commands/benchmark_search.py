@@ -0,0 +1,52 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from django.db import connection
+
+from parliscope.benchmarks.search import PAYLOAD_SIZES, run_search_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the latency of search, doc_id, suggest and the main and search "
+        "views against recorded Solr responses served by a local stand-in"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--iterations",
+            type=int,
+            default=50,
+            help="number of requests per benchmark (default: 50)",
+        )
+        parser.add_argument(
+            "--size",
+            action="append",
+            choices=list(PAYLOAD_SIZES),
+            help="payload size of the Solr responses, can be repeated (default: all)",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="response latency of the Solr stand-in in seconds (default: 0)",
+        )
+
+    def handle(self, **options: Any) -> None:
+        # the views write to the query log, so run in a temporary test database
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            results = run_search_benchmark(
+                sizes=options["size"],
+                iterations=options["iterations"],
+                latency=options["latency"],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for result in results:
+            self.stdout.write(result.report())
@@ -0,0 +1,21 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from parliscope.tasks.suggest import build_suggester
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the inactive dictionary of the Solr suggester and activate it "
+        "once it is validated"
+    )
+
+    def handle(self, **options: Any) -> None:
+        result = build_suggester()
+        for build in result["builds"]:
+            self.stdout.write(
+                f"Built dictionary {build['dictionary']} in {build['seconds']:.1f}s, "
+                f"{build['hits']} of {build['probes']} probes have suggestions"
+            )
+        self.stdout.write(f"Active dictionary: {result['active']}")
@@ -0,0 +1,39 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from parliscope.tasks.indexing import index_changes
+
+
+class Command(BaseCommand):
+    help = "Re-index documents affected by changes recorded by the scraper"
+
+    DEFAULT_CHUNK_SIZE = 500  # maximum number of documents per solr batch
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--chunk_size",
+            help=f"maximum number of documents per batch sent to solr (default: {self.DEFAULT_CHUNK_SIZE})",
+            type=int,
+            default=self.DEFAULT_CHUNK_SIZE,
+        )
+        parser.add_argument(
+            "--no-ocr",
+            help="allow ocr for documents (takes a long time)",
+            action="store_false",
+        )
+        parser.add_argument(
+            "--full",
+            help="re-index documents completely instead of atomic updates of "
+            "their relation fields",
+            action="store_true",
+        )
+
+    def handle(self, **options: Any) -> None:
+        processed = index_changes(
+            allow_ocr=options["no_ocr"],
+            chunk_size=options["chunk_size"],
+            partial=not options["full"],
+        )
+        self.stdout.write(f"Re-indexed {processed} documents")
@@ -0,0 +1,27 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+
+from parliscope.tasks.index_health import compute_index_health
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the index health statistics shown on the admin health page "
+        "(document counts per type in the database and Solr, failed analyses)"
+    )
+
+    def handle(self, **options: Any) -> None:
+        snapshot = compute_index_health()
+        self.stdout.write(
+            f"Documents: {snapshot.database_documents} in the database, "
+            f"{snapshot.solr_documents} in solr"
+        )
+        for row in snapshot.doc_types:
+            self.stdout.write(f"  {row['doc_type']}: {row['database']} / {row['solr']}")
+        self.stdout.write(
+            f"Without content: {snapshot.documents_without_content}, failed analysis: "
+            f"{snapshot.failed_analysis}"
+        )
+        for error in snapshot.errors:
+            self.stderr.write(error)
@@ -0,0 +1,46 @@
+from typing import Any
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from parliscope.tasks.reconcile import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconcile the Solr index with the database: delete orphaned Solr "
+        "documents and enqueue documents missing in Solr for index_changes"
+    )
+
+    DEFAULT_BATCH_SIZE = 1000  # number of ids per solr request
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--dry-run",
+            help="only report the differences, don't delete or enqueue anything",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--batch_size",
+            help=f"number of ids fetched and deleted per request (default: {self.DEFAULT_BATCH_SIZE})",
+            type=int,
+            default=self.DEFAULT_BATCH_SIZE,
+        )
+
+    def handle(self, **options: Any) -> None:
+        dry_run: bool = options["dry_run"]
+        result = reconcile(
+            delete=not dry_run,
+            enqueue=not dry_run,
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            f"Missing in solr: {result.missing} ({result.enqueued} enqueued)"
+        )
+        for id in result.missing_sample:
+            self.stdout.write(f"  {id}")
+        self.stdout.write(
+            f"Orphaned in solr: {result.orphaned} ({result.deleted} deleted)"
+        )
+        for id in result.orphaned_sample:
+            self.stdout.write(f"  {id}")
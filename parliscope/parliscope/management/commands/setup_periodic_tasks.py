@@ -8,7 +8,7 @@ from django_celery_beat.models import CrontabSchedule, PeriodicTask
 class Command(BaseCommand):
     help = "Setup periodic tasks for Celery Beat scheduler"
 
-    DEFAULT_CHUNK_SIZE = 10  # chunk size for solr document commit
+    DEFAULT_CHUNK_SIZE = 500  # maximum number of documents per solr batch
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument(
@@ -16,9 +16,34 @@ class Command(BaseCommand):
             default="0 3 * * *",
             help="Cron schedule for Solr index updates (default: daily at 3 AM)",
         )
+        parser.add_argument(
+            "--changes-schedule",
+            default="*/10 * * * *",
+            help="Cron schedule for indexing changes recorded by the scraper, so "
+            "that they are searchable soon after a crawl (default: every 10 "
+            "minutes, '' to not schedule it)",
+        )
+        parser.add_argument(
+            "--reconcile-schedule",
+            default=None,
+            help="Cron schedule for reconciling the Solr index with the database, "
+            "deleting orphaned documents (e.g. '30 2 * * 0', default: not scheduled)",
+        )
+        parser.add_argument(
+            "--suggest-schedule",
+            default=None,
+            help="Cron schedule for rebuilding the search suggestions in addition to "
+            "the index updates (e.g. '0 */6 * * *', default: not scheduled)",
+        )
+        parser.add_argument(
+            "--health-schedule",
+            default="*/15 * * * *",
+            help="Cron schedule for computing the index health statistics of the "
+            "admin health page (default: every 15 minutes)",
+        )
         parser.add_argument(
             "--chunk_size",
-            help=f"chunk size for sending documents to solr (default: {self.DEFAULT_CHUNK_SIZE})",
+            help=f"maximum number of documents per batch sent to solr (default: {self.DEFAULT_CHUNK_SIZE})",
             type=int,
             default=self.DEFAULT_CHUNK_SIZE,
         )
@@ -42,11 +67,86 @@ class Command(BaseCommand):
 
     def handle(self, **options: Any) -> None:
         schedule_expr: str = options["schedule"]
+        changes_schedule_expr: str = options["changes_schedule"]
+        reconcile_schedule_expr: str | None = options["reconcile_schedule"]
+        suggest_schedule_expr: str | None = options["suggest_schedule"]
+        health_schedule_expr: str = options["health_schedule"]
         chunk_size: int = options["chunk_size"]
         force: bool = options["force"]
         allow_ocr: bool = not options["no_ocr"]  # inverted logic like update_solr.py
         enabled: bool = not options["disable"]  # inverted logic - default is enabled
 
+        self._setup_task(
+            "update-solr-index",
+            "parliscope.tasks.indexing.update_solr_index",
+            schedule_expr,
+            {
+                "force": force,
+                "allow_ocr": allow_ocr,
+                "chunk_size": chunk_size,
+            },
+            enabled,
+        )
+        self.stdout.write(
+            f"Task configured with schedule: {schedule_expr} "
+            f"(enabled={enabled}, force={force}, chunk_size={chunk_size}, allow_ocr={allow_ocr})"
+        )
+
+        if changes_schedule_expr:
+            self._setup_task(
+                "index-changes",
+                "parliscope.tasks.indexing.index_changes",
+                changes_schedule_expr,
+                {
+                    "allow_ocr": allow_ocr,
+                    "chunk_size": chunk_size,
+                },
+                enabled,
+            )
+            self.stdout.write(
+                f"Change indexing configured with schedule: {changes_schedule_expr} "
+                f"(enabled={enabled}, chunk_size={chunk_size}, allow_ocr={allow_ocr})"
+            )
+
+        if reconcile_schedule_expr is not None:
+            self._setup_task(
+                "reconcile-solr-index",
+                "parliscope.tasks.reconcile.reconcile_solr_index",
+                reconcile_schedule_expr,
+                {},
+                enabled,
+            )
+            self.stdout.write(
+                f"Reconciliation configured with schedule: {reconcile_schedule_expr} "
+                f"(enabled={enabled})"
+            )
+
+        if suggest_schedule_expr is not None:
+            self._setup_task(
+                "update-suggester",
+                "parliscope.tasks.suggest.update_suggester",
+                suggest_schedule_expr,
+                {},
+                enabled,
+            )
+            self.stdout.write(
+                f"Suggester builds configured with schedule: {suggest_schedule_expr} "
+                f"(enabled={enabled})"
+            )
+
+        self._setup_task(
+            "update-index-health",
+            "parliscope.tasks.index_health.update_index_health",
+            health_schedule_expr,
+            {},
+            enabled,
+        )
+        self.stdout.write(
+            f"Index health statistics configured with schedule: {health_schedule_expr} "
+            f"(enabled={enabled})"
+        )
+
+    def _parse_schedule(self, schedule_expr: str) -> CrontabSchedule:
         # Parse cron expression
         try:
             minute, hour, day_of_month, month_of_year, day_of_week = (
@@ -74,22 +174,26 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f"Created cron schedule: {schedule}"))
         else:
             self.stdout.write(f"Using existing cron schedule: {schedule}")
+        return schedule
+
+    def _setup_task(
+        self,
+        task_name: str,
+        task: str,
+        schedule_expr: str,
+        kwargs: dict[str, Any],
+        enabled: bool,
+    ) -> None:
+        schedule = self._parse_schedule(schedule_expr)
 
         # Create or update the periodic task
-        task_name = "update-solr-index"
-        kwargs_json = json.dumps(
-            {
-                "force": force,
-                "allow_ocr": allow_ocr,
-                "chunk_size": chunk_size,
-            }
-        )
+        kwargs_json = json.dumps(kwargs)
 
         periodic_task, created = PeriodicTask.objects.get_or_create(
             name=task_name,
             defaults={
                 "crontab": schedule,
-                "task": "parliscope.tasks.indexing.update_solr_index",
+                "task": task,
                 "kwargs": kwargs_json,
                 "enabled": enabled,
             },
@@ -104,8 +208,3 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f"Updated periodic task: {task_name}"))
         else:
             self.stdout.write(self.style.SUCCESS(f"Created periodic task: {task_name}"))
-
-        self.stdout.write(
-            f"Task configured with schedule: {schedule_expr} "
-            f"(enabled={enabled}, force={force}, chunk_size={chunk_size}, allow_ocr={allow_ocr})"
-        )
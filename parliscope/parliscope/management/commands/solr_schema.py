@@ -0,0 +1,58 @@
+from typing import Any
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.schema import reload_live_core, schema_changes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the schema of the live Solr core with the schema.xml of the "
+        "configset deployed with Solr and apply the changes"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--apply",
+            help="reload the live core, or rebuild the index if the changes "
+            "require a reindex (in a Celery task)",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--now",
+            help="run a required rebuild in this process instead of a Celery task",
+            action="store_true",
+        )
+
+    def handle(self, **options: Any) -> None:
+        changes = schema_changes()
+        if not changes:
+            self.stdout.write(f"The schema of {settings.SOLR_COLLECTION} is up to date")
+            return
+        for change in changes:
+            self.stdout.write(str(change))
+        if not options["apply"]:
+            return
+
+        if not any(change.reindex for change in changes):
+            changes = reload_live_core()
+            if not changes:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Reloaded {settings.SOLR_COLLECTION}")
+                )
+                return
+            self.stdout.write(
+                f"{settings.SOLR_COLLECTION} doesn't use the configset, rebuilding"
+            )
+
+        if options["now"]:
+            update_solr_index.apply(kwargs={"rebuild": True}).get()
+            self.stdout.write(self.style.SUCCESS("Rebuilt the index"))
+        else:
+            result = update_solr_index.delay(rebuild=True)
+            self.stdout.write(
+                self.style.SUCCESS(f"Started rebuild of the index (task {result.id})")
+            )
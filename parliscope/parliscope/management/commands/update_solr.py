@@ -4,17 +4,18 @@ from django.core.management import BaseCommand
 from django.core.management.base import CommandParser
 
 from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.rebuild import rebuild_core, rollback_rebuild
 
 
 class Command(BaseCommand):
     help = "Update solr index from ris database"
 
-    DEFAULT_CHUNK_SIZE = 10  # chunk size for solr document commit
+    DEFAULT_CHUNK_SIZE = 500  # maximum number of documents per solr batch
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument(
             "--chunk_size",
-            help=f"chunk size for sending documents to solr (default: {self.DEFAULT_CHUNK_SIZE})",
+            help=f"maximum number of documents per batch sent to solr (default: {self.DEFAULT_CHUNK_SIZE})",
             type=int,
             default=self.DEFAULT_CHUNK_SIZE,
         )
@@ -26,8 +27,23 @@ class Command(BaseCommand):
             help="allow ocr for documents (takes a long time)",
             action="store_false",
         )
+        parser.add_argument(
+            "--rebuild",
+            help="index into a new core and swap it with the live core when complete",
+            action="store_true",
+        )
+        parser.add_argument(
+            "--rollback",
+            help="swap the live core back with the index replaced by the last rebuild",
+            action="store_true",
+        )
 
     def handle(self, **options: Any) -> None:
+        if options["rollback"]:
+            rollback_rebuild()
+            self.stdout.write(f"Swapped the live core with {rebuild_core()}")
+            return
+
         force = options["force"]
         allow_ocr = options["no_ocr"]
         chunk_size = options.get("chunk_size", self.DEFAULT_CHUNK_SIZE)
@@ -36,4 +52,5 @@ class Command(BaseCommand):
             force=force,
             allow_ocr=allow_ocr,
             chunk_size=chunk_size,
+            rebuild=options["rebuild"],
         )
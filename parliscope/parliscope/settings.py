@@ -70,6 +70,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "frontend.middleware.TracingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -162,14 +163,47 @@ CACHE_DIR = join(DOCUMENT_STORE, "analysis")
 SOLR_HOST = env("SOLR_HOST", default="http://localhost:8983/solr")
 SOLR_COLLECTION = env("SOLR_COLLECTION", default="ris")
 
+# Bulk updates of the solr index (see parliscope/tasks/solr_writer.py)
+SOLR_COMMIT_WITHIN = env.int("SOLR_COMMIT_WITHIN", default=10000)  # ms
+SOLR_BATCH_BYTES = env.int("SOLR_BATCH_BYTES", default=4 * 1024 * 1024)
+SOLR_UPDATE_THREADS = env.int("SOLR_UPDATE_THREADS", default=2)  # batches in flight
+# requires a solr server that accepts gzip encoded request bodies
+SOLR_UPDATE_GZIP = env.bool("SOLR_UPDATE_GZIP", default=False)
+
+# Blue/green rebuilds of the solr index (see parliscope/tasks/rebuild.py)
+SOLR_CONFIGSET = env("SOLR_CONFIGSET", default="ris")
+# documents a rebuilt index may lack compared to the database before it is swapped in
+SOLR_REBUILD_MAX_MISSING = env.int("SOLR_REBUILD_MAX_MISSING", default=0)
+
 # Connection and settings for pdf preview thumbnails
 PREVIEW_HOST = env("PREVIEW_HOST", default="http://localhost:8000")
 PREVIEW_RESOLUTION = "256x256"
 
+# Request tracing (see frontend/tracing.py)
+TRACING_SERVER_TIMING = env.bool("TRACING_SERVER_TIMING", default=True)
+TRACING_SAMPLE_RATE = env.float("TRACING_SAMPLE_RATE", default=0.1)  # exported traces
+TRACING_EXPORT_FILE = env("TRACING_EXPORT_FILE", default=None)  # OTLP/JSON lines
+TRACING_OTLP_ENDPOINT = env(  # e.g. http://localhost:4318/v1/traces
+    "TRACING_OTLP_ENDPOINT", default=None
+)
+TRACING_SLOW_REQUEST_MS = env.int("TRACING_SLOW_REQUEST_MS", default=1000)
+TRACING_SLOW_REQUEST_SAMPLE_RATE = env.float(
+    "TRACING_SLOW_REQUEST_SAMPLE_RATE", default=1.0
+)
+
 TIKA_HOST = env("TIKA_HOST", default="http://localhost:9998")
 PDFACT_HOST = env("PDFACT_HOST", default="http://localhost:80")
 GOTENBERG_HOST = env("GOTENBERG_HOST", default="http://localhost:3000")
 
+# Pages without a text layer are OCRed separately, this many at once per document
+OCR_WORKERS = env.int("OCR_WORKERS", default=4)
+
+# Readiness checks of the services at /healthcheck (see healthcheck/), which run
+# concurrently. The liveness check at /healthcheck/live/ doesn't probe anything.
+HEALTH_CHECK = {"DISABLE_THREADING": False}
+HEALTHCHECK_TIMEOUT = env.float("HEALTHCHECK_TIMEOUT", default=3)  # s per service
+HEALTHCHECK_CACHE_SECONDS = env.int("HEALTHCHECK_CACHE_SECONDS", default=30)
+
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_BROKER_URL = env("CELERY_BROKER_URL", default="redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = "django-db"  # use django_celery_results
@@ -0,0 +1,5 @@
+# celery autodiscovery imports this package, the task modules have to be
+# imported here to register their tasks
+from parliscope.tasks import index_health, indexing, reconcile, suggest
+
+__all__ = ["index_health", "indexing", "reconcile", "suggest"]
@@ -0,0 +1,170 @@
+import time
+from datetime import datetime, timedelta
+from typing import Any
+
+import pysolr
+from celery import shared_task
+from celery.app.task import Task
+from celery.utils.log import get_task_logger
+from django.db.models import Case, Count, OuterRef, Subquery, TextField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from frontend.processing.external_services import cache
+from frontend.search.utils import solr_connection
+from models.models import Consultation, Document, IndexHealthSnapshot
+
+logger = get_task_logger(__name__)
+
+INDEX_TASKS = [
+    "parliscope.tasks.indexing.update_solr_index",
+    "parliscope.tasks.indexing.index_changes",
+]
+
+# snapshots older than this are deleted
+KEEP_SNAPSHOTS = timedelta(days=90)
+
+
+def database_doc_types() -> dict[str | None, int]:
+    """Number of documents per doc_type, derived in the database like
+    set_relation_fields derives it for the index"""
+    consultation_type = (
+        Consultation.objects.filter(documents=OuterRef("pk"))
+        .order_by("pk")
+        .values("type")[:1]
+    )
+    doc_type = Coalesce(
+        Subquery(consultation_type),
+        Case(
+            When(title__icontains="niederschrift", then=Value("Niederschrift")),
+            default=None,
+            output_field=TextField(),
+        ),
+        output_field=TextField(),
+    )
+    counts: dict[str | None, int] = {}
+    rows = (
+        Document.objects.annotate(doc_type=doc_type)
+        .values("doc_type")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in rows:
+        # empty values are not indexed
+        key = row["doc_type"] or None
+        counts[key] = counts.get(key, 0) + row["count"]
+    return counts
+
+
+def solr_statistics(solr: pysolr.Solr) -> dict[str, Any]:
+    """Document counts of the index per doc_type and failed analysis step,
+    and of documents without content, with a single facet request"""
+    result = solr.search(
+        "*:*",
+        rows=0,
+        hl="false",
+        facet="true",
+        **{
+            "facet.field": ["doc_type", "failed_analysis"],
+            "facet.query": "{!key=without_content}-content:[* TO *]",
+            "facet.limit": -1,
+            "facet.mincount": 1,
+            "f.doc_type.facet.missing": "true",
+        },
+    )
+    facet_fields = result.facets["facet_fields"]
+
+    def counts(name: str) -> dict[str | None, int]:
+        values = facet_fields[name]
+        return dict(zip(values[::2], values[1::2], strict=True))
+
+    return {
+        "documents": result.hits,
+        "doc_types": counts("doc_type"),
+        "failed_analysis": counts("failed_analysis"),
+        "without_content": result.facets["facet_queries"]["without_content"],
+    }
+
+
+def last_index_run() -> datetime | None:
+    """Date of the latest successful indexing task"""
+    from django_celery_results.models import TaskResult
+
+    task_result = (
+        TaskResult.objects.filter(task_name__in=INDEX_TASKS, status="SUCCESS")
+        .order_by("-date_done")
+        .first()
+    )
+    return task_result.date_done if task_result else None
+
+
+def compute_index_health() -> IndexHealthSnapshot:
+    """Computes and stores a snapshot of the index health"""
+    start = time.perf_counter()
+    database = database_doc_types()
+    snapshot = IndexHealthSnapshot(database_documents=sum(database.values()))
+
+    solr: dict[str | None, int] = {}
+    try:
+        statistics = solr_statistics(solr_connection())
+    except Exception as e:
+        logger.error(f"Error reading index statistics from Solr: {e}")
+        snapshot.errors.append(f"Solr: {e}")
+    else:
+        solr = statistics["doc_types"]
+        snapshot.solr_documents = statistics["documents"]
+        snapshot.documents_without_content = statistics["without_content"]
+        snapshot.failed_analysis = statistics["failed_analysis"]
+
+    snapshot.doc_types = sorted(
+        (
+            {
+                "doc_type": doc_type,
+                "database": database.get(doc_type, 0),
+                "solr": solr.get(doc_type, 0),
+            }
+            for doc_type in database.keys() | solr.keys()
+        ),
+        key=lambda row: (-row["database"], row["doc_type"] or ""),
+    )
+    snapshot.cache_files, snapshot.cache_bytes = cache.usage()
+    snapshot.last_index_run = last_index_run()
+    snapshot.duration = time.perf_counter() - start
+    snapshot.save()
+
+    IndexHealthSnapshot.objects.filter(
+        created_at__lt=timezone.now() - KEEP_SNAPSHOTS
+    ).delete()
+    return snapshot
+
+
+def recent_snapshots(days: int = 7) -> list[IndexHealthSnapshot]:
+    """Snapshots of the last days, oldest first"""
+    return list(
+        IndexHealthSnapshot.objects.filter(
+            created_at__gte=timezone.now() - timedelta(days=days)
+        ).order_by("created_at")
+    )
+
+
+@shared_task(bind=True)
+def update_index_health(self: Task) -> dict[str, Any]:
+    """
+    Celery task to compute the index health statistics shown in the admin.
+
+    Returns the document counts of the snapshot, which is stored in the
+    index_health_snapshots table.
+    """
+    snapshot = compute_index_health()
+    logger.info(
+        f"Index health: {snapshot.database_documents} documents in the database, "
+        f"{snapshot.solr_documents} in solr, {snapshot.documents_without_content} "
+        f"without content ({snapshot.duration:.1f}s)"
+    )
+    return {
+        "database_documents": snapshot.database_documents,
+        "solr_documents": snapshot.solr_documents,
+        "documents_without_content": snapshot.documents_without_content,
+        "failed_analysis": snapshot.failed_analysis,
+        "errors": snapshot.errors,
+    }
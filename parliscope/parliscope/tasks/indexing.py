@@ -1,130 +1,450 @@
-import re
+from collections import defaultdict
+from itertools import batched
 from typing import Any
 
 import pysolr
 from celery import shared_task
 from celery.app.task import Task
 from celery.utils.log import get_task_logger
-from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
 
 from frontend.processing.external_services import (
     ExternalServiceUnsuccessfulException,
     analyze_document_pdfact,
     analyze_document_tika,
+    cached_ocr_tika,
     convert_to_pdf,
     get_preview_image_for_doc,
+    ocr_pages_tika,
 )
 from frontend.processing.file_repository import FileRepository
-from frontend.processing.processing import SolrImportDoc, parse_solr_document
-from models.models import Document
+from frontend.processing.pdf_inspection import inspect_pdf
+from frontend.processing.processing import (
+    Paragraph,
+    SolrImportDoc,
+    get_relevant_events,
+    organization_normalizer,
+    parse_relation_update,
+    parse_solr_document,
+)
+from frontend.search.utils import solr_connection
+from models.models import Document, EntityChange
+from parliscope.tasks.metrics import IndexingMetrics
+from parliscope.tasks.rebuild import (
+    abort_rebuild,
+    finish_rebuild,
+    rebuild_in_progress,
+    start_rebuild,
+)
+from parliscope.tasks.schema import atomic_update_blockers
+from parliscope.tasks.solr_writer import SolrBulkWriter
+from parliscope.tasks.suggest import SuggesterBuildError, build_suggester
 
 logger = get_task_logger(__name__)
 
+# number of documents looked up in solr at once before partial updates
+PARTIAL_LOOKUP_SIZE = 100
 
-@shared_task(bind=True)
-def update_solr_index(
-    self: Task, force: bool = False, allow_ocr: bool = True, chunk_size: int = 10
-) -> None:
-    """
-    Celery task to update Solr index from RIS database.
+
+def index_document(
+    document: Document,
+    force: bool = False,
+    allow_ocr: bool = True,
+    metrics: IndexingMetrics | None = None,
+) -> SolrImportDoc:
+    """Analyze the file of a document and build its Solr document
 
     Args:
 
-        force (bool): Force update for all documents
+        document (Document): The document to index
+        force (bool): Skip cached analysis results
         allow_ocr (bool): Allow OCR for documents (takes a long time)
-        chunk_size (int): Chunk size for sending documents to Solr
+        metrics (IndexingMetrics): Records the timings of the indexing stages
     """
-    logger.info("Starting Solr index update task")
+    metrics = metrics or IndexingMetrics()
+    with metrics.document(document):
+        return _index_document(document, force, allow_ocr, metrics)
 
-    file_repository = FileRepository()
-    solr = pysolr.Solr(f"{settings.SOLR_HOST}/{settings.SOLR_COLLECTION}")
 
-    solr_docs = []  # Batch of documents to send to Solr
-    total = Document.objects.all().count()
-    processed = 0
+def _has_text(content: list[Paragraph] | None) -> bool:
+    """True if extracted content has text (Tika returns "Page 1" for scans)"""
+    return bool(content) and any(
+        p.text.strip() not in ("", "Page 1") for p in content or []
+    )
 
-    def submit(solr_docs: list[SolrImportDoc], commit: bool = False) -> None:
-        logger.info(
-            f"Submitting {len(solr_docs)} documents to solr. (Processed={processed}/{total})"
-        )
-        solr.add(solr_docs, commit=commit)
 
-    for document in Document.objects.all():
-        document_name = document.file_name
-        logger.info(f"Processing {document_name} (id={str(document.id)})")
+def _merge_pages(
+    content: list[Paragraph] | None, ocr_content: list[Paragraph]
+) -> list[Paragraph]:
+    """Replaces the paragraphs of the OCRed pages by their OCR text"""
+    ocr_pages = {p.page for p in ocr_content}
+    merged = [p for p in content or [] if p.page not in ocr_pages]
+    merged.extend(ocr_content)
+    # paragraphs without page (from tika) stay in front, the order is kept
+    # within a page
+    return sorted(merged, key=lambda p: p.page or 0)
 
-        repository_file_path: str = file_repository.get_file_path(document.uri)
-        if document.content_type and not document.content_type.lower().endswith("pdf"):
-            try:
+
+def _index_document(
+    document: Document, force: bool, allow_ocr: bool, metrics: IndexingMetrics
+) -> SolrImportDoc:
+    file_repository = FileRepository()
+
+    document_name = document.file_name
+    logger.info(f"Processing {document_name} (id={str(document.id)})")
+
+    repository_file_path: str = file_repository.get_file_path(document.uri)
+    failed_analysis: list[str] = []  # see SolrImportDoc.failed_analysis
+    if document.content_type and not document.content_type.lower().endswith("pdf"):
+        try:
+            with metrics.stage("convert"):
                 file_path = convert_to_pdf(repository_file_path, skip_cache=force)
-            except ExternalServiceUnsuccessfulException:
-                file_path = None
-        else:
-            file_path = repository_file_path
+        except ExternalServiceUnsuccessfulException:
+            file_path = None
+            failed_analysis.append("convert")
+    else:
+        file_path = repository_file_path
+
+    # perform text analysis
+    content: list[Paragraph] | None = []
+    metadata: dict[str, Any] = {}
+    preview_image = None
+    if file_path is not None:
+        with metrics.stage("inspect"):
+            inspection = inspect_pdf(file_path)
+        if inspection is not None:
+            logger.info(f"PDF {document_name}: {inspection.report()}")
 
-        # perform text analysis
-        content: list[str] | None = []
-        metadata: dict[str, Any] = {}
-        preview_image = None
-        if file_path is not None:
+        # PDFs without a text layer go straight to OCR, the others to pdfact and
+        # to Tika if pdfact fails. Tika's metadata is only needed for PDFs that
+        # can't be read locally, these take all steps.
+        scanned = inspection is not None and not inspection.has_text_layer
+        tika_result = None
+        if not scanned:
             logger.info(f"Sending document {document_name} to pdfact")
             try:
-                content = analyze_document_pdfact(file_path, skip_cache=force)
+                with metrics.stage("pdfact"):
+                    content = analyze_document_pdfact(file_path, skip_cache=force)
             except ExternalServiceUnsuccessfulException:
                 content = None
+                failed_analysis.append("pdfact")
+
+            if inspection is None or not _has_text(content):
+                logger.info(f"Sending document {document_name} to tika")
+                with metrics.stage("tika"):
+                    tika_result = analyze_document_tika(
+                        file_path, False, skip_cache=force
+                    )
+
+                # use tika content if pdfact returned nothing
+                if (
+                    not _has_text(content)
+                    and tika_result
+                    and tika_result["content"] is not None
+                ):
+                    content = [Paragraph(tika_result["content"].strip())]
+
+        # Run OCR/tesseract for the pages without a text layer, or for the whole
+        # document if it has no text content and can't be inspected
+        ocr_pages = inspection.ocr_pages if inspection is not None else []
+        # scanned PDFs were OCRed as a whole before their pages were OCRed
+        # separately, that cached text is kept instead of OCRing them again
+        cached_ocr = None
+        if allow_ocr and scanned and not force:
+            cached_ocr = cached_ocr_tika(file_path)
+        if cached_ocr and cached_ocr["content"]:
+            tika_result = cached_ocr
+            content = [Paragraph(cached_ocr["content"].strip())]
+        elif allow_ocr and ocr_pages:
+            logger.info(
+                f"Sending {len(ocr_pages)} pages of {document_name} to tika/ocr"
+            )
+            with metrics.stage("tika_ocr"):
+                ocr_content, failed_pages = ocr_pages_tika(
+                    file_path, ocr_pages, skip_cache=force
+                )
+            content = _merge_pages(content, ocr_content)
+            if failed_pages or not _has_text(content):
+                failed_analysis.append("ocr")
+        elif allow_ocr and not _has_text(content):
+            logger.info(
+                f"PDF {document_name} has no text content. Sending document to tika/ocr"
+            )
+            with metrics.stage("tika_ocr"):
+                tika_result = analyze_document_tika(file_path, True, skip_cache=force)
+            if tika_result and tika_result["content"] is not None:
+                content = [Paragraph(tika_result["content"].strip())]
+            if not _has_text(content):
+                failed_analysis.append("ocr")
+
+        if tika_result:
+            metadata = tika_result["metadata"]
+        elif inspection is not None:
+            metadata = inspection.metadata
+
+        logger.info(f"Sending document {document_name} to preview service")
+        try:
+            with metrics.stage("preview"):
+                preview_image = get_preview_image_for_doc(file_path, skip_cache=force)
+        except ExternalServiceUnsuccessfulException as e:
+            # Empty preview image
+            logger.warning(f"Failed to get preview image for {file_path}: {e}")
+            preview_image = "data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw=="
+            failed_analysis.append("preview")
+
+    with metrics.stage("relations"):
+        events = get_relevant_events(document)
+    with metrics.stage("parse"):
+        solr_doc = parse_solr_document(
+            document, content, metadata, preview_image, events
+        )
+    solr_doc.failed_analysis = failed_analysis
+    return solr_doc
+
+
+def serialize_solr_docs(solr_docs: list[SolrImportDoc]) -> list[dict[str, Any]]:
+    """Serializes documents for Solr. Documents missing required fields are
+    skipped, so that they don't fail the whole batch."""
+    serialized = []
+    for solr_doc in solr_docs:
+        missing = solr_doc.missing_fields()
+        if missing:
+            logger.error(
+                f"Skipping document {solr_doc.document_id}, missing required fields: {', '.join(missing)}"
+            )
+            continue
+        serialized.append(solr_doc.to_solr())
+    return serialized
+
+
+def log_skipped_organizations() -> None:
+    if organization_normalizer.skipped:
+        logger.warning(
+            f"Invalid organizations skipped: {organization_normalizer.report()}"
+        )
+
+
+def refresh_suggester() -> None:
+    """Makes the indexed documents visible and rebuilds the suggester, which
+    isn't built on commit. Keeps the previous dictionary on failures."""
+    try:
+        solr_connection().commit(softCommit=True)
+        build_suggester()
+    except (pysolr.SolrError, SuggesterBuildError) as e:
+        logger.error(f"Failed to rebuild the suggester: {e}")
 
-            # analyze document with tika
-            logger.info(f"Sending document {document_name} to tika")
-            tika_result = analyze_document_tika(file_path, False, skip_cache=force)
 
-            # use tika content if pdfact returned nothing
-            if not content:
-                if tika_result and tika_result["content"] is not None:
-                    content = [tika_result["content"].strip()]
-                    if content and len(content) == 0:
-                        content = None
+@shared_task(bind=True)
+def update_solr_index(
+    self: Task,
+    force: bool = False,
+    allow_ocr: bool = True,
+    chunk_size: int = 500,
+    rebuild: bool = False,
+) -> dict[str, Any]:
+    """
+    Celery task to update Solr index from RIS database.
+
+    Args:
+
+        force (bool): Force update for all documents
+        allow_ocr (bool): Allow OCR for documents (takes a long time)
+        chunk_size (int): Maximum number of documents per batch sent to Solr
+            (batches are also limited to SOLR_BATCH_BYTES)
+        rebuild (bool): Index into a new core and swap it with the live
+            core once complete, instead of updating the live core in place
+
+    Returns the number of processed documents and the metrics of the run,
+    which are stored with the task result.
+    """
+    logger.info("Starting Solr index update task")
+
+    # changes recorded before this run are covered by the full update
+    started = timezone.now()
+    organization_normalizer.reset()
+    metrics = IndexingMetrics()
+    total = Document.objects.all().count()
+
+    url = None
+    if rebuild:
+        with metrics.stage("rebuild"):
+            url = start_rebuild()
+    try:
+        # the rebuild core is committed once it is complete
+        with SolrBulkWriter(
+            url, max_batch_docs=chunk_size, commit_within=-1 if rebuild else None
+        ) as writer:
+            for document in Document.objects.all():
+                solr_doc = index_document(
+                    document, force=force, allow_ocr=allow_ocr, metrics=metrics
+                )
+                with metrics.stage("solr"):
+                    submitted = writer.add_all(serialize_solr_docs([solr_doc]))
 
-                # Run OCR/tesseract if there is no content from tika without ocr
-                if allow_ocr and (not content or content == "Page 1"):
+                if submitted:
                     logger.info(
-                        f"PDF {document_name} has no text content. Sending document to tika/ocr"
+                        f"Submitted {writer.submitted} documents to solr. (Processed={metrics.counters['documents']}/{total})"
                     )
-                    tika_result = analyze_document_tika(
-                        file_path, True, skip_cache=force
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={
+                            "processed": writer.submitted,
+                            "total": total,
+                            "metrics": metrics.summary(),
+                        },
                     )
-                    if tika_result and tika_result["content"] is not None:
-                        content = [tika_result["content"].strip()]
-                        if content and len(content) == 0:
-                            content = None
 
-            metadata = tika_result["metadata"] if tika_result else {}
+            with metrics.stage("solr"):
+                writer.close()
+        if rebuild:
+            with metrics.stage("rebuild"):
+                finish_rebuild(expected=total)
+        else:
+            with metrics.stage("suggester"):
+                refresh_suggester()
+    except BaseException:
+        if rebuild:
+            abort_rebuild()
+        raise
 
-            if content:
-                content = [
-                    re.sub(r"(\n)\n+", "\n", paragraph) for paragraph in content
-                ]  # replace multiple new lines
+    processed = writer.written
+    EntityChange.objects.filter(created_at__lt=started).delete()
+    log_skipped_organizations()
+    logger.info(
+        f"Processed {processed} documents in {writer.batches} batches "
+        f"({writer.bytes_sent} bytes). all done."
+    )
+    logger.info(f"Stage timings: {metrics.report()}")
+    return {"processed": processed, "total": total, "metrics": metrics.summary()}
 
-            logger.info(f"Sending document {document_name} to preview service")
-            try:
-                preview_image = get_preview_image_for_doc(file_path, skip_cache=force)
-            except ExternalServiceUnsuccessfulException as e:
-                # Empty preview image
-                logger.warning(f"Failed to get preview image for {file_path}: {e}")
-                preview_image = "data:image/gif;base64,R0lGODlhAQABAAAAACH5BAEKAAEALAAAAAABAAEAAAICTAEAOw=="
-
-        solr_doc = parse_solr_document(document, content, metadata, preview_image)
-        solr_docs.append(solr_doc)
-
-        # write document to solr in chunks
-        if len(solr_docs) >= chunk_size:
-            submit(solr_docs)
-            processed += len(solr_docs)
-            self.update_state(
-                state="PROGRESS",
-                meta={"processed": processed, "total": total},
+
+def get_changed_documents(changes: list[EntityChange]) -> QuerySet[Document]:
+    """Returns all documents whose Solr document is affected by the given changes"""
+    ids: dict[str, list[int]] = defaultdict(list)
+    for change in changes:
+        ids[change.entity_type].append(change.entity_id)
+
+    query = Q(document_id__in=ids[EntityChange.DOCUMENT])
+    query |= Q(document_id__in=ids[EntityChange.DOCUMENT_RELATIONS])
+    # see get_relevant_events for how events are associated with documents
+    query |= Q(meeting__meeting_id__in=ids[EntityChange.MEETING])
+    query |= Q(consultation__meeting__meeting_id__in=ids[EntityChange.MEETING])
+    query |= Q(
+        consultation__agendaitem__meeting__meeting_id__in=ids[EntityChange.MEETING]
+    )
+    query |= Q(consultation__consultation_id__in=ids[EntityChange.CONSULTATION])
+    query |= Q(agendaitem__agenda_item_id__in=ids[EntityChange.AGENDA_ITEM])
+    query |= Q(
+        consultation__agendaitem__agenda_item_id__in=ids[EntityChange.AGENDA_ITEM]
+    )
+    return Document.objects.filter(query).distinct()
+
+
+def get_indexed_doc_types(ids: list[str]) -> dict[str, str | None]:
+    """Returns the document types of the given Solr documents that are indexed"""
+    result = solr_connection().search(
+        "*:*", fq="{!terms f=id}" + ",".join(ids), fl="id,doc_type", rows=len(ids)
+    )
+    return {doc["id"]: doc.get("doc_type") for doc in result.docs}
+
+
+@shared_task(bind=True)
+def index_changes(
+    self: Task, allow_ocr: bool = True, chunk_size: int = 500, partial: bool = True
+) -> int:
+    """
+    Celery task to re-index the documents affected by the changes
+    recorded by the scraper.
+
+    Documents that are only affected by changed meetings, consultations or
+    agenda items, or by new links to them, are updated with atomic updates
+    of their relation fields. Atomic updates are only used if the live core
+    doesn't store copy field destinations (see atomic_update_blockers).
+    Documents with a changed file, documents that are not indexed yet and
+    documents whose type changes (which affects the processing of their
+    content) are re-indexed completely.
+
+    Args:
+
+        allow_ocr (bool): Allow OCR for documents (takes a long time)
+        chunk_size (int): Maximum number of documents per batch sent to Solr
+        partial (bool): Use atomic updates for relation-only changes
+
+    Changes are deferred while a rebuild is in progress, as the rebuild
+    core would miss them otherwise.
+
+    Returns the number of re-indexed documents.
+    """
+    changes = list(EntityChange.objects.order_by("id"))
+    if len(changes) == 0:
+        return 0
+    if rebuild_in_progress():
+        # the changes are applied to the rebuilt index once it is swapped in
+        logger.info(f"Rebuild in progress, deferring {len(changes)} changes")
+        return 0
+
+    logger.info(f"Indexing {len(changes)} changed entities")
+    if partial:
+        blockers = atomic_update_blockers()
+        if blockers:
+            logger.warning(
+                f"The live core stores the copy fields {', '.join(blockers)}, "
+                "re-indexing all changed documents. Apply the schema with "
+                "`manage.py solr_schema --apply`."
             )
-            solr_docs.clear()
+            partial = False
+    organization_normalizer.reset()
+    metrics = IndexingMetrics()
+
+    changed_files = {
+        change.entity_id
+        for change in changes
+        if change.entity_type == EntityChange.DOCUMENT
+    }
+    full: list[Document] = []
+    relation_only: list[Document] = []
+    for document in get_changed_documents(changes):
+        if partial and document.document_id not in changed_files:
+            relation_only.append(document)
+        else:
+            full.append(document)
+
+    with SolrBulkWriter(max_batch_docs=chunk_size) as updater:
+        for documents in batched(relation_only, PARTIAL_LOOKUP_SIZE, strict=False):
+            with metrics.stage("solr_lookup"):
+                indexed = get_indexed_doc_types([str(d.id) for d in documents])
+            for document in documents:
+                with metrics.stage("relations"):
+                    update = parse_relation_update(document)
+                doc_id = str(document.id)
+                if (
+                    doc_id not in indexed
+                    or indexed[doc_id] != update["doc_type"]["set"]
+                ):
+                    full.append(document)
+                    continue
+                with metrics.stage("solr"):
+                    updater.add(update)
+        with metrics.stage("solr"):
+            updater.close()
+
+    with SolrBulkWriter(max_batch_docs=chunk_size) as writer:
+        for document in full:
+            solr_doc = index_document(document, allow_ocr=allow_ocr, metrics=metrics)
+            with metrics.stage("solr"):
+                writer.add_all(serialize_solr_docs([solr_doc]))
+        with metrics.stage("solr"):
+            writer.close()
+    processed = updater.written + writer.written
+    logger.info(
+        f"Updated relations of {updater.written} documents "
+        f"({updater.bytes_sent} bytes), re-indexed {writer.written} documents"
+    )
 
-    submit(solr_docs, commit=True)
-    processed += len(solr_docs)
-    logger.info(f"Processed {processed} documents. all done.")
+    # changes recorded while indexing are consumed by the next run
+    EntityChange.objects.filter(id__lte=changes[-1].id).delete()
+    log_skipped_organizations()
+    logger.info(f"Re-indexed {processed} documents for {len(changes)} changes")
+    logger.info(f"Stage timings: {metrics.report()}")
+    return processed
@@ -0,0 +1,222 @@
+import heapq
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from frontend.processing.external_services import cache
+from models.models import Document
+
+logger = logging.getLogger(__name__)
+
+INDEXING_TASK = "parliscope.tasks.indexing.update_solr_index"
+
+
+@dataclass
+class StageStats:
+    """Timings of a single indexing stage"""
+
+    calls: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+    failures: int = 0
+
+
+class IndexingMetrics:
+    """Per-document, per-stage timings and counters of an indexing run.
+
+    The summary is stored with the Celery task result, so that it can be
+    shown in the admin and exported as Prometheus metrics by the web process.
+    """
+
+    SLOWEST_DOCUMENTS = 10
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.stages: defaultdict[str, StageStats] = defaultdict(StageStats)
+        self.counters: Counter[str] = Counter()
+        # min-heap of (seconds, document_id, stage timings)
+        self.slowest: list[tuple[float, int, dict[str, float]]] = []
+        self._document_stages: dict[str, float] | None = None
+        self._cache_stats = Counter(cache.stats)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Times a stage; exceptions are counted as failures of the stage"""
+        stats = self.stages[name]
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if self._document_stages is not None:
+                self._document_stages[name] = (
+                    self._document_stages.get(name, 0.0) + elapsed
+                )
+
+    @contextmanager
+    def document(self, document: Document) -> Iterator[None]:
+        """Times the indexing of a document and the stages run for it"""
+        stages: dict[str, float] = {}
+        self._document_stages = stages
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.counters["failed_documents"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._document_stages = None
+            self.counters["documents"] += 1
+            self.counters["bytes"] += document.size or 0
+
+            logger.debug(
+                f"Indexed document {document.document_id} in {elapsed:.3f}s "
+                f"({', '.join(f'{name}={seconds:.3f}s' for name, seconds in stages.items())})"
+            )
+            entry = (elapsed, document.document_id, stages)
+            if len(self.slowest) < self.SLOWEST_DOCUMENTS:
+                heapq.heappush(self.slowest, entry)
+            elif entry > self.slowest[0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        """Cache hits and misses per cache postfix during this run"""
+        stats: dict[str, dict[str, int]] = defaultdict(lambda: {"hit": 0, "miss": 0})
+        for (postfix, result), count in (cache.stats - self._cache_stats).items():
+            stats[postfix][result] = count
+        return dict(stats)
+
+    def summary(self) -> dict[str, Any]:
+        """JSON serializable summary of the run"""
+        return {
+            "started": self.started,
+            "duration": time.time() - self.started,
+            "documents": self.counters["documents"],
+            "failed_documents": self.counters["failed_documents"],
+            "bytes": self.counters["bytes"],
+            "stages": {name: asdict(stats) for name, stats in self.stages.items()},
+            "cache": self.cache_stats(),
+            "slowest_documents": [
+                {"document_id": document_id, "seconds": seconds, "stages": stages}
+                for seconds, document_id, stages in sorted(self.slowest, reverse=True)
+            ],
+        }
+
+    def report(self) -> str:
+        """One line overview of the stage timings, slowest stage first"""
+        stages = sorted(self.stages.items(), key=lambda item: -item[1].seconds)
+        return ", ".join(
+            f"{name}={stats.seconds:.1f}s/{stats.calls}"
+            + (f" ({stats.failures} failed)" if stats.failures else "")
+            for name, stats in stages
+        )
+
+
+def last_indexing_run() -> dict[str, Any] | None:
+    """Returns status, date and metrics summary of the latest indexing task
+    that reported metrics (a finished run or the progress of a running one)"""
+    from django_celery_results.models import TaskResult
+
+    task_results = TaskResult.objects.filter(
+        task_name=INDEXING_TASK, status__in=["SUCCESS", "PROGRESS"]
+    ).order_by("-date_done")
+    for task_result in task_results[:5]:
+        try:
+            result = json.loads(task_result.result or "null")
+        except ValueError:
+            continue
+        if isinstance(result, dict) and isinstance(result.get("metrics"), dict):
+            return {
+                "status": task_result.status,
+                "date_done": task_result.date_done,
+                "processed": result.get("processed"),
+                "total": result.get("total"),
+                "metrics": result["metrics"],
+            }
+    return None
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(
+    summary: dict[str, Any], prefix: str = "parliscope_indexing"
+) -> str:
+    """Renders a metrics summary in the Prometheus text exposition format.
+
+    All values describe the last indexing run and are therefore gauges."""
+    lines: list[str] = []
+
+    def metric(
+        name: str, help: str, samples: list[tuple[dict[str, str], float]]
+    ) -> None:
+        lines.append(f"# HELP {prefix}_{name} {help}")
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(
+                f'{key}="{_escape_label(label)}"' for key, label in labels.items()
+            )
+            lines.append(
+                f"{prefix}_{name}{{{label_text}}} {value}"
+                if label_text
+                else f"{prefix}_{name} {value}"
+            )
+
+    stages = summary.get("stages", {})
+    metric(
+        "started_timestamp_seconds",
+        "Start of the last indexing run",
+        [({}, summary["started"])],
+    )
+    metric(
+        "duration_seconds",
+        "Duration of the last indexing run",
+        [({}, summary["duration"])],
+    )
+    metric(
+        "documents", "Documents indexed in the last run", [({}, summary["documents"])]
+    )
+    metric(
+        "failed_documents",
+        "Documents that failed in the last run",
+        [({}, summary["failed_documents"])],
+    )
+    metric(
+        "bytes",
+        "Bytes of the documents indexed in the last run",
+        [({}, summary["bytes"])],
+    )
+    for name, field, help in [
+        ("stage_seconds", "seconds", "Time spent per stage in the last run"),
+        ("stage_max_seconds", "max_seconds", "Slowest call per stage in the last run"),
+        ("stage_calls", "calls", "Calls per stage in the last run"),
+        ("stage_failures", "failures", "Failed calls per stage in the last run"),
+    ]:
+        metric(
+            name,
+            help,
+            [({"stage": stage}, stats[field]) for stage, stats in stages.items()],
+        )
+    metric(
+        "cache_lookups",
+        "Cache lookups of analysis results in the last run",
+        [
+            ({"cache": postfix, "result": result}, count)
+            for postfix, results in summary.get("cache", {}).items()
+            for result, count in results.items()
+        ],
+    )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,155 @@
+"""Blue/green rebuilds of the Solr index.
+
+Solr runs in standalone mode, where the equivalent of swapping a collection
+alias is swapping two cores (CoreAdmin SWAP, atomic and persisted). A
+rebuild indexes into a fresh core created from the configset, validates its
+document count against the database and then swaps it with the live core
+`SOLR_COLLECTION`. The previous index stays available under the name of the
+rebuild core, so swapping again rolls back instantly.
+"""
+
+import logging
+import re
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pysolr
+from django.conf import settings
+from django.utils import timezone
+
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+from parliscope.tasks.suggest import build_suggester
+
+logger = logging.getLogger(__name__)
+
+# the rebuild core only receives updates, so it doesn't open searchers
+# (no soft commits, no cache warming) and only hard commits every 5 minutes.
+# These are core properties substituted in solrconfig.xml: unlike the Config
+# API overlay, which belongs to the configset, they only apply to this core.
+REBUILD_PROPERTIES = {
+    "solr.autoCommit.maxDocs": "-1",
+    "solr.autoCommit.maxTime": "300000",
+    "solr.autoSoftCommit.maxTime": "-1",
+}
+# a rebuild that didn't finish in this time is considered failed
+REBUILD_TIMEOUT = timedelta(hours=24)
+
+
+class RebuildError(Exception):
+    pass
+
+
+def rebuild_core() -> str:
+    """Name of the core a rebuild indexes into"""
+    return f"{settings.SOLR_COLLECTION}_rebuild"
+
+
+def _started(status: dict[str, Any]) -> datetime | None:
+    """Start time of a rebuild from the name of its instance dir"""
+    match = re.search(r"_(\d{14})/?$", status.get("instanceDir", ""))
+    if match is None:
+        return None
+    return datetime.strptime(match.group(1), "%Y%m%d%H%M%S").replace(tzinfo=UTC)
+
+
+def _unfinished(core: str, admin: SolrCoreAdmin) -> bool:
+    """Whether the core still has the commit settings of a rebuild"""
+    update_handler = admin.config(core, "updateHandler")
+    max_time = update_handler.get("autoSoftCommit", {}).get("maxTime")
+    return str(max_time) == REBUILD_PROPERTIES["solr.autoSoftCommit.maxTime"]
+
+
+def start_rebuild(admin: SolrCoreAdmin | None = None) -> str:
+    """Creates an empty rebuild core and returns its URL.
+
+    A leftover rebuild core (the previous index after a swap, or an aborted
+    rebuild) is removed first."""
+    admin = admin or SolrCoreAdmin()
+    core = rebuild_core()
+    status = admin.status(core)
+    if status is not None:
+        # the instance dir of the core created by solr-precreate is kept,
+        # otherwise the container would precreate it again on restart
+        instance_dir = status.get("instanceDir", "").rstrip("/")
+        delete_instance_dir = not instance_dir.endswith(f"/{settings.SOLR_COLLECTION}")
+        logger.info(f"Removing previous rebuild core {core} ({instance_dir})")
+        admin.unload(core, delete_instance_dir)
+
+    started = timezone.now()
+    instance_dir = f"{settings.SOLR_COLLECTION}_{started:%Y%m%d%H%M%S}"
+    admin.create(core, instance_dir, settings.SOLR_CONFIGSET, REBUILD_PROPERTIES)
+    logger.info(f"Created rebuild core {core} in {instance_dir}")
+    return f"{admin.host}/{core}"
+
+
+def finish_rebuild(expected: int, admin: SolrCoreAdmin | None = None) -> int:
+    """Commits the rebuild core and swaps it with the live core if it holds
+    at least the expected number of documents (less SOLR_REBUILD_MAX_MISSING)
+    and its suggester could be built. Returns the document count.
+
+    Before the swap, the core is unloaded and created again on its index
+    without the rebuild properties, which restores the configured commit
+    settings.
+    """
+    admin = admin or SolrCoreAdmin()
+    core = rebuild_core()
+    admin.commit(core)
+
+    count = admin.count(core)
+    if count < expected - settings.SOLR_REBUILD_MAX_MISSING:
+        raise RebuildError(
+            f"Rebuild core {core} contains {count} of {expected} documents, "
+            f"keeping the live core {settings.SOLR_COLLECTION}"
+        )
+    status = admin.status(core)
+    if status is None:
+        raise RebuildError(f"Rebuild core {core} doesn't exist")
+    admin.unload(core, delete_instance_dir=False, delete_index=False)
+    admin.create(core, status["instanceDir"], settings.SOLR_CONFIGSET)
+    # the suggester isn't built on commit
+    build_suggester(core, all_dictionaries=True, admin=admin)
+    admin.swap(settings.SOLR_COLLECTION, core)
+    logger.info(
+        f"Swapped rebuild core with {settings.SOLR_COLLECTION} ({count} documents), "
+        f"the previous index is available as {core}"
+    )
+    return count
+
+
+def abort_rebuild(admin: SolrCoreAdmin | None = None) -> None:
+    """Removes the core of a failed rebuild"""
+    admin = admin or SolrCoreAdmin()
+    core = rebuild_core()
+    if admin.status(core) is None:
+        return
+    logger.warning(f"Removing the core {core} of the failed rebuild")
+    admin.unload(core, delete_instance_dir=True)
+
+
+def rollback_rebuild(admin: SolrCoreAdmin | None = None) -> None:
+    """Swaps the live core back with the previous index"""
+    admin = admin or SolrCoreAdmin()
+    core = rebuild_core()
+    if admin.status(core) is None:
+        raise RebuildError(f"There is no previous index ({core}) to roll back to")
+    if _unfinished(core, admin):
+        raise RebuildError(f"{core} is an unfinished rebuild, not a previous index")
+    admin.swap(settings.SOLR_COLLECTION, core)
+    logger.info(f"Swapped {settings.SOLR_COLLECTION} with {core}")
+
+
+def rebuild_in_progress(admin: SolrCoreAdmin | None = None) -> bool:
+    """Returns True while a rebuild is indexing into the rebuild core"""
+    admin = admin or SolrCoreAdmin()
+    core = rebuild_core()
+    try:
+        status = admin.status(core)
+        if status is None or not _unfinished(core, admin):
+            return False
+    except pysolr.SolrError as e:
+        logger.warning(f"Failed to check for a rebuild in progress: {e}")
+        return False
+    started = _started(status)
+    if started is None:
+        return False
+    return timezone.now() - started < REBUILD_TIMEOUT
@@ -0,0 +1,197 @@
+import json
+from collections.abc import Iterator
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import pysolr
+from celery import shared_task
+from celery.app.task import Task
+from celery.utils.log import get_task_logger
+from django.db import connection
+from django.db.models import CharField, Func
+from django.db.models.functions import Cast, Collate
+from django.utils import timezone
+
+from frontend.search.utils import solr_connection
+from models.models import Document, EntityChange
+
+logger = get_task_logger(__name__)
+
+RECONCILE_TASK = "parliscope.tasks.reconcile.reconcile_solr_index"
+
+# number of ids shown per kind of difference
+SAMPLE_SIZE = 20
+
+
+def iter_solr_ids(solr: pysolr.Solr, rows: int = 1000) -> Iterator[str]:
+    """Streams the ids of all Solr documents in index order of the id field"""
+    cursor = "*"
+    while True:
+        result = solr.search(
+            "*:*", fl="id", sort="id asc", rows=rows, cursorMark=cursor
+        )
+        for doc in result.docs:
+            yield doc["id"]
+        # a short page is the last one, saves the request of the final cursor
+        if len(result.docs) < rows or result.nextCursorMark in (None, cursor):
+            return
+        cursor = result.nextCursorMark
+
+
+def iter_db_ids(batch_size: int = 1000) -> Iterator[str]:
+    """Streams the ids of all documents in the same (binary string) order as
+    the id field of the Solr index. The ids are sorted once and fetched in
+    batches from a server-side cursor, as no index covers this order."""
+    key: Func = Cast("id", output_field=CharField())
+    if connection.vendor == "postgresql":
+        key = Collate(key, "C")
+
+    documents = Document.objects.annotate(key=key).order_by("key")
+    yield from documents.values_list("key", flat=True).iterator(chunk_size=batch_size)
+
+
+def diff_sorted(
+    db_ids: Iterator[str], solr_ids: Iterator[str]
+) -> Iterator[tuple[str, str]]:
+    """Merges two sorted id streams, yields ("missing", id) for ids only in
+    the database and ("orphaned", id) for ids only in Solr"""
+    db_id = next(db_ids, None)
+    solr_id = next(solr_ids, None)
+    while db_id is not None and solr_id is not None:
+        if db_id < solr_id:
+            yield "missing", db_id
+            db_id = next(db_ids, None)
+        elif solr_id < db_id:
+            yield "orphaned", solr_id
+            solr_id = next(solr_ids, None)
+        else:
+            db_id = next(db_ids, None)
+            solr_id = next(solr_ids, None)
+    if db_id is not None:
+        yield "missing", db_id
+        for db_id in db_ids:
+            yield "missing", db_id
+    if solr_id is not None:
+        yield "orphaned", solr_id
+        for solr_id in solr_ids:
+            yield "orphaned", solr_id
+
+
+@dataclass
+class Reconciliation:
+    """Differences between the documents table and the Solr index"""
+
+    missing: int = 0  # documents that are not indexed
+    orphaned: int = 0  # indexed documents that were removed from the database
+    deleted: int = 0
+    enqueued: int = 0
+    missing_sample: list[str] = field(default_factory=list)
+    orphaned_sample: list[str] = field(default_factory=list)
+    finished: str = ""
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def reconcile(
+    delete: bool = True, enqueue: bool = True, batch_size: int = 1000
+) -> Reconciliation:
+    """Diffs the ids of the database and the Solr index in constant memory.
+
+    Orphaned Solr documents are deleted and missing documents are enqueued
+    in the entity change outbox for the index_changes task, both in batches.
+    """
+    solr = solr_connection()
+    result = Reconciliation()
+    orphaned: list[str] = []
+    missing: list[str] = []
+
+    def delete_orphaned() -> None:
+        if delete and orphaned:
+            solr.delete(id=list(orphaned), commit=False)
+            result.deleted += len(orphaned)
+        orphaned.clear()
+
+    def enqueue_missing() -> None:
+        if enqueue and missing:
+            document_ids = Document.objects.filter(id__in=missing).values_list(
+                "document_id", flat=True
+            )
+            now = timezone.now()
+            EntityChange.objects.bulk_create(
+                EntityChange(
+                    entity_type=EntityChange.DOCUMENT,
+                    entity_id=document_id,
+                    created_at=now,
+                )
+                for document_id in document_ids
+            )
+            result.enqueued += len(document_ids)
+        missing.clear()
+
+    diff = diff_sorted(iter_db_ids(batch_size), iter_solr_ids(solr, batch_size))
+    for kind, id in diff:
+        if kind == "orphaned":
+            result.orphaned += 1
+            if len(result.orphaned_sample) < SAMPLE_SIZE:
+                result.orphaned_sample.append(id)
+            orphaned.append(id)
+            if len(orphaned) >= batch_size:
+                delete_orphaned()
+        else:
+            result.missing += 1
+            if len(result.missing_sample) < SAMPLE_SIZE:
+                result.missing_sample.append(id)
+            missing.append(id)
+            if len(missing) >= batch_size:
+                enqueue_missing()
+    delete_orphaned()
+    enqueue_missing()
+
+    if result.deleted:
+        solr.commit(softCommit=True)
+    result.finished = timezone.now().isoformat()
+    return result
+
+
+def last_reconciliation() -> dict[str, Any] | None:
+    """Returns the differences found by the latest reconciliation task"""
+    from django_celery_results.models import TaskResult
+
+    task_result = (
+        TaskResult.objects.filter(task_name=RECONCILE_TASK, status="SUCCESS")
+        .order_by("-date_done")
+        .first()
+    )
+    if task_result is None:
+        return None
+    try:
+        result = json.loads(task_result.result or "null")
+    except ValueError:
+        return None
+    if not isinstance(result, dict):
+        return None
+    return {"date_done": task_result.date_done, **result}
+
+
+@shared_task(bind=True)
+def reconcile_solr_index(
+    self: Task, delete: bool = True, enqueue: bool = True, batch_size: int = 1000
+) -> dict[str, Any]:
+    """
+    Celery task to reconcile the Solr index with the database.
+
+    Args:
+
+        delete (bool): Delete Solr documents of removed database rows
+        enqueue (bool): Enqueue documents missing in Solr for index_changes
+        batch_size (int): Number of ids fetched and deleted per request
+
+    Returns the differences found, which are stored with the task result.
+    """
+    result = reconcile(delete, enqueue, batch_size)
+    logger.info(
+        f"Reconciled solr index: {result.missing} missing ({result.enqueued} enqueued), "
+        f"{result.orphaned} orphaned ({result.deleted} deleted)"
+    )
+    return result.to_dict()
@@ -0,0 +1,142 @@
+"""Schema migrations of the Solr index.
+
+The schema is a classic schema.xml (not managed), so it can't be changed
+with the Schema API. It is deployed with the configset of the Solr image
+instead. The live core is compared with a temporary core created from that
+configset. Changes that only affect queries are applied by reloading the
+live core, all others by a rebuild of the index into a new core.
+"""
+
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+
+# named schema elements compared by the diff
+ELEMENTS = {
+    "fieldTypes": "field type",
+    "fields": "field",
+    "dynamicFields": "dynamic field",
+}
+
+
+@dataclass
+class SchemaChange:
+    """A difference between the live schema and the schema of the configset"""
+
+    element: str
+    name: str
+    action: str  # added, removed or changed
+    reindex: bool  # existing documents have to be indexed again
+
+    def __str__(self) -> str:
+        sign = {"added": "+", "removed": "-", "changed": "~"}[self.action]
+        reindex = " (requires reindex)" if self.reindex else ""
+        return f"{sign} {self.element} {self.name}{reindex}"
+
+
+def configset_schema(admin: SolrCoreAdmin) -> dict[str, Any]:
+    """Schema of the configset deployed with Solr, read from a temporary core"""
+    core = f"{settings.SOLR_COLLECTION}_schema"
+    if admin.status(core) is not None:
+        admin.unload(core, delete_instance_dir=True)
+    admin.create(core, core, settings.SOLR_CONFIGSET)
+    try:
+        return admin.schema(core)
+    finally:
+        admin.unload(core, delete_instance_dir=True)
+
+
+def _requires_reindex(element: str, live: dict[str, Any], new: dict[str, Any]) -> bool:
+    if element == "fieldTypes":
+        # only the query analyzer is used without touching the index
+        changed = {
+            key for key in live.keys() | new.keys() if live.get(key) != new.get(key)
+        }
+        return changed != {"queryAnalyzer"}
+    return True
+
+
+def diff_schemas(live: dict[str, Any], new: dict[str, Any]) -> list[SchemaChange]:
+    """Changes from the live schema to the new schema"""
+    changes = []
+    for element, label in ELEMENTS.items():
+        live_items = {item["name"]: item for item in live.get(element, [])}
+        new_items = {item["name"]: item for item in new.get(element, [])}
+        for name in sorted(live_items.keys() | new_items.keys()):
+            if name not in live_items:
+                # new fields are empty in existing documents, unless they are
+                # the destination of a new copy field
+                changes.append(SchemaChange(label, name, "added", False))
+            elif name not in new_items:
+                changes.append(SchemaChange(label, name, "removed", False))
+            elif live_items[name] != new_items[name]:
+                reindex = _requires_reindex(element, live_items[name], new_items[name])
+                changes.append(SchemaChange(label, name, "changed", reindex))
+
+    def copy_fields(schema: dict[str, Any]) -> set[str]:
+        return {f"{c['source']} -> {c['dest']}" for c in schema.get("copyFields", [])}
+
+    live_copies, new_copies = copy_fields(live), copy_fields(new)
+    for name in sorted(new_copies - live_copies):
+        changes.append(SchemaChange("copy field", name, "added", True))
+    for name in sorted(live_copies - new_copies):
+        changes.append(SchemaChange("copy field", name, "removed", False))
+
+    if live.get("uniqueKey") != new.get("uniqueKey"):
+        changes.append(
+            SchemaChange("unique key", new.get("uniqueKey", ""), "changed", True)
+        )
+    return changes
+
+
+def schema_changes(admin: SolrCoreAdmin | None = None) -> list[SchemaChange]:
+    """Changes of the deployed configset that the live core doesn't have yet"""
+    admin = admin or SolrCoreAdmin()
+    return diff_schemas(admin.schema(settings.SOLR_COLLECTION), configset_schema(admin))
+
+
+def _flag(
+    field: dict[str, Any], field_type: dict[str, Any], name: str, default: bool
+) -> bool:
+    """Property of a field, inherited from its type. The Schema API returns
+    booleans, schema.xml strings."""
+    value = field.get(name, field_type.get(name))
+    return default if value is None else value is True or value == "true"
+
+
+def stored_copy_destinations(schema: dict[str, Any]) -> list[str]:
+    """Copy field destinations whose values are stored, or returned from
+    docValues as stored. Atomic updates read the stored values of a document
+    back, so the new copies would be added to the old ones."""
+    field_types = {t["name"]: t for t in schema.get("fieldTypes", [])}
+    schema_fields = {f["name"]: f for f in schema.get("fields", [])}
+    stored = []
+    for dest in sorted({c["dest"] for c in schema.get("copyFields", [])}):
+        field = schema_fields.get(dest)
+        if field is None:
+            continue  # dynamic field
+        field_type = field_types.get(field.get("type"), {})
+        if _flag(field, field_type, "stored", True) or (
+            _flag(field, field_type, "docValues", False)
+            and _flag(field, field_type, "useDocValuesAsStored", True)
+        ):
+            stored.append(dest)
+    return stored
+
+
+def atomic_update_blockers(admin: SolrCoreAdmin | None = None) -> list[str]:
+    """Stored copy field destinations of the live core, which prevent atomic
+    updates until the current schema is applied with a reindex"""
+    admin = admin or SolrCoreAdmin()
+    return stored_copy_destinations(admin.schema(settings.SOLR_COLLECTION))
+
+
+def reload_live_core(admin: SolrCoreAdmin | None = None) -> list[SchemaChange]:
+    """Reloads the live core and returns the changes it still lacks (the
+    core created by solr-precreate has its own copy of the configuration)"""
+    admin = admin or SolrCoreAdmin()
+    admin.reload(settings.SOLR_COLLECTION)
+    return schema_changes(admin)
@@ -0,0 +1,113 @@
+from typing import Any
+
+import pysolr
+import requests
+from django.conf import settings
+
+
+class SolrCoreAdmin:
+    """Client for the CoreAdmin and Config APIs of a standalone Solr"""
+
+    def __init__(self, host: str | None = None, timeout: int = 300) -> None:
+        self.host = host or settings.SOLR_HOST
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _request(
+        self,
+        path: str,
+        params: dict[str, str] | None = None,
+        json: dict[str, Any] | None = None,
+    ) -> dict[str, Any]:
+        try:
+            response = self.session.request(
+                "POST" if json is not None else "GET",
+                f"{self.host}/{path}",
+                params={**(params or {}), "wt": "json"},
+                json=json,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise pysolr.SolrError(f"Failed to connect to solr: {e}") from e
+        if response.status_code != 200:
+            raise pysolr.SolrError(
+                f"Solr request {path} failed (HTTP {response.status_code}): "
+                f"{response.text[:500]}"
+            )
+        result: dict[str, Any] = response.json()
+        return result
+
+    def _cores(self, action: str, **params: str) -> dict[str, Any]:
+        return self._request("admin/cores", {"action": action, **params})
+
+    def status(self, core: str) -> dict[str, Any] | None:
+        """Status of a core, None if it doesn't exist"""
+        status = self._cores("STATUS", core=core, indexInfo="false")["status"]
+        return status.get(core) or None
+
+    def create(
+        self,
+        core: str,
+        instance_dir: str,
+        config_set: str,
+        properties: dict[str, str] | None = None,
+    ) -> None:
+        """Creates a core, the properties are stored in its core.properties"""
+        self._cores(
+            "CREATE",
+            name=core,
+            instanceDir=instance_dir,
+            configSet=config_set,
+            **{f"property.{k}": v for k, v in (properties or {}).items()},
+        )
+
+    def unload(
+        self, core: str, delete_instance_dir: bool, delete_index: bool = True
+    ) -> None:
+        self._cores(
+            "UNLOAD",
+            core=core,
+            deleteIndex=str(delete_index).lower(),
+            deleteDataDir=str(delete_index).lower(),
+            deleteInstanceDir=str(delete_instance_dir).lower(),
+        )
+
+    def swap(self, core: str, other: str) -> None:
+        self._cores("SWAP", core=core, other=other)
+
+    def reload(self, core: str) -> None:
+        """Reloads the configuration and schema of a core"""
+        self._cores("RELOAD", core=core)
+
+    def schema(self, core: str) -> dict[str, Any]:
+        """Schema of a core as returned by the Schema API"""
+        schema: dict[str, Any] = self._request(f"{core}/schema")["schema"]
+        return schema
+
+    def overlay(self, core: str) -> dict[str, Any]:
+        """Properties set with the Config API"""
+        overlay: dict[str, Any] = self._request(f"{core}/config/overlay")["overlay"]
+        return overlay
+
+    def set_properties(
+        self, core: str, properties: dict[str, Any], user_properties: dict[str, Any]
+    ) -> None:
+        commands = {"set-property": properties, "set-user-property": user_properties}
+        self._request(f"{core}/config", json={k: v for k, v in commands.items() if v})
+
+    def config(self, core: str, component: str) -> dict[str, Any]:
+        """Effective configuration of a component, e.g. updateHandler"""
+        config: dict[str, Any] = self._request(f"{core}/config/{component}")["config"]
+        return dict(config.get(component, {}))
+
+    def commit(self, core: str) -> None:
+        """Hard commit that opens a new searcher and waits for it"""
+        self._request(
+            f"{core}/update",
+            {"commit": "true", "openSearcher": "true", "waitSearcher": "true"},
+        )
+
+    def count(self, core: str) -> int:
+        result = self._request(f"{core}/select", {"q": "*:*", "rows": "0"})
+        count: int = result["response"]["numFound"]
+        return count
@@ -0,0 +1,149 @@
+import gzip
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+import pysolr
+import requests
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SolrBulkWriter:
+    """Streams documents to the /update handler of Solr.
+
+    Documents are serialized as they are added and collected into batches
+    limited by their encoded size (and optionally a number of documents).
+    Up to `max_in_flight` batches are posted concurrently, while the caller
+    keeps preparing the next batch. Documents are made visible by Solr with
+    `commitWithin` instead of explicit commits.
+
+    Errors of a batch are raised as pysolr.SolrError from a later call of
+    `add` or from `close`.
+
+    Batches are sent as JSON arrays of documents, which may contain nested
+    child documents and atomic updates.
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        handler: str = "/update",
+        max_batch_bytes: int | None = None,
+        max_batch_docs: int | None = None,
+        commit_within: int | None = None,
+        max_in_flight: int | None = None,
+        compress: bool | None = None,
+        timeout: int = 60,
+    ) -> None:
+        self.url = (url or f"{settings.SOLR_HOST}/{settings.SOLR_COLLECTION}") + handler
+        self.max_batch_bytes = max_batch_bytes or settings.SOLR_BATCH_BYTES
+        self.max_batch_docs = max_batch_docs
+        self.commit_within = commit_within or settings.SOLR_COMMIT_WITHIN
+        self.max_in_flight = max_in_flight or settings.SOLR_UPDATE_THREADS
+        self.compress = settings.SOLR_UPDATE_GZIP if compress is None else compress
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            self.max_in_flight, thread_name_prefix="solr-writer"
+        )
+        self.in_flight: list[Future[int]] = []
+        self.batch: list[bytes] = []
+        self.batch_bytes = 0
+
+        # statistics
+        self.submitted = 0  # documents in submitted batches
+        self.written = 0  # documents acknowledged by solr
+        self.batches = 0
+        self.bytes_sent = 0
+
+    def add(self, doc: dict[str, Any]) -> bool:
+        """Adds a document, returns True if a batch was submitted"""
+        encoded = json.dumps(doc, ensure_ascii=False).encode()
+        submitted = False
+        if self.batch and self.batch_bytes + len(encoded) > self.max_batch_bytes:
+            self.flush()
+            submitted = True
+        self.batch.append(encoded)
+        self.batch_bytes += len(encoded) + 1
+        if self.max_batch_docs and len(self.batch) >= self.max_batch_docs:
+            self.flush()
+            submitted = True
+        return submitted
+
+    def add_all(self, docs: list[dict[str, Any]]) -> bool:
+        """Adds documents, returns True if a batch was submitted"""
+        submitted = False
+        for doc in docs:
+            submitted |= self.add(doc)
+        return submitted
+
+    def flush(self) -> None:
+        """Submits the current batch, waits if too many batches are in flight"""
+        if not self.batch:
+            return
+        body = b"[" + b",".join(self.batch) + b"]"
+        count = len(self.batch)
+        self.batch = []
+        self.batch_bytes = 0
+
+        while len(self.in_flight) >= self.max_in_flight:
+            self._wait(self.in_flight.pop(0))
+        self.in_flight.append(self.executor.submit(self._post, body, count))
+        self.submitted += count
+        self.batches += 1
+
+    def close(self) -> None:
+        """Submits the remaining documents and waits for all batches"""
+        try:
+            self.flush()
+            while self.in_flight:
+                self._wait(self.in_flight.pop(0))
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+
+    def __enter__(self) -> "SolrBulkWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # don't hide the original exception behind failing batches
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.session.close()
+
+    def _wait(self, future: Future[int]) -> None:
+        self.written += future.result()
+
+    def _post(self, body: bytes, count: int) -> int:
+        headers = {"Content-Type": "application/json"}
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        with self.lock:
+            self.bytes_sent += len(body)
+
+        try:
+            response = self.session.post(
+                self.url,
+                params={"commitWithin": str(self.commit_within), "wt": "json"},
+                data=body,
+                headers=headers,
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise pysolr.SolrError(f"Failed to connect to solr: {e}") from e
+        if response.status_code != 200:
+            raise pysolr.SolrError(
+                f"Solr update of {count} documents failed "
+                f"(HTTP {response.status_code}): {response.text[:500]}"
+            )
+        logger.debug(f"Sent {count} documents ({len(body)} bytes) to solr")
+        return count
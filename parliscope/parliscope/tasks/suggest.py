@@ -0,0 +1,126 @@
+import re
+import time
+from typing import Any
+
+import pysolr
+from celery import shared_task
+from celery.app.task import Task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+
+logger = get_task_logger(__name__)
+
+# suggesters configured in solrconfig.xml, built alternately
+DICTIONARIES = ("a", "b")
+# user property selecting the dictionary of the /suggest handler
+DICTIONARY_PROPERTY = "parliscope.suggest.dictionary"
+
+# number of document titles used to validate a dictionary
+PROBE_COUNT = 20
+# share of probes that have to return suggestions
+MIN_HIT_RATE = 0.5
+WORD = re.compile(r"[^\W\d_]{4,}")
+
+
+class SuggesterBuildError(Exception):
+    pass
+
+
+def active_dictionary(admin: SolrCoreAdmin, core: str) -> str:
+    """Name of the dictionary the /suggest handler of a core uses"""
+    user_properties = admin.overlay(core).get("userProps", {})
+    return str(user_properties.get(DICTIONARY_PROPERTY, DICTIONARIES[0]))
+
+
+def probe_prefixes(solr: pysolr.Solr, count: int = PROBE_COUNT) -> list[str]:
+    """Prefixes of words from indexed document titles, which should have
+    suggestions"""
+    result = solr.search(
+        "*:*", fq="doc_title:[* TO *]", fl="doc_title", rows=count, sort="id desc"
+    )
+    prefixes = []
+    for doc in result.docs:
+        title = doc["doc_title"]
+        word = WORD.search(title[0] if isinstance(title, list) else title)
+        if word:
+            prefixes.append(word.group().lower()[:4])
+    return prefixes
+
+
+def build_dictionary(
+    solr: pysolr.Solr, dictionary: str, prefixes: list[str]
+) -> dict[str, Any]:
+    """Builds a dictionary and validates it with the given prefixes"""
+    started = time.perf_counter()
+    solr.search(
+        "",
+        search_handler="/suggest",
+        **{"suggest.build": "true", "suggest.dictionary": dictionary},
+    )
+    seconds = time.perf_counter() - started
+
+    hits = 0
+    for prefix in prefixes:
+        response = solr.search(
+            prefix, search_handler="/suggest", **{"suggest.dictionary": dictionary}
+        )
+        if response.raw_response["suggest"][dictionary][prefix]["numFound"]:
+            hits += 1
+    if prefixes and hits < MIN_HIT_RATE * len(prefixes):
+        raise SuggesterBuildError(
+            f"Dictionary {dictionary} has suggestions for {hits} of "
+            f"{len(prefixes)} probes: {', '.join(prefixes)}"
+        )
+    return {
+        "dictionary": dictionary,
+        "seconds": seconds,
+        "probes": len(prefixes),
+        "hits": hits,
+    }
+
+
+def build_suggester(
+    core: str | None = None,
+    all_dictionaries: bool = False,
+    admin: SolrCoreAdmin | None = None,
+) -> dict[str, Any]:
+    """Builds the inactive dictionary of the suggester of a core and
+    activates it once it is validated.
+
+    With `all_dictionaries`, every dictionary is built (for cores that
+    aren't searched yet, like a rebuild core) and the active one is kept.
+    """
+    admin = admin or SolrCoreAdmin()
+    core = core or settings.SOLR_COLLECTION
+    solr = pysolr.Solr(f"{admin.host}/{core}", timeout=admin.timeout)
+    prefixes = probe_prefixes(solr)
+
+    active = active_dictionary(admin, core)
+    if all_dictionaries:
+        builds = [build_dictionary(solr, name, prefixes) for name in DICTIONARIES]
+        return {"active": active, "builds": builds}
+
+    (inactive,) = (name for name in DICTIONARIES if name != active)
+    build = build_dictionary(solr, inactive, prefixes)
+    # reloads the core, the dictionaries are loaded from their index
+    admin.set_properties(core, {}, {DICTIONARY_PROPERTY: inactive})
+    logger.info(
+        f"Activated suggester dictionary {inactive} of {core}, built in "
+        f"{build['seconds']:.1f}s ({build['hits']}/{build['probes']} probes)"
+    )
+    return {"active": inactive, "builds": [build]}
+
+
+@shared_task(bind=True)
+def update_suggester(self: Task) -> dict[str, Any]:
+    """
+    Celery task to rebuild the search suggestions of the live core.
+
+    The suggester isn't built on commit, so this runs after each index
+    update and can be scheduled in addition.
+
+    Returns the active dictionary and the validation of the build.
+    """
+    return build_suggester()
@@ -31,14 +31,17 @@ INSTALLED_APPS = [
     "parliscope",
     "frontend",
     "models",
+    "healthcheck",
     "fontawesomefree",
     "django_celery_beat",
+    "django_celery_results",
     "health_check",
     "health_check.db",
     "health_check.contrib.migrations",
 ]
 
 MIDDLEWARE = [
+    "frontend.middleware.TracingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -93,10 +96,19 @@ DATABASES = {
 # Disable external service dependencies for tests
 SOLR_HOST = "http://mock-solr:8983/solr"
 SOLR_COLLECTION = "test_ris"
+SOLR_COMMIT_WITHIN = 10000
+SOLR_BATCH_BYTES = 4 * 1024 * 1024
+SOLR_UPDATE_THREADS = 2
+SOLR_UPDATE_GZIP = False
+SOLR_CONFIGSET = "ris"
+SOLR_REBUILD_MAX_MISSING = 0
 TIKA_HOST = "http://mock-tika:9998"
 PDFACT_HOST = "http://mock-pdfact:80"
 GOTENBERG_HOST = "http://mock-gotenberg:3000"
+OCR_WORKERS = 2
 PREVIEW_HOST = "http://mock-preview:8000"
+HEALTHCHECK_TIMEOUT = 1
+HEALTHCHECK_CACHE_SECONDS = 0
 
 # Test document storage
 DOCUMENT_STORE = "/tmp/test_filestore"
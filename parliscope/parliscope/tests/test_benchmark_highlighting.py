@@ -0,0 +1,65 @@
+from typing import Any
+
+import pysolr
+from django.test import SimpleTestCase
+
+from parliscope.benchmarks.highlighting import compare, run_highlight_benchmark
+
+
+class FakeSolr:
+    """Highlights twice as fast with stored offsets as with analysis"""
+
+    def __init__(self) -> None:
+        self.requests: list[dict[str, Any]] = []
+
+    def search(self, q: str, **kwargs: Any) -> pysolr.Results:
+        self.requests.append({"q": q, **kwargs})
+        if "debug" not in kwargs:
+            docs = [{"id": "7"}, {"id": "3"}]
+            return pysolr.Results({"response": {"numFound": 2, "docs": docs}})
+        highlight = 20 if kwargs.get("hl.offsetSource") == "ANALYSIS" else 10
+        return pysolr.Results(
+            {
+                "responseHeader": {"QTime": highlight + 5},
+                "response": {"numFound": 2, "docs": []},
+                "debug": {"timing": {"process": {"highlight": {"time": highlight}}}},
+            }
+        )
+
+
+class HighlightBenchmarkTest(SimpleTestCase):
+    """Test cases for the highlighting benchmark."""
+
+    def test_run_highlight_benchmark(self) -> None:
+        """Both variants highlight the largest documents alternately."""
+        solr = FakeSolr()
+
+        results = run_highlight_benchmark(
+            documents=2, iterations=3, queries=["Haushalt"], solr_conn=solr
+        )
+
+        self.assertEqual(
+            [(result.name, result.variant) for result in results],
+            [
+                ("content", "analysis"),
+                ("content", "offsets"),
+                ("pages", "analysis"),
+                ("pages", "offsets"),
+            ],
+        )
+        largest, *measured = solr.requests
+        self.assertEqual(largest["sort"], "size desc")
+        self.assertEqual(len(measured), 12)
+        self.assertEqual(measured[0]["fq"], "{!terms f=id}7,3")
+        self.assertEqual(measured[0]["hl.fl"], "content")
+        self.assertEqual(measured[-1]["fq"], "{!terms f=_root_}7,3")
+        self.assertEqual(measured[-1]["search_handler"], "/pages")
+        self.assertEqual(results[1].highlight, [10.0, 10.0, 10.0])
+        self.assertIn("QTime mean 25.00 ms (3 requests)", results[0].report())
+        self.assertEqual(
+            compare(results),
+            [
+                "content: offsets take 50% of the highlighting time of analysis",
+                "pages: offsets take 50% of the highlighting time of analysis",
+            ],
+        )
@@ -0,0 +1,32 @@
+from django.test import TestCase
+
+from parliscope.benchmarks.indexing import run_indexing_benchmark
+
+
+class IndexingBenchmarkTest(TestCase):
+    """Test cases for the indexing benchmark harness."""
+
+    def test_run_indexing_benchmark(self) -> None:
+        """All documents of the corpus are indexed against the stand-in services."""
+        result = run_indexing_benchmark(
+            documents=12,
+            paragraphs=5,
+            chunk_size=5,
+            scanned_every=4,
+            office_every=3,
+            mixed_every=5,
+        )
+
+        self.assertEqual(result.solr_documents, 12)
+        self.assertGreater(result.elapsed, 0)
+        self.assertGreater(result.queries, 0)
+        # 3 scanned documents (4 pages), 2 mixed documents (1 scanned page)
+        self.assertEqual(result.stages.calls["inspect"], 12)
+        self.assertEqual(result.requests["pdfact"], 9)
+        self.assertEqual(result.requests["tika"], 0)
+        self.assertEqual(result.requests["gotenberg"], 4)
+        self.assertEqual(result.requests["tika_ocr"], 3 * 4 + 2)
+        self.assertEqual(result.stages.calls["tika_ocr"], 5)
+        self.assertEqual(result.requests["solr"], 3)
+        self.assertEqual(result.stages.calls["parse"], 12)
+        self.assertIn("docs/s", result.report())
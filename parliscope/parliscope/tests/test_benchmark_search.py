@@ -0,0 +1,31 @@
+from django.test import TestCase
+
+from frontend.models import Query
+from parliscope.benchmarks.search import run_search_benchmark
+
+
+class SearchBenchmarkTest(TestCase):
+    """Test cases for the search latency benchmark."""
+
+    def test_run_search_benchmark(self) -> None:
+        """All requests are measured with the time spent per stage."""
+        results = run_search_benchmark(sizes=["small"], iterations=2)
+
+        self.assertEqual(
+            [result.name for result in results],
+            [
+                "search [small]",
+                "doc_id [small]",
+                "suggest [small]",
+                "MainView [small]",
+                "SearchView [small]",
+            ],
+        )
+        for result in results:
+            self.assertEqual(len(result.durations), 2)
+            self.assertIn("solr", result.stages.time)
+        search_view = results[-1]
+        self.assertEqual(search_view.stages.calls["render"], 2)
+        self.assertEqual(search_view.stages.calls["parse_result"], 20)
+        # warm up and measured requests of the search view are logged
+        self.assertEqual(Query.objects.count(), 3)
@@ -0,0 +1,171 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from frontend.processing.external_services import (
+    ExternalServiceUnsuccessfulException,
+)
+from frontend.processing.processing import Paragraph
+from frontend.tests.pdf_factory import SCANNED_PAGE, TEXT_PAGE, make_pdf
+from models.models import Document
+from parliscope.tasks.indexing import index_document
+from parliscope.tasks.metrics import IndexingMetrics
+
+
+@patch("parliscope.tasks.indexing.get_preview_image_for_doc", MagicMock())
+@patch("parliscope.tasks.indexing.ocr_pages_tika")
+@patch("parliscope.tasks.indexing.analyze_document_tika")
+@patch("parliscope.tasks.indexing.analyze_document_pdfact")
+class DocumentRoutingTest(TestCase):
+    """Test cases for choosing the text extraction by inspecting the PDF."""
+
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.metrics = IndexingMetrics()
+
+    def _document(self, pages: list[bytes]) -> Document:
+        path = Path(self.tmp.name) / "anlage.pdf"
+        path.write_bytes(make_pdf(pages, {"/Author": "Stadt"}))
+        return Document.objects.create(
+            document_id=1, uri=str(path), size=1, checksum="1"
+        )
+
+    def _index(self, document: Document, allow_ocr: bool = True) -> dict:
+        solr_doc = index_document(document, allow_ocr=allow_ocr, metrics=self.metrics)
+        return solr_doc.to_solr()
+
+    def test_scanned_pdf_goes_to_ocr(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """PDFs without a text layer skip pdfact and Tika's text extraction."""
+        mock_ocr.return_value = ([Paragraph("Erkannt", 1), Paragraph("Seite", 2)], [])
+
+        solr_doc = self._index(self._document([SCANNED_PAGE, SCANNED_PAGE]))
+
+        mock_pdfact.assert_not_called()
+        mock_tika.assert_not_called()
+        self.assertEqual(mock_ocr.call_args.args[1], [1, 2])
+        self.assertEqual(solr_doc["content"], ["Erkannt", "Seite"])
+        self.assertEqual(solr_doc["author"], "Stadt")
+        self.assertEqual(self.metrics.stages["inspect"].calls, 1)
+
+    @patch("parliscope.tasks.indexing.cached_ocr_tika")
+    def test_scanned_pdf_keeps_cached_document_ocr(
+        self,
+        mock_cached: MagicMock,
+        mock_pdfact: MagicMock,
+        mock_tika: MagicMock,
+        mock_ocr: MagicMock,
+    ) -> None:
+        """The cached OCR of a whole scanned document isn't repeated by page."""
+        mock_cached.return_value = {"content": " Erkannt\n", "metadata": {}}
+        mock_ocr.return_value = ([Paragraph("Seite", 1)], [])
+        document = self._document([SCANNED_PAGE, SCANNED_PAGE])
+
+        solr_doc = self._index(document)
+
+        mock_ocr.assert_not_called()
+        self.assertEqual(solr_doc["content"], ["Erkannt"])
+        self.assertNotIn("failed_analysis", solr_doc)
+
+        # not with a forced re-index, or if the cached OCR found no text
+        index_document(document, force=True, metrics=self.metrics)
+        mock_cached.return_value = {"content": None, "metadata": {}}
+        self._index(document)
+        self.assertEqual(mock_ocr.call_count, 2)
+
+    def test_mixed_pdf_ocrs_scanned_pages_only(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """OCR text replaces the text layer of scanned pages only."""
+        mock_pdfact.return_value = [
+            Paragraph("Antrag", 1),
+            Paragraph("Stempel", 2),
+            Paragraph("Begründung", 3),
+        ]
+        mock_ocr.return_value = ([Paragraph("Unterschrift", 2)], [])
+
+        solr_doc = self._index(self._document([TEXT_PAGE, SCANNED_PAGE, TEXT_PAGE]))
+
+        mock_tika.assert_not_called()
+        self.assertEqual(mock_ocr.call_args.args[1], [2])
+        self.assertEqual(solr_doc["content"], ["Antrag", "Unterschrift", "Begründung"])
+        self.assertNotIn("failed_analysis", solr_doc)
+
+    def test_failed_pages_keep_their_text(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """Pages which fail to OCR are indexed with their text layer."""
+        mock_pdfact.return_value = [Paragraph("Antrag", 1), Paragraph("Stempel", 2)]
+        mock_ocr.return_value = ([], [2])
+
+        solr_doc = self._index(self._document([TEXT_PAGE, SCANNED_PAGE]))
+
+        self.assertEqual(solr_doc["content"], ["Antrag", "Stempel"])
+        self.assertEqual(solr_doc["failed_analysis"], ["ocr"])
+
+    def test_scanned_pdf_without_ocr(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """Without OCR, scans are indexed with the metadata of the PDF."""
+        solr_doc = self._index(self._document([SCANNED_PAGE]), allow_ocr=False)
+
+        mock_pdfact.assert_not_called()
+        mock_tika.assert_not_called()
+        mock_ocr.assert_not_called()
+        self.assertNotIn("content", solr_doc)
+        self.assertEqual(solr_doc["author"], "Stadt")
+
+    def test_text_pdf_goes_to_pdfact_only(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """Tika isn't needed for the metadata of readable PDFs."""
+        mock_pdfact.return_value = [Paragraph("Antrag", 1)]
+
+        solr_doc = self._index(self._document([TEXT_PAGE]))
+
+        mock_tika.assert_not_called()
+        mock_ocr.assert_not_called()
+        self.assertEqual(solr_doc["content"], ["Antrag"])
+        self.assertEqual(solr_doc["author"], "Stadt")
+
+    def test_text_pdf_falls_back_to_tika_without_ocr(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """A failing pdfact is replaced by Tika's text extraction."""
+        mock_pdfact.side_effect = ExternalServiceUnsuccessfulException("down")
+        mock_tika.return_value = {"content": "Antrag", "metadata": {}}
+
+        solr_doc = self._index(self._document([TEXT_PAGE]))
+
+        mock_tika.assert_called_once()
+        self.assertFalse(mock_tika.call_args.args[1])  # no ocr
+        self.assertEqual(solr_doc["content"], ["Antrag"])
+        self.assertEqual(solr_doc["failed_analysis"], ["pdfact"])
+
+    def test_unreadable_pdf_takes_all_steps(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_ocr: MagicMock
+    ) -> None:
+        """Files that can't be inspected are analyzed as before."""
+        path = Path(self.tmp.name) / "kaputt.pdf"
+        path.write_bytes(b"%PDF-1.7 kaputt")
+        document = Document.objects.create(
+            document_id=2, uri=str(path), size=1, checksum="2"
+        )
+        mock_pdfact.return_value = []
+        mock_tika.side_effect = [
+            {"content": "Page 1", "metadata": {}},
+            {"content": "Erkannt", "metadata": {}},
+        ]
+
+        solr_doc = self._index(document)
+
+        mock_pdfact.assert_called_once()
+        mock_ocr.assert_not_called()
+        self.assertEqual(
+            [call.args[1] for call in mock_tika.call_args_list], [False, True]
+        )
+        self.assertEqual(solr_doc["content"], ["Erkannt"])
@@ -0,0 +1,74 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from health_check.exceptions import ServiceUnavailable
+
+from healthcheck import SolrHealthCheckBackend
+
+
+def ping_response(status: str = "OK") -> MagicMock:
+    response = MagicMock(status=200)
+    response.read.return_value = f'{{"status": "{status}"}}'.encode()
+    return response
+
+
+@override_settings(HEALTHCHECK_TIMEOUT=2, HEALTHCHECK_CACHE_SECONDS=30)
+class CachedHealthCheckTest(SimpleTestCase):
+    """Test cases for the timeouts and caching of the service health checks."""
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    @patch("urllib.request.urlopen")
+    def test_result_is_cached(self, urlopen: MagicMock) -> None:
+        """The service is probed with the timeout once within the TTL."""
+        urlopen.return_value = ping_response()
+
+        for _ in range(3):
+            backend = SolrHealthCheckBackend()
+            backend.run_check()
+            self.assertEqual(backend.errors, [])
+
+        urlopen.assert_called_once()
+        self.assertEqual(urlopen.call_args.kwargs["timeout"], 2.0)
+
+    @patch("urllib.request.urlopen")
+    def test_cached_error(self, urlopen: MagicMock) -> None:
+        """A timed out probe stays unavailable without probing again."""
+        urlopen.side_effect = TimeoutError("timed out")
+
+        SolrHealthCheckBackend().run_check()
+        backend = SolrHealthCheckBackend()
+        backend.run_check()
+
+        urlopen.assert_called_once()
+        (error,) = backend.errors
+        self.assertIsInstance(error, ServiceUnavailable)
+        self.assertIn("timed out", error.message)
+
+    @override_settings(HEALTHCHECK_CACHE_SECONDS=0)
+    @patch("urllib.request.urlopen")
+    def test_caching_disabled(self, urlopen: MagicMock) -> None:
+        """Without a TTL every check probes the service."""
+        urlopen.return_value = ping_response()
+
+        SolrHealthCheckBackend().run_check()
+        SolrHealthCheckBackend().run_check()
+
+        self.assertEqual(urlopen.call_count, 2)
+
+
+@override_settings(ROOT_URLCONF="parliscope.urls")
+class LivenessTest(SimpleTestCase):
+    """Test cases for the liveness endpoint."""
+
+    @patch("urllib.request.urlopen")
+    def test_live(self, urlopen: MagicMock) -> None:
+        """The liveness endpoint answers without probing any service."""
+        response = self.client.get("/healthcheck/live/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"ok")
+        self.assertIn("no-cache", response["Cache-Control"])
+        urlopen.assert_not_called()
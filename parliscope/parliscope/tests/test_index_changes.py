@@ -0,0 +1,294 @@
+import json
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from frontend.processing.processing import SolrImportDoc
+from models.models import (
+    AgendaItem,
+    Consultation,
+    Document,
+    EntityChange,
+    Meeting,
+    Organization,
+)
+from parliscope.tasks.indexing import get_changed_documents, index_changes
+from parliscope.tasks.solr_writer import SolrBulkWriter
+
+
+class IndexChangesTest(TestCase):
+    """Test cases for re-indexing documents from the entity change outbox."""
+
+    def setUp(self) -> None:
+        patcher = patch("parliscope.tasks.indexing.rebuild_in_progress")
+        self.mock_rebuild_in_progress = patcher.start()
+        self.mock_rebuild_in_progress.return_value = False
+        self.addCleanup(patcher.stop)
+        patcher = patch("parliscope.tasks.indexing.atomic_update_blockers")
+        self.mock_blockers = patcher.start()
+        self.mock_blockers.return_value = []
+        self.addCleanup(patcher.stop)
+
+        date = datetime(2024, 1, 1, tzinfo=UTC)
+        self.meeting_document = self._create_document(1)
+        self.consultation_document = self._create_document(2)
+        self.agenda_item_document = self._create_document(3)
+        self.unrelated_document = self._create_document(4)
+
+        self.meeting = Meeting.objects.create(
+            meeting_id=10,
+            title="Rat",
+            title_short="Rat",
+            date=date,
+            organization=Organization.objects.create(
+                name="Stadtverordnetenversammlung"
+            ),
+        )
+        self.meeting.documents.add(self.meeting_document)
+        self.consultation = Consultation.objects.create(
+            consultation_id=20, name="V-1", topic="Topic", type="Vorlage"
+        )
+        self.consultation.documents.add(self.consultation_document)
+        self.agenda_item = AgendaItem.objects.create(
+            agenda_item_id=30,
+            title="TOP 1",
+            meeting=self.meeting,
+            consultation=self.consultation,
+        )
+        self.agenda_item.documents.add(self.agenda_item_document)
+
+    def _create_document(self, document_id: int) -> Document:
+        return Document.objects.create(
+            document_id=document_id,
+            uri=f"https://example.org/{document_id}.pdf",
+            size=1,
+            checksum=str(document_id),
+        )
+
+    def _changed_document_ids(self, *changes: tuple[str, int]) -> set[int]:
+        entity_changes = [
+            EntityChange(entity_type=entity_type, entity_id=entity_id)
+            for entity_type, entity_id in changes
+        ]
+        return {
+            document.document_id for document in get_changed_documents(entity_changes)
+        }
+
+    def test_document_change(self) -> None:
+        """A changed document only affects itself."""
+        self.assertEqual(self._changed_document_ids((EntityChange.DOCUMENT, 4)), {4})
+
+    def test_meeting_change(self) -> None:
+        """A changed meeting affects its documents and those of its consultations."""
+        self.assertEqual(self._changed_document_ids((EntityChange.MEETING, 10)), {1, 2})
+
+    def test_consultation_change(self) -> None:
+        """A changed consultation affects its documents."""
+        self.assertEqual(
+            self._changed_document_ids((EntityChange.CONSULTATION, 20)), {2}
+        )
+
+    def test_agenda_item_change(self) -> None:
+        """A changed agenda item affects its documents and those of its consultation."""
+        self.assertEqual(
+            self._changed_document_ids((EntityChange.AGENDA_ITEM, 30)), {2, 3}
+        )
+
+    def test_document_relations_change(self) -> None:
+        """New links of a document only affect itself."""
+        self.assertEqual(
+            self._changed_document_ids((EntityChange.DOCUMENT_RELATIONS, 4)), {4}
+        )
+
+    def test_unknown_entities(self) -> None:
+        """Changes of unknown entities do not affect any document."""
+        self.assertEqual(
+            self._changed_document_ids(
+                (EntityChange.MEETING, 99), (EntityChange.DOCUMENT, 99)
+            ),
+            set(),
+        )
+
+    def _mock_index_document(self, mock_index_document: MagicMock) -> None:
+        mock_index_document.side_effect = lambda document, **kwargs: SolrImportDoc(
+            id=str(document.id),
+            last_analyzed=datetime.now(),
+            document_id=document.document_id,
+            size=document.size,
+            content_type="application/pdf",
+            filename="test.pdf",
+        )
+
+    def _record_posts(self, mock_post: MagicMock) -> dict[str, list[dict]]:
+        """Records the posted documents per update handler"""
+        posted: dict[str, list[dict]] = {}
+
+        def post(writer: SolrBulkWriter, body: bytes, count: int) -> int:
+            handler = writer.url.split("/test_ris")[-1]
+            posted.setdefault(handler, []).extend(json.loads(body))
+            return count
+
+        mock_post.side_effect = post
+        return posted
+
+    @patch("parliscope.tasks.indexing.get_indexed_doc_types")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    @patch("parliscope.tasks.indexing.index_document")
+    def test_index_changes_consumes_outbox(
+        self,
+        mock_index_document: MagicMock,
+        mock_post: MagicMock,
+        mock_indexed: MagicMock,
+    ) -> None:
+        """All changes are indexed and removed from the outbox."""
+        self._mock_index_document(mock_index_document)
+        posted = self._record_posts(mock_post)
+        mock_indexed.return_value = {}  # nothing indexed yet
+        EntityChange.objects.create(entity_type=EntityChange.DOCUMENT, entity_id=4)
+        EntityChange.objects.create(entity_type=EntityChange.CONSULTATION, entity_id=20)
+
+        processed = index_changes(chunk_size=1)
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(mock_index_document.call_count, 2)
+        self.assertEqual(
+            sorted(doc["document_id"] for doc in posted["/update"]), [2, 4]
+        )
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertFalse(EntityChange.objects.exists())
+
+    @patch("parliscope.tasks.indexing.get_indexed_doc_types")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    @patch("parliscope.tasks.indexing.index_document")
+    def test_relation_changes_are_partial_updates(
+        self,
+        mock_index_document: MagicMock,
+        mock_post: MagicMock,
+        mock_indexed: MagicMock,
+    ) -> None:
+        """Indexed documents affected by relation changes get atomic updates."""
+        self._mock_index_document(mock_index_document)
+        posted = self._record_posts(mock_post)
+        mock_indexed.side_effect = lambda ids: dict.fromkeys(ids, "Vorlage")
+        self.consultation.text = "Changed text"
+        self.consultation.save()
+        EntityChange.objects.create(entity_type=EntityChange.CONSULTATION, entity_id=20)
+        EntityChange.objects.create(entity_type=EntityChange.DOCUMENT, entity_id=4)
+
+        processed = index_changes()
+
+        self.assertEqual(processed, 2)
+        # only the document with a changed file is analyzed
+        self.assertEqual(mock_index_document.call_count, 1)
+        # atomic updates don't contain the required fields of full documents
+        documents = [doc for doc in posted["/update"] if "document_id" in doc]
+        self.assertEqual([doc["document_id"] for doc in documents], [4])
+
+        updates = {
+            doc["id"]: doc for doc in posted["/update"] if "document_id" not in doc
+        }
+        self.assertEqual(set(updates), {str(self.consultation_document.id)})
+        update = updates[str(self.consultation_document.id)]
+        self.assertEqual(update["consultation_text"], {"set": "Changed text"})
+        self.assertEqual(update["meeting_id"], {"set": [10]})
+        self.assertEqual(update["meeting_count"], {"set": 1})
+        self.assertEqual(
+            update["suggest_text"],
+            {
+                "set": [
+                    "V-1",
+                    "Topic",
+                    "TOP 1",
+                    "Rat",
+                    "Rat",
+                    "Stadtverordnetenversammlung",
+                ]
+            },
+        )
+        self.assertNotIn("content", update)
+        self.assertNotIn("preview_image", update)
+        # empty fields are removed
+        self.assertEqual(update["consultation_organization"], {"set": None})
+
+    @patch("parliscope.tasks.indexing.get_indexed_doc_types")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    @patch("parliscope.tasks.indexing.index_document")
+    def test_changed_document_type_is_reindexed(
+        self,
+        mock_index_document: MagicMock,
+        mock_post: MagicMock,
+        mock_indexed: MagicMock,
+    ) -> None:
+        """The content depends on the document type, so it is re-indexed."""
+        self._mock_index_document(mock_index_document)
+        posted = self._record_posts(mock_post)
+        mock_indexed.side_effect = lambda ids: dict.fromkeys(ids, "Beschlussvorlage")
+        EntityChange.objects.create(entity_type=EntityChange.CONSULTATION, entity_id=20)
+
+        self.assertEqual(index_changes(), 1)
+        self.assertEqual(mock_index_document.call_count, 1)
+        # the full document only, no atomic update
+        self.assertEqual([doc["document_id"] for doc in posted["/update"]], [2])
+
+    @patch("parliscope.tasks.indexing.get_indexed_doc_types")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    @patch("parliscope.tasks.indexing.index_document")
+    def test_new_links_are_partial_updates(
+        self,
+        mock_index_document: MagicMock,
+        mock_post: MagicMock,
+        mock_indexed: MagicMock,
+    ) -> None:
+        """Documents linked to a meeting by the scraper aren't analyzed again."""
+        self._mock_index_document(mock_index_document)
+        posted = self._record_posts(mock_post)
+        mock_indexed.side_effect = lambda ids: dict.fromkeys(ids)
+        self.meeting.documents.add(self.unrelated_document)
+        EntityChange.objects.create(
+            entity_type=EntityChange.DOCUMENT_RELATIONS, entity_id=4
+        )
+
+        self.assertEqual(index_changes(), 1)
+        mock_index_document.assert_not_called()
+        (update,) = posted["/update"]
+        self.assertEqual(update["meeting_id"], {"set": [10]})
+
+    @patch("parliscope.tasks.indexing.get_indexed_doc_types")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    @patch("parliscope.tasks.indexing.index_document")
+    def test_stored_copy_fields_prevent_partial_updates(
+        self,
+        mock_index_document: MagicMock,
+        mock_post: MagicMock,
+        mock_indexed: MagicMock,
+    ) -> None:
+        """Documents are re-indexed until the schema without stored copy
+        field destinations is applied."""
+        self._mock_index_document(mock_index_document)
+        self._record_posts(mock_post)
+        self.mock_blockers.return_value = ["meeting_organization_name_s"]
+        EntityChange.objects.create(entity_type=EntityChange.CONSULTATION, entity_id=20)
+
+        with self.assertLogs("parliscope.tasks.indexing", "WARNING") as logs:
+            self.assertEqual(index_changes(), 1)
+
+        self.assertEqual(mock_index_document.call_count, 1)
+        mock_indexed.assert_not_called()
+        self.assertIn("solr_schema --apply", logs.output[0])
+
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post")
+    def test_index_changes_without_changes(self, mock_post: MagicMock) -> None:
+        """Nothing is sent to Solr if there are no changes."""
+        self.assertEqual(index_changes(), 0)
+        mock_post.assert_not_called()
+
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post")
+    def test_changes_are_deferred_during_rebuild(self, mock_post: MagicMock) -> None:
+        """Changes are kept in the outbox while a rebuild is in progress."""
+        self.mock_rebuild_in_progress.return_value = True
+        EntityChange.objects.create(entity_type=EntityChange.DOCUMENT, entity_id=4)
+
+        self.assertEqual(index_changes(), 0)
+        mock_post.assert_not_called()
+        self.assertTrue(EntityChange.objects.exists())
@@ -0,0 +1,179 @@
+from datetime import timedelta
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pysolr
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django_celery_results.models import TaskResult
+
+from frontend.processing.external_services import (
+    ExternalServiceUnsuccessfulException,
+)
+from healthcheck.admin import line_chart
+from models.models import Consultation, Document, IndexHealthSnapshot
+from parliscope.tasks.index_health import (
+    INDEX_TASKS,
+    compute_index_health,
+    update_index_health,
+)
+from parliscope.tasks.indexing import index_document
+
+SOLR_RESPONSE = {
+    "response": {"numFound": 3, "docs": []},
+    "facet_counts": {
+        "facet_queries": {"without_content": 1},
+        "facet_fields": {
+            "doc_type": ["Antrag", 2, None, 1],
+            "failed_analysis": ["ocr", 1, "preview", 1],
+        },
+    },
+}
+
+
+class IndexHealthTest(TestCase):
+    """Test cases for the index health snapshots."""
+
+    def setUp(self) -> None:
+        documents = [
+            Document.objects.create(
+                document_id=100 + id,
+                uri=f"https://example.org/{id}.pdf",
+                size=1,
+                checksum=str(id),
+                title=title,
+            )
+            for id, title in enumerate(["Antrag", "Anlage", "Niederschrift 3. Sitzung"])
+        ]
+        consultation = Consultation.objects.create(
+            consultation_id=1, name="A/1", topic="Topic", type="Antrag"
+        )
+        consultation.documents.add(documents[0], documents[1])
+        TaskResult.objects.create(
+            task_id="1", task_name=INDEX_TASKS[1], status="SUCCESS"
+        )
+        TaskResult.objects.create(
+            task_id="2", task_name=INDEX_TASKS[0], status="FAILURE"
+        )
+
+    @patch("parliscope.tasks.index_health.cache")
+    @patch("parliscope.tasks.index_health.solr_connection")
+    def test_snapshot(self, mock_solr: MagicMock, mock_cache: MagicMock) -> None:
+        """Counts per doc_type are compared with a single facet request."""
+        mock_solr.return_value.search.return_value = pysolr.Results(SOLR_RESPONSE)
+        mock_cache.usage.return_value = (4, 2048)
+
+        result = update_index_health.apply().get()
+
+        snapshot = IndexHealthSnapshot.objects.latest()
+        self.assertEqual(snapshot.database_documents, 3)
+        self.assertEqual(snapshot.solr_documents, 3)
+        self.assertEqual(snapshot.documents_without_content, 1)
+        self.assertEqual(snapshot.failed_analysis, {"ocr": 1, "preview": 1})
+        self.assertEqual(
+            snapshot.doc_types,
+            [
+                {"doc_type": "Antrag", "database": 2, "solr": 2},
+                {"doc_type": "Niederschrift", "database": 1, "solr": 0},
+                {"doc_type": None, "database": 0, "solr": 1},
+            ],
+        )
+        self.assertEqual((snapshot.cache_files, snapshot.cache_bytes), (4, 2048))
+        self.assertEqual(
+            snapshot.last_index_run, TaskResult.objects.get(task_id="1").date_done
+        )
+        self.assertEqual(result["errors"], [])
+        mock_solr.return_value.search.assert_called_once()
+
+    @patch("parliscope.tasks.index_health.solr_connection")
+    def test_solr_unavailable(self, mock_solr: MagicMock) -> None:
+        """The database statistics are stored without Solr."""
+        mock_solr.return_value.search.side_effect = pysolr.SolrError("down")
+
+        snapshot = compute_index_health()
+
+        self.assertEqual(snapshot.database_documents, 3)
+        self.assertIsNone(snapshot.solr_documents)
+        self.assertEqual(snapshot.errors, ["Solr: down"])
+        self.assertEqual(snapshot.doc_types[0]["solr"], 0)
+
+    @patch("parliscope.tasks.index_health.solr_connection")
+    def test_old_snapshots_are_deleted(self, mock_solr: MagicMock) -> None:
+        """Snapshots are kept for 90 days."""
+        mock_solr.return_value.search.return_value = pysolr.Results(SOLR_RESPONSE)
+        old = IndexHealthSnapshot.objects.create(database_documents=1)
+        IndexHealthSnapshot.objects.filter(id=old.id).update(
+            created_at=timezone.now() - timedelta(days=91)
+        )
+
+        compute_index_health()
+
+        self.assertFalse(IndexHealthSnapshot.objects.filter(id=old.id).exists())
+        self.assertEqual(IndexHealthSnapshot.objects.count(), 1)
+
+    @patch("parliscope.tasks.indexing.get_preview_image_for_doc")
+    @patch("parliscope.tasks.indexing.analyze_document_tika")
+    @patch("parliscope.tasks.indexing.analyze_document_pdfact")
+    def test_failed_analysis_is_indexed(
+        self, mock_pdfact: MagicMock, mock_tika: MagicMock, mock_preview: MagicMock
+    ) -> None:
+        """Failed analysis steps are recorded in the indexed document."""
+        mock_pdfact.side_effect = ExternalServiceUnsuccessfulException("down")
+        mock_tika.return_value = {"content": None, "metadata": {}}
+        mock_preview.side_effect = ExternalServiceUnsuccessfulException("down")
+
+        solr_doc = index_document(Document.objects.get(document_id=100))
+
+        self.assertEqual(solr_doc.failed_analysis, ["pdfact", "ocr", "preview"])
+        self.assertEqual(
+            solr_doc.to_solr()["failed_analysis"], ["pdfact", "ocr", "preview"]
+        )
+
+    @override_settings(ROOT_URLCONF="parliscope.urls")
+    @patch("frontend.search.utils.solr_connection")
+    def test_health_page_renders_snapshot(self, mock_solr: MagicMock) -> None:
+        """The admin health page shows the latest snapshot without Solr."""
+        for solr_documents in [2, 3]:
+            IndexHealthSnapshot.objects.create(
+                database_documents=3,
+                solr_documents=solr_documents,
+                documents_without_content=1,
+                failed_analysis={"ocr": 1},
+                doc_types=[{"doc_type": "Antrag", "database": 3, "solr": 2}],
+            )
+        user = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(user)
+
+        response = self.client.get("/admin/health/")
+
+        self.assertContains(response, "✓ In Sync")
+        self.assertContains(response, "Failed ocr")
+        self.assertContains(response, '<span style="color: red;">-1</span>')
+        self.assertContains(response, "<polyline", count=7)
+        mock_solr.assert_not_called()
+
+    @override_settings(ROOT_URLCONF="parliscope.urls")
+    def test_health_page_without_snapshot(self) -> None:
+        """The admin health page tells how to compute the statistics."""
+        user = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(user)
+
+        response = self.client.get("/admin/health/")
+
+        self.assertContains(response, "No index health statistics yet")
+
+    def test_line_chart(self) -> None:
+        """Series are scaled to their common maximum, gaps are left out."""
+        chart = line_chart({"a": [0, 5, 10], "b": [None, 10, 5]})
+
+        self.assertEqual(chart["max"], 10)
+        a, b = chart["lines"]
+        self.assertEqual(a["points"], "0.0,120.0 300.0,60.0 600.0,0.0")
+        self.assertEqual(b["points"], "300.0,0.0 600.0,60.0")
+        self.assertEqual(b["last"], 5)
+
+    def test_line_chart_empty(self) -> None:
+        """Charts without snapshots have no points."""
+        chart: dict[str, Any] = line_chart({"a": []})
+        self.assertEqual(chart["lines"][0]["points"], "")
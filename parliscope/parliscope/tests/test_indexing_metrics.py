@@ -0,0 +1,182 @@
+import base64
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django_celery_results.models import TaskResult
+
+from frontend.processing.external_services import (
+    ExternalServiceUnsuccessfulException,
+    cache,
+)
+from models.models import Document
+from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.metrics import (
+    INDEXING_TASK,
+    IndexingMetrics,
+    last_indexing_run,
+    render_prometheus,
+)
+
+
+class IndexingMetricsTest(TestCase):
+    """Test cases for the per-stage metrics of indexing runs."""
+
+    def setUp(self) -> None:
+        self.documents = [
+            Document.objects.create(
+                document_id=document_id,
+                uri=f"https://example.org/{document_id}.pdf",
+                title=f"Document {document_id}",
+                file_name=f"{document_id}.pdf",
+                content_type="application/pdf",
+                size=1000 * document_id,
+            )
+            for document_id in range(1, 4)
+        ]
+
+    def test_stage_timings(self) -> None:
+        """Stages are timed per document and failures are counted."""
+        metrics = IndexingMetrics()
+        with metrics.document(self.documents[0]):
+            with metrics.stage("tika"):
+                pass
+            with self.assertRaises(ValueError):
+                with metrics.stage("pdfact"):
+                    raise ValueError()
+
+        summary = metrics.summary()
+        self.assertEqual(summary["documents"], 1)
+        self.assertEqual(summary["bytes"], 1000)
+        self.assertEqual(summary["stages"]["tika"]["calls"], 1)
+        self.assertEqual(summary["stages"]["pdfact"]["failures"], 1)
+        self.assertEqual(summary["slowest_documents"][0]["document_id"], 1)
+        self.assertEqual(
+            set(summary["slowest_documents"][0]["stages"]), {"tika", "pdfact"}
+        )
+        json.dumps(summary)
+
+    def test_slowest_documents_are_bounded(self) -> None:
+        """Only the slowest documents of a run are kept."""
+        metrics = IndexingMetrics()
+        metrics.SLOWEST_DOCUMENTS = 2
+        for document in self.documents:
+            with metrics.document(document):
+                pass
+        self.assertEqual(len(metrics.summary()["slowest_documents"]), 2)
+        self.assertEqual(metrics.summary()["documents"], 3)
+
+    def test_cache_stats_are_counted_per_run(self) -> None:
+        """Cache lookups before the run are not included."""
+        cache.stats[("tika", "hit")] += 5
+        metrics = IndexingMetrics()
+        cache.stats[("tika", "hit")] += 2
+        cache.stats[("tika", "miss")] += 1
+        self.assertEqual(metrics.cache_stats(), {"tika": {"hit": 2, "miss": 1}})
+
+    @patch("parliscope.tasks.indexing.refresh_suggester")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post")
+    @patch("parliscope.tasks.indexing.get_preview_image_for_doc")
+    @patch("parliscope.tasks.indexing.analyze_document_tika")
+    @patch("parliscope.tasks.indexing.analyze_document_pdfact")
+    def test_update_solr_index_returns_metrics(
+        self,
+        mock_pdfact: MagicMock,
+        mock_tika: MagicMock,
+        mock_preview: MagicMock,
+        mock_post: MagicMock,
+        mock_refresh_suggester: MagicMock,
+    ) -> None:
+        """The task result contains the metrics of the run."""
+        mock_post.side_effect = lambda body, count: count
+        mock_pdfact.side_effect = ExternalServiceUnsuccessfulException("down")
+        mock_tika.return_value = {"content": "Text", "metadata": {}}
+        mock_preview.return_value = "data:image/png;base64,"
+
+        result = update_solr_index.apply(kwargs={"chunk_size": 2}).get()
+
+        self.assertEqual(result["processed"], 3)
+        metrics = result["metrics"]
+        self.assertEqual(metrics["documents"], 3)
+        self.assertEqual(metrics["bytes"], 6000)
+        self.assertEqual(metrics["stages"]["pdfact"]["failures"], 3)
+        self.assertEqual(metrics["stages"]["tika"]["calls"], 3)
+        self.assertEqual(metrics["stages"]["relations"]["calls"], 3)
+        # one call per document and one to close the writer
+        self.assertEqual(metrics["stages"]["solr"]["calls"], 4)
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertNotIn("tika_ocr", metrics["stages"])
+        mock_refresh_suggester.assert_called_once()
+        json.dumps(result)
+
+    def _store_result(self, status: str, result: dict) -> None:
+        TaskResult.objects.create(
+            task_id=f"task-{status}",
+            task_name=INDEXING_TASK,
+            status=status,
+            result=json.dumps(result),
+        )
+
+    def _summary(self) -> dict:
+        metrics = IndexingMetrics()
+        with metrics.document(self.documents[0]):
+            with metrics.stage("tika"):
+                pass
+        return metrics.summary()
+
+    @override_settings(ROOT_URLCONF="parliscope.urls")
+    def test_metrics_endpoint(self) -> None:
+        """The metrics of the last run are exported in the Prometheus format."""
+        User.objects.create_superuser("admin", password="secret")
+        auth = "Basic " + base64.b64encode(b"admin:secret").decode()
+
+        self.assertEqual(self.client.get("/metrics/").status_code, 401)
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION=auth)
+        self.assertEqual(response.content, b"")
+
+        self._store_result(
+            "SUCCESS", {"processed": 1, "total": 1, "metrics": self._summary()}
+        )
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION=auth)
+        content = response.content.decode()
+        self.assertIn("# TYPE parliscope_indexing_documents gauge", content)
+        self.assertIn("parliscope_indexing_documents 1", content)
+        self.assertIn('parliscope_indexing_stage_calls{stage="tika"} 1', content)
+
+    def test_last_indexing_run_ignores_results_without_metrics(self) -> None:
+        """Results of older task versions are skipped."""
+        TaskResult.objects.create(
+            task_id="task-old", task_name=INDEXING_TASK, status="SUCCESS", result="null"
+        )
+        self.assertIsNone(last_indexing_run())
+
+        self._store_result(
+            "PROGRESS", {"processed": 1, "total": 3, "metrics": self._summary()}
+        )
+        last_run = last_indexing_run()
+        assert last_run is not None
+        self.assertEqual(last_run["status"], "PROGRESS")
+        self.assertEqual(last_run["total"], 3)
+
+    def test_render_prometheus_escapes_labels(self) -> None:
+        """Label values are escaped."""
+        summary = self._summary()
+        summary["cache"] = {'a"b': {"hit": 1, "miss": 0}}
+        self.assertIn(
+            'parliscope_indexing_cache_lookups{cache="a\\"b",result="hit"} 1',
+            render_prometheus(summary),
+        )
+
+    @override_settings(ROOT_URLCONF="parliscope.urls")
+    def test_health_page_shows_stage_timings(self) -> None:
+        """The admin health page shows the stages of the last run."""
+        user = User.objects.create_superuser("admin", password="secret")
+        self.client.force_login(user)
+        self._store_result(
+            "SUCCESS", {"processed": 1, "total": 1, "metrics": self._summary()}
+        )
+
+        response = self.client.get("/admin/health/")
+        self.assertContains(response, "Indexing Stages")
+        self.assertContains(response, '<th scope="row">tika</th>', html=False)
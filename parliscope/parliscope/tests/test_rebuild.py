@@ -0,0 +1,212 @@
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from models.models import Document, EntityChange
+from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.rebuild import (
+    REBUILD_PROPERTIES,
+    RebuildError,
+    abort_rebuild,
+    finish_rebuild,
+    rebuild_in_progress,
+    rollback_rebuild,
+    start_rebuild,
+)
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+
+
+@override_settings(SOLR_HOST="http://solr:8983/solr", SOLR_COLLECTION="ris")
+class RebuildTest(TestCase):
+    """Test cases for blue/green rebuilds of the Solr index."""
+
+    def setUp(self) -> None:
+        self.admin = MagicMock(spec=SolrCoreAdmin)
+        self.admin.host = "http://solr:8983/solr"
+
+    def test_start_rebuild(self) -> None:
+        """A new core is created from the configset with relaxed commits."""
+        self.admin.status.return_value = None
+
+        url = start_rebuild(self.admin)
+
+        self.assertEqual(url, "http://solr:8983/solr/ris_rebuild")
+        self.admin.unload.assert_not_called()
+        core, instance_dir, config_set, properties = self.admin.create.call_args.args
+        self.assertEqual(core, "ris_rebuild")
+        self.assertTrue(instance_dir.startswith("ris_"))
+        self.assertEqual(config_set, "ris")
+        # core properties, the overlay of the configset is shared with the live core
+        self.assertEqual(properties, REBUILD_PROPERTIES)
+        self.admin.set_properties.assert_not_called()
+
+    def test_start_rebuild_removes_previous_index(self) -> None:
+        """The previous index is removed, except the precreated instance dir."""
+        self.admin.status.return_value = {"instanceDir": "/var/solr/data/ris/"}
+        start_rebuild(self.admin)
+        self.admin.unload.assert_called_once_with("ris_rebuild", False)
+
+        self.admin.reset_mock()
+        self.admin.status.return_value = {
+            "instanceDir": "/var/solr/data/ris_20240101030000/"
+        }
+        start_rebuild(self.admin)
+        self.admin.unload.assert_called_once_with("ris_rebuild", True)
+
+    @patch("parliscope.tasks.rebuild.build_suggester")
+    def test_finish_rebuild_swaps_cores(self, mock_build: MagicMock) -> None:
+        """A complete rebuild is committed and swapped with the live core."""
+        self.admin.count.return_value = 3
+        instance_dir = "/var/solr/data/ris_20240101030000/"
+        self.admin.status.return_value = {"instanceDir": instance_dir}
+
+        self.assertEqual(finish_rebuild(3, self.admin), 3)
+
+        self.admin.commit.assert_called_once_with("ris_rebuild")
+        # created again on its index without the rebuild properties
+        self.admin.unload.assert_called_once_with(
+            "ris_rebuild", delete_instance_dir=False, delete_index=False
+        )
+        self.admin.create.assert_called_once_with("ris_rebuild", instance_dir, "ris")
+        mock_build.assert_called_once_with(
+            "ris_rebuild", all_dictionaries=True, admin=self.admin
+        )
+        self.admin.swap.assert_called_once_with("ris", "ris_rebuild")
+
+    @patch("parliscope.tasks.rebuild.build_suggester")
+    def test_incomplete_rebuild_is_not_swapped(self, mock_build: MagicMock) -> None:
+        """The live core is kept if the rebuild lacks documents."""
+        self.admin.count.return_value = 2
+
+        with self.assertRaises(RebuildError):
+            finish_rebuild(3, self.admin)
+        self.admin.swap.assert_not_called()
+        mock_build.assert_not_called()
+
+        with override_settings(SOLR_REBUILD_MAX_MISSING=1):
+            finish_rebuild(3, self.admin)
+        self.admin.swap.assert_called_once()
+
+    def test_abort_rebuild(self) -> None:
+        """The core of a failed rebuild is removed, if it exists."""
+        self.admin.status.return_value = None
+        abort_rebuild(self.admin)
+        self.admin.unload.assert_not_called()
+
+        self.admin.status.return_value = {
+            "instanceDir": "/var/solr/data/ris_20240101030000/"
+        }
+        abort_rebuild(self.admin)
+        self.admin.unload.assert_called_once_with(
+            "ris_rebuild", delete_instance_dir=True
+        )
+
+    def test_rollback(self) -> None:
+        """Rolling back swaps the previous index in again."""
+        self.admin.status.return_value = {"instanceDir": "/var/solr/data/ris/"}
+        self.admin.config.return_value = {"autoSoftCommit": {"maxTime": 600000}}
+
+        rollback_rebuild(self.admin)
+        self.admin.config.assert_called_once_with("ris_rebuild", "updateHandler")
+        self.admin.swap.assert_called_once_with("ris", "ris_rebuild")
+
+        # an unfinished rebuild is not swapped in
+        self.admin.reset_mock()
+        self.admin.config.return_value = {"autoSoftCommit": {"maxTime": -1}}
+        with self.assertRaises(RebuildError):
+            rollback_rebuild(self.admin)
+        self.admin.swap.assert_not_called()
+
+    def test_rebuild_in_progress(self) -> None:
+        """A rebuild is in progress until it finishes or times out."""
+        self.admin.status.return_value = None
+        self.assertFalse(rebuild_in_progress(self.admin))
+
+        # a finished rebuild has the configured commit settings again
+        started = timezone.now() - timedelta(hours=1)
+        self.admin.status.return_value = {
+            "instanceDir": f"/var/solr/data/ris_{started:%Y%m%d%H%M%S}/"
+        }
+        self.admin.config.return_value = {"autoSoftCommit": {"maxTime": 600000}}
+        self.assertFalse(rebuild_in_progress(self.admin))
+
+        self.admin.config.return_value = {"autoSoftCommit": {"maxTime": -1}}
+        self.assertTrue(rebuild_in_progress(self.admin))
+
+        started = timezone.now() - timedelta(days=2)
+        self.admin.status.return_value = {
+            "instanceDir": f"/var/solr/data/ris_{started:%Y%m%d%H%M%S}/"
+        }
+        self.assertFalse(rebuild_in_progress(self.admin))
+
+
+class RebuildTaskTest(TestCase):
+    """Test cases for the rebuild mode of the update_solr_index task."""
+
+    def setUp(self) -> None:
+        Document.objects.create(
+            document_id=1, uri="https://example.org/1.pdf", size=1, checksum="1"
+        )
+
+    @patch("parliscope.tasks.indexing.abort_rebuild")
+    @patch("parliscope.tasks.indexing.finish_rebuild")
+    @patch("parliscope.tasks.indexing.start_rebuild")
+    @patch("parliscope.tasks.indexing.index_document")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post", autospec=True)
+    def test_rebuild(
+        self,
+        mock_post: MagicMock,
+        mock_index_document: MagicMock,
+        mock_start: MagicMock,
+        mock_finish: MagicMock,
+        mock_abort: MagicMock,
+    ) -> None:
+        """Documents are written to the rebuild core, which is swapped in."""
+        mock_start.return_value = "http://solr:8983/solr/ris_rebuild"
+        mock_index_document.return_value = MagicMock(
+            missing_fields=lambda: [], to_solr=lambda: {"id": "1"}
+        )
+        urls = []
+
+        def post(writer: MagicMock, body: bytes, count: int) -> int:
+            urls.append((writer.url, writer.commit_within))
+            return count
+
+        mock_post.side_effect = post
+
+        result = update_solr_index.apply(kwargs={"rebuild": True}).get()
+
+        self.assertEqual(result["processed"], 1)
+        self.assertEqual(urls, [("http://solr:8983/solr/ris_rebuild/update", -1)])
+        mock_finish.assert_called_once_with(expected=1)
+        mock_abort.assert_not_called()
+
+    @patch("parliscope.tasks.indexing.abort_rebuild")
+    @patch("parliscope.tasks.indexing.finish_rebuild")
+    @patch("parliscope.tasks.indexing.start_rebuild")
+    @patch("parliscope.tasks.indexing.index_document")
+    @patch("parliscope.tasks.solr_writer.SolrBulkWriter._post")
+    def test_failed_rebuild_is_removed(
+        self,
+        mock_post: MagicMock,
+        mock_index_document: MagicMock,
+        mock_start: MagicMock,
+        mock_finish: MagicMock,
+        mock_abort: MagicMock,
+    ) -> None:
+        """A failed rebuild is removed and the outbox is kept."""
+        mock_start.return_value = "http://solr:8983/solr/ris_rebuild"
+        mock_index_document.return_value = MagicMock(
+            missing_fields=lambda: [], to_solr=lambda: {"id": "1"}
+        )
+        mock_post.side_effect = lambda body, count: count
+        mock_finish.side_effect = RebuildError("incomplete")
+        EntityChange.objects.create(entity_type=EntityChange.DOCUMENT, entity_id=1)
+
+        with self.assertRaises(RebuildError):
+            update_solr_index.apply(kwargs={"rebuild": True}).get()
+
+        mock_abort.assert_called_once()
+        self.assertTrue(EntityChange.objects.exists())
@@ -0,0 +1,135 @@
+import json
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pysolr
+from django.test import TestCase
+from django_celery_results.models import TaskResult
+
+from models.models import Document, EntityChange
+from parliscope.tasks.reconcile import (
+    RECONCILE_TASK,
+    diff_sorted,
+    iter_db_ids,
+    last_reconciliation,
+    reconcile,
+)
+
+
+class FakeSolr:
+    """Pages through a list of ids with cursorMark like Solr"""
+
+    def __init__(self, ids: list[str]) -> None:
+        self.ids = sorted(ids)
+        self.delete = MagicMock()
+        self.commit = MagicMock()
+        self.requests = 0
+
+    def search(self, q: str, **kwargs: Any) -> pysolr.Results:
+        self.requests += 1
+        start = 0 if kwargs["cursorMark"] == "*" else int(kwargs["cursorMark"])
+        end = start + kwargs["rows"]
+        next_cursor = str(min(end, len(self.ids)))
+        return pysolr.Results(
+            {
+                "response": {
+                    "numFound": len(self.ids),
+                    "docs": [{"id": id} for id in self.ids[start:end]],
+                },
+                "nextCursorMark": next_cursor
+                if start < len(self.ids)
+                else kwargs["cursorMark"],
+            }
+        )
+
+
+class ReconcileTest(TestCase):
+    """Test cases for reconciling the Solr index with the database."""
+
+    def setUp(self) -> None:
+        for id in [1, 2, 3, 10, 11]:
+            Document.objects.create(
+                id=id,
+                document_id=100 + id,
+                uri=f"https://example.org/{id}.pdf",
+                size=1,
+                checksum=str(id),
+            )
+        self.solr = FakeSolr(["1", "3", "10", "12", "99"])
+
+    def test_diff_sorted(self) -> None:
+        """Ids only on one side are yielded in order."""
+        diff = diff_sorted(
+            iter(["1", "10", "2", "5"]), iter(["0", "10", "3", "5", "6"])
+        )
+        self.assertEqual(
+            list(diff),
+            [
+                ("orphaned", "0"),
+                ("missing", "1"),
+                ("missing", "2"),
+                ("orphaned", "3"),
+                ("orphaned", "6"),
+            ],
+        )
+
+    def test_db_ids_are_in_string_order(self) -> None:
+        """The ids are returned in the order of the Solr id field, with a
+        single query."""
+        with self.assertNumQueries(1):
+            ids = list(iter_db_ids(batch_size=2))
+        self.assertEqual(ids, ["1", "10", "11", "2", "3"])
+
+    @patch("parliscope.tasks.reconcile.solr_connection")
+    def test_reconcile(self, mock_connection: MagicMock) -> None:
+        """Orphans are deleted and missing documents are enqueued in batches."""
+        mock_connection.return_value = self.solr
+
+        result = reconcile(batch_size=2)
+
+        self.assertEqual((result.missing, result.orphaned), (2, 2))
+        self.assertEqual(result.missing_sample, ["11", "2"])
+        self.assertEqual(result.orphaned_sample, ["12", "99"])
+        self.assertEqual(self.solr.requests, 3)
+
+        self.solr.delete.assert_called_once_with(id=["12", "99"], commit=False)
+        self.solr.commit.assert_called_once_with(softCommit=True)
+        self.assertEqual(result.deleted, 2)
+
+        changes = EntityChange.objects.all()
+        self.assertEqual(
+            {(change.entity_type, change.entity_id) for change in changes},
+            {(EntityChange.DOCUMENT, 111), (EntityChange.DOCUMENT, 102)},
+        )
+        self.assertEqual(result.enqueued, 2)
+
+    @patch("parliscope.tasks.reconcile.solr_connection")
+    def test_dry_run(self, mock_connection: MagicMock) -> None:
+        """Without delete and enqueue, only the differences are reported."""
+        mock_connection.return_value = self.solr
+
+        result = reconcile(delete=False, enqueue=False)
+
+        self.assertEqual((result.missing, result.orphaned), (2, 2))
+        self.assertEqual((result.deleted, result.enqueued), (0, 0))
+        self.solr.delete.assert_not_called()
+        self.solr.commit.assert_not_called()
+        self.assertFalse(EntityChange.objects.exists())
+
+    @patch("parliscope.tasks.reconcile.solr_connection")
+    def test_last_reconciliation(self, mock_connection: MagicMock) -> None:
+        """The result of the latest reconciliation task is shown on the health page."""
+        mock_connection.return_value = self.solr
+        self.assertIsNone(last_reconciliation())
+
+        TaskResult.objects.create(
+            task_id="reconcile",
+            task_name=RECONCILE_TASK,
+            status="SUCCESS",
+            result=json.dumps(reconcile(delete=False, enqueue=False).to_dict()),
+        )
+
+        result = last_reconciliation()
+        assert result is not None
+        self.assertEqual(result["missing"], 2)
+        self.assertEqual(result["orphaned_sample"], ["12", "99"])
@@ -0,0 +1,173 @@
+import xml.etree.ElementTree as ET
+from io import StringIO
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from parliscope.tasks.schema import (
+    SchemaChange,
+    configset_schema,
+    diff_schemas,
+    stored_copy_destinations,
+)
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+
+SCHEMA_PATH = (
+    Path(__file__).resolve().parents[3]
+    / "solr"
+    / "configsets"
+    / "ris"
+    / "conf"
+    / "schema.xml"
+)
+
+
+def schema(**changes: Any) -> dict[str, Any]:
+    text = {
+        "name": "text",
+        "class": "solr.TextField",
+        "indexAnalyzer": {"tokenizer": {"class": "solr.WhitespaceTokenizerFactory"}},
+        "queryAnalyzer": {"tokenizer": {"class": "solr.WhitespaceTokenizerFactory"}},
+    }
+    fields = {
+        "id": {"name": "id", "type": "string", "indexed": True, "stored": True},
+        "doc_type": {"name": "doc_type", "type": "string", "indexed": True},
+        "doc_title": {"name": "doc_title", "type": "text", "indexed": True},
+    }
+    return {
+        "uniqueKey": "id",
+        "fieldTypes": [changes.get("text", text)],
+        "fields": list({**fields, **changes.get("fields", {})}.values()),
+        "copyFields": changes.get("copyFields", []),
+    }
+
+
+@override_settings(SOLR_COLLECTION="ris", SOLR_CONFIGSET="ris")
+class SchemaTest(SimpleTestCase):
+    """Test cases for diffing and applying schema changes."""
+
+    def test_identical_schemas(self) -> None:
+        """Identical schemas have no changes."""
+        self.assertEqual(diff_schemas(schema(), schema()), [])
+
+    def test_docvalues_require_reindex(self) -> None:
+        """Changed field properties require a reindex, new fields don't."""
+        new = schema(
+            fields={
+                "doc_type": {"name": "doc_type", "type": "string", "docValues": True},
+                "author": {"name": "author", "type": "text"},
+            }
+        )
+        self.assertEqual(
+            diff_schemas(schema(), new),
+            [
+                SchemaChange("field", "author", "added", False),
+                SchemaChange("field", "doc_type", "changed", True),
+            ],
+        )
+        self.assertEqual(
+            str(diff_schemas(schema(), new)[1]),
+            "~ field doc_type (requires reindex)",
+        )
+
+    def test_query_analyzer_changes(self) -> None:
+        """Only changes of the index analyzer require a reindex."""
+        text = schema()["fieldTypes"][0]
+        query_only = {**text, "queryAnalyzer": {"tokenizer": {"class": "solr.X"}}}
+        index = {**text, "indexAnalyzer": {"tokenizer": {"class": "solr.X"}}}
+
+        (change,) = diff_schemas(schema(), schema(text=query_only))
+        self.assertFalse(change.reindex)
+        (change,) = diff_schemas(schema(), schema(text=index))
+        self.assertTrue(change.reindex)
+
+    def test_copy_fields(self) -> None:
+        """New copy fields have to be filled by a reindex."""
+        new = schema(copyFields=[{"source": "doc_title", "dest": "doc_type"}])
+        self.assertEqual(
+            diff_schemas(schema(), new),
+            [SchemaChange("copy field", "doc_title -> doc_type", "added", True)],
+        )
+        (change,) = diff_schemas(new, schema())
+        self.assertEqual(change.action, "removed")
+
+    def test_configset_schema(self) -> None:
+        """The configset schema is read from a temporary core."""
+        admin = MagicMock(spec=SolrCoreAdmin)
+        admin.status.return_value = None
+        admin.schema.return_value = schema()
+
+        self.assertEqual(configset_schema(admin), schema())
+        admin.create.assert_called_once_with("ris_schema", "ris_schema", "ris")
+        admin.schema.assert_called_once_with("ris_schema")
+        admin.unload.assert_called_once_with("ris_schema", delete_instance_dir=True)
+
+    @patch("parliscope.management.commands.solr_schema.update_solr_index")
+    @patch("parliscope.management.commands.solr_schema.reload_live_core")
+    @patch("parliscope.management.commands.solr_schema.schema_changes")
+    def test_apply(
+        self, mock_changes: MagicMock, mock_reload: MagicMock, mock_task: MagicMock
+    ) -> None:
+        """Changes are applied by a reload or by a rebuild of the index."""
+        mock_changes.return_value = [SchemaChange("field", "a", "added", False)]
+        mock_reload.return_value = []
+        out = StringIO()
+        call_command("solr_schema", "--apply", stdout=out)
+        self.assertIn("+ field a", out.getvalue())
+        self.assertIn("Reloaded ris", out.getvalue())
+        mock_task.delay.assert_not_called()
+
+        mock_changes.return_value = [SchemaChange("field", "a", "changed", True)]
+        mock_reload.reset_mock()
+        call_command("solr_schema", "--apply", stdout=StringIO())
+        mock_reload.assert_not_called()
+        mock_task.delay.assert_called_once_with(rebuild=True)
+
+        # without --apply, only the changes are shown
+        mock_task.reset_mock()
+        call_command("solr_schema", stdout=StringIO())
+        mock_task.delay.assert_not_called()
+
+    def test_stored_copy_destinations(self) -> None:
+        """Stored destinations and destinations returning docValues as stored
+        prevent atomic updates."""
+        copy_fields = [
+            {"source": "doc_title", "dest": dest}
+            for dest in ["stored", "doc_values", "not_stored", "dynamic_*"]
+        ]
+        fields = {
+            "stored": {"name": "stored", "type": "text"},
+            "doc_values": {
+                "name": "doc_values",
+                "type": "string",
+                "stored": False,
+                "docValues": True,
+            },
+            "not_stored": {
+                "name": "not_stored",
+                "type": "string",
+                "stored": False,
+                "docValues": True,
+                "useDocValuesAsStored": False,
+            },
+        }
+        self.assertEqual(
+            stored_copy_destinations(schema(fields=fields, copyFields=copy_fields)),
+            ["doc_values", "stored"],
+        )
+
+    def test_configset_allows_atomic_updates(self) -> None:
+        """No copy field destination of the configset is stored."""
+        if not SCHEMA_PATH.exists():
+            self.skipTest("Solr schema not available")
+        root = ET.parse(SCHEMA_PATH).getroot()
+        configset = {
+            "fieldTypes": [dict(e.attrib) for e in root.iter("fieldType")],
+            "fields": [dict(e.attrib) for e in root.iter("field")],
+            "copyFields": [dict(e.attrib) for e in root.iter("copyField")],
+        }
+        self.assertTrue(configset["copyFields"])
+        self.assertEqual(stored_copy_destinations(configset), [])
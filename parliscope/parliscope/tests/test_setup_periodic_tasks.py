@@ -41,7 +41,7 @@ class SetupPeriodicTasksCommandTest(TestCase):
         expected_kwargs = {
             "force": False,
             "allow_ocr": True,
-            "chunk_size": 10,
+            "chunk_size": 500,
         }
         self.assertEqual(kwargs, expected_kwargs)
 
@@ -158,7 +158,16 @@ class SetupPeriodicTasksCommandTest(TestCase):
 
         # Create task with same schedule
         out = StringIO()
-        call_command("setup_periodic_tasks", "--schedule", "0 6 * * *", stdout=out)
+        call_command(
+            "setup_periodic_tasks",
+            "--schedule",
+            "0 6 * * *",
+            "--health-schedule",
+            "0 6 * * *",
+            "--changes-schedule",
+            "0 6 * * *",
+            stdout=out,
+        )
 
         # Verify schedule count didn't increase (reused existing)
         self.assertEqual(CrontabSchedule.objects.count(), initial_count)
@@ -188,3 +197,71 @@ class SetupPeriodicTasksCommandTest(TestCase):
         self.assertIsInstance(kwargs["force"], bool)
         self.assertIsInstance(kwargs["allow_ocr"], bool)
         self.assertIsInstance(kwargs["chunk_size"], int)
+
+    def test_changes_schedule(self) -> None:
+        """Test that the change indexing task is scheduled by default."""
+        call_command(
+            "setup_periodic_tasks", "--changes-schedule", "", stdout=StringIO()
+        )
+        self.assertFalse(PeriodicTask.objects.filter(name="index-changes").exists())
+
+        call_command("setup_periodic_tasks", stdout=StringIO())
+        task = PeriodicTask.objects.get(name="index-changes")
+        self.assertEqual(task.crontab.minute, "*/10")
+
+        call_command(
+            "setup_periodic_tasks",
+            "--changes-schedule",
+            "*/5 * * * *",
+            "--no-ocr",
+            stdout=StringIO(),
+        )
+
+        task = PeriodicTask.objects.get(name="index-changes")
+        self.assertEqual(task.task, "parliscope.tasks.indexing.index_changes")
+        self.assertEqual(task.crontab.minute, "*/5")
+        self.assertEqual(
+            json.loads(task.kwargs), {"allow_ocr": False, "chunk_size": 500}
+        )
+
+    def test_reconcile_schedule(self) -> None:
+        """Test that the reconciliation task is only created on request."""
+        call_command("setup_periodic_tasks", stdout=StringIO())
+        self.assertFalse(
+            PeriodicTask.objects.filter(name="reconcile-solr-index").exists()
+        )
+
+        call_command(
+            "setup_periodic_tasks",
+            "--reconcile-schedule",
+            "30 2 * * 0",
+            stdout=StringIO(),
+        )
+
+        task = PeriodicTask.objects.get(name="reconcile-solr-index")
+        self.assertEqual(task.task, "parliscope.tasks.reconcile.reconcile_solr_index")
+        self.assertEqual(task.crontab.day_of_week, "0")
+
+    def test_suggest_schedule(self) -> None:
+        """Test that the suggester task is only created on request."""
+        call_command("setup_periodic_tasks", stdout=StringIO())
+        self.assertFalse(PeriodicTask.objects.filter(name="update-suggester").exists())
+
+        call_command(
+            "setup_periodic_tasks",
+            "--suggest-schedule",
+            "0 */6 * * *",
+            stdout=StringIO(),
+        )
+
+        task = PeriodicTask.objects.get(name="update-suggester")
+        self.assertEqual(task.task, "parliscope.tasks.suggest.update_suggester")
+        self.assertEqual(task.crontab.hour, "*/6")
+
+    def test_health_schedule(self) -> None:
+        """Test that the index health task is scheduled by default."""
+        call_command("setup_periodic_tasks", stdout=StringIO())
+
+        task = PeriodicTask.objects.get(name="update-index-health")
+        self.assertEqual(task.task, "parliscope.tasks.index_health.update_index_health")
+        self.assertEqual(task.crontab.minute, "*/15")
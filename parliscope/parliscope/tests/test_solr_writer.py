@@ -0,0 +1,78 @@
+import json
+from typing import Any
+
+import pysolr
+from django.test import SimpleTestCase
+
+from parliscope.benchmarks.services import StandInServices, run_stand_in_services
+from parliscope.tasks.solr_writer import SolrBulkWriter
+
+
+class SolrBulkWriterTest(SimpleTestCase):
+    """Test cases for the bulk JSON writer."""
+
+    def _documents(self, count: int, size: int = 100) -> list[dict[str, Any]]:
+        return [{"id": str(i), "content": "x" * size} for i in range(count)]
+
+    def test_batches_are_limited_by_size(self) -> None:
+        """Documents are split into batches of at most max_batch_bytes."""
+        services = StandInServices()
+        with run_stand_in_services(services):
+            with SolrBulkWriter(
+                f"{services.url}/solr/ris", max_batch_bytes=1000, commit_within=500
+            ) as writer:
+                writer.add_all(self._documents(30))
+
+        self.assertEqual(services.solr_documents, 30)
+        self.assertEqual(writer.written, 30)
+        self.assertEqual(writer.batches, services.requests["solr"])
+        # 128 bytes per document, 7 documents per batch
+        self.assertEqual(writer.batches, 5)
+
+    def test_batches_are_limited_by_documents(self) -> None:
+        """max_batch_docs limits the number of documents per batch."""
+        services = StandInServices()
+        with run_stand_in_services(services):
+            with SolrBulkWriter(
+                f"{services.url}/solr/ris", max_batch_docs=7, max_in_flight=1
+            ) as writer:
+                submitted = [writer.add(doc) for doc in self._documents(15)]
+
+        self.assertEqual(submitted.count(True), 2)
+        self.assertEqual(writer.batches, 3)
+        self.assertEqual(services.solr_documents, 15)
+
+    def test_gzip_and_commit_within(self) -> None:
+        """Bodies are gzip compressed and sent with commitWithin."""
+        requests: list[tuple[str, Any, bytes]] = []
+        services = StandInServices()
+        handle = services.handle
+
+        def record(method: str, path: str, headers: Any, body: bytes) -> bytes:
+            requests.append((path, headers.get("Content-Encoding"), body))
+            return handle(method, path, headers, body)
+
+        services.handle = record  # type: ignore[method-assign]
+        documents = self._documents(10, size=1000)
+        with run_stand_in_services(services):
+            with SolrBulkWriter(
+                f"{services.url}/solr/ris", commit_within=1234, compress=True
+            ) as writer:
+                writer.add_all(documents)
+
+        ((path, encoding, body),) = requests
+        self.assertTrue(path.startswith("/solr/ris/update?"))
+        self.assertIn("commitWithin=1234", path)
+        self.assertEqual(encoding, "gzip")
+        self.assertLess(len(body), len(json.dumps(documents)) / 10)
+        self.assertEqual(writer.bytes_sent, len(body))
+        self.assertEqual(services.solr_documents, 10)
+
+    def test_errors_are_raised(self) -> None:
+        """Failed batches are raised as SolrError."""
+        services = StandInServices()
+        with run_stand_in_services(services):
+            writer = SolrBulkWriter(f"{services.url}/unknown")
+            writer.add_all(self._documents(2))
+            with self.assertRaises(pysolr.SolrError):
+                writer.close()
@@ -0,0 +1,82 @@
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pysolr
+from django.test import SimpleTestCase, override_settings
+
+from parliscope.tasks.solr_admin import SolrCoreAdmin
+from parliscope.tasks.suggest import (
+    DICTIONARY_PROPERTY,
+    SuggesterBuildError,
+    build_suggester,
+)
+
+
+class FakeSolr:
+    """Answers probe searches and suggest requests of the given dictionaries"""
+
+    def __init__(self, built: set[str], titles: list[str]) -> None:
+        self.built = built
+        self.titles = titles
+        self.builds: list[str] = []
+
+    def search(self, q: str, search_handler: str = "/select", **kwargs: Any) -> Any:
+        if search_handler == "/select":
+            return pysolr.Results(
+                {"response": {"docs": [{"doc_title": t} for t in self.titles]}}
+            )
+        dictionary = kwargs["suggest.dictionary"]
+        if kwargs.get("suggest.build"):
+            self.builds.append(dictionary)
+            return pysolr.Results({"suggest": {dictionary: {}}})
+        found = 1 if dictionary in self.built else 0
+        return pysolr.Results({"suggest": {dictionary: {q: {"numFound": found}}}})
+
+
+@override_settings(SOLR_COLLECTION="ris")
+class BuildSuggesterTest(SimpleTestCase):
+    """Test cases for building the suggester outside of commits."""
+
+    def setUp(self) -> None:
+        self.admin = MagicMock(spec=SolrCoreAdmin)
+        self.admin.host = "http://solr:8983/solr"
+        self.admin.timeout = 10
+        self.admin.overlay.return_value = {"userProps": {DICTIONARY_PROPERTY: "a"}}
+        self.titles = ["Haushaltssatzung 2024", "Bebauungsplan Nr. 12", "42"]
+
+    def _build(self, solr: FakeSolr, **kwargs: Any) -> dict[str, Any]:
+        with patch("parliscope.tasks.suggest.pysolr.Solr", return_value=solr):
+            return build_suggester(admin=self.admin, **kwargs)
+
+    def test_inactive_dictionary_is_activated(self) -> None:
+        """The inactive dictionary is built, validated and then activated."""
+        solr = FakeSolr({"b"}, self.titles)
+
+        result = self._build(solr)
+
+        self.assertEqual(solr.builds, ["b"])
+        self.assertEqual(result["active"], "b")
+        self.assertEqual(result["builds"][0]["probes"], 2)
+        self.assertEqual(result["builds"][0]["hits"], 2)
+        self.admin.set_properties.assert_called_once_with(
+            "ris", {}, {DICTIONARY_PROPERTY: "b"}
+        )
+
+    def test_invalid_dictionary_is_not_activated(self) -> None:
+        """A dictionary without suggestions for the probes is not used."""
+        solr = FakeSolr(set(), self.titles)
+
+        with self.assertRaises(SuggesterBuildError):
+            self._build(solr)
+        self.admin.set_properties.assert_not_called()
+
+    def test_build_all_dictionaries(self) -> None:
+        """All dictionaries of a core that isn't searched yet are built."""
+        self.admin.overlay.return_value = {}
+        solr = FakeSolr({"a", "b"}, self.titles)
+
+        result = self._build(solr, core="ris_rebuild", all_dictionaries=True)
+
+        self.assertEqual(solr.builds, ["a", "b"])
+        self.assertEqual(result["active"], "a")
+        self.admin.set_properties.assert_not_called()
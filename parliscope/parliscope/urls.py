@@ -24,7 +24,9 @@ from . import views
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("update/", views.update, name="update"),  # System update endpoint
-    re_path(r"healthcheck", include("health_check.urls")),
+    path("metrics/", views.metrics, name="metrics"),  # Prometheus indexing metrics
+    path("healthcheck/live/", views.live, name="live"),  # Liveness probe
+    re_path(r"healthcheck", include("health_check.urls")),  # Readiness of services
     path("", include("frontend.urls")),
 ]
 
@@ -3,8 +3,10 @@ import logging
 
 from django.contrib.auth import authenticate
 from django.http import HttpRequest, HttpResponse
+from django.views.decorators.cache import never_cache
 
 from parliscope.tasks.indexing import update_solr_index
+from parliscope.tasks.metrics import last_indexing_run, render_prometheus
 
 logger = logging.getLogger(__name__)
 
@@ -35,9 +37,32 @@ def update(request: HttpRequest) -> HttpResponse:
     with a success response once the task is queued."""
 
     if _is_authenticated_su(request):
-        chunk_size = int(request.GET.get("chunk_size", 10))
+        chunk_size = int(request.GET.get("chunk_size", 500))
         update_solr_index.delay(chunk_size=chunk_size)
 
         return HttpResponse("ok", content_type="text/plain")
 
     return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """Exports the metrics of the last indexing run in the Prometheus text format.
+
+    Uses the same authentication as the update endpoint (HTTP Basic Auth)."""
+
+    if not _is_authenticated_su(request):
+        return HttpResponse("Unauthorized", status=401, content_type="text/plain")
+
+    last_run = last_indexing_run()
+    content = render_prometheus(last_run["metrics"]) if last_run else ""
+    return HttpResponse(content, content_type="text/plain; version=0.0.4")
+
+
+@never_cache
+def live(request: HttpRequest) -> HttpResponse:
+    """Liveness probe: answers as long as the application serves requests.
+
+    Unlike /healthcheck it doesn't reach the database or any service, so it
+    can be polled often (e.g. by the container healthcheck)."""
+
+    return HttpResponse("ok", content_type="text/plain")
@@ -0,0 +1,27 @@
+#!/bin/sh
+# Sharded backfill of the SessionNet calendar.
+# Usage: ./backfill.sh [shards] [start] [end]
+#   e.g. ./backfill.sh 4 01/2011 12/2026
+# Runs one spider process per shard and finalizes the relations of all shards
+# in a single merge step afterwards.
+
+SHARDS=${1:-4}
+START=${2:-01/2011}
+END=${3:-$(date +"%m/%Y" --date="+3 month")}
+
+pids=""
+for i in $(seq 0 $((SHARDS - 1))); do
+  scrapy crawl sessionnet -s CRAWL_PROFILE=full -s SCRAPE_START=$START -s SCRAPE_END=$END \
+    -s SHARD_INDEX=$i -s SHARD_COUNT=$SHARDS &
+  pids="$pids $!"
+done
+
+status=0
+for pid in $pids; do
+  wait $pid || status=1
+done
+
+# relations of finished shards are merged even if a shard failed. the merge
+# is idempotent, a failed shard can be rerun and merged again.
+scrapy merge_relations || status=1
+exit $status
@@ -0,0 +1,66 @@
+import logging
+import time
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+from scrapy.http import HtmlResponse, Request
+
+from sessionnet.spiders import SessionNetSpider
+from sessionnet.url_suffices import meeting_url_to_suffix, agenda_url_link_suffix, consultation_url_link_suffix
+
+# page type -> (callback, url of the page) used to parse the saved pages
+PAGE_TYPES = {
+    "meeting": ("parse_meeting", f"https://sessionnet.owl-it.de/griesheim/bi/{meeting_url_to_suffix}?__ksinr=1"),
+    "agenda": ("parse_agenda", f"https://sessionnet.owl-it.de/griesheim/bi/{agenda_url_link_suffix}?__ktonr=1"),
+    "consultation": ("parse_consultation",
+                     f"https://sessionnet.owl-it.de/griesheim/bi/{consultation_url_link_suffix}?__kvonr=1"),
+}
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+
+    def syntax(self):
+        return f"[options] <{'|'.join(PAGE_TYPES)}> <file> [<file> ...]"
+
+    def short_desc(self):
+        return "Measure the parse cost of saved SessionNet pages"
+
+    def long_desc(self):
+        return ("Runs the spider callback of the given page type on the saved pages "
+                "(e.g. from `scrapy fetch --nolog <url> > page.html`) and reports the time per page.")
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("-n", "--iterations", type=int, default=100,
+                            help="number of times each page is parsed (default: 100)")
+
+    def run(self, args, opts):
+        if len(args) < 2 or args[0] not in PAGE_TYPES:
+            raise UsageError()
+        callback_name, url = PAGE_TYPES[args[0]]
+
+        spider = SessionNetSpider()
+        logging.getLogger(spider.name).setLevel(logging.WARNING)
+        callback = getattr(spider, callback_name)
+
+        for path in args[1:]:
+            with open(path, "rb") as file:
+                body = file.read()
+
+            requests = items = 0
+            start = time.perf_counter()
+            for _ in range(opts.iterations):
+                # a new response per iteration, so that building the DOM is included
+                response = HtmlResponse(url=url, body=body, encoding="utf-8")
+                results = list(callback(response))
+            elapsed = time.perf_counter() - start
+
+            for result in results:
+                if isinstance(result, Request):
+                    requests += 1
+                else:
+                    items += 1
+            print(f"{path}: {elapsed / opts.iterations * 1000:.2f} ms/page "
+                  f"({len(body)} bytes, {requests} requests, {items} items, {opts.iterations} iterations)")
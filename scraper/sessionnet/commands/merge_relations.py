@@ -0,0 +1,36 @@
+import glob
+import logging
+import os
+
+from scrapy.commands import ScrapyCommand
+
+from sessionnet.pipelines import PsqlExportPipeline, get_shard_relations_path
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ScrapyCommand):
+    requires_project = True
+    requires_crawler_process = False
+
+    def short_desc(self):
+        return "Finalize the relations collected by the shards of a sharded crawl"
+
+    def run(self, args, opts):
+        paths = sorted(glob.glob(get_shard_relations_path(self.settings, "*")))
+        if len(paths) == 0:
+            logger.info("No shard relations found")
+            return
+
+        pipeline = PsqlExportPipeline()
+        pipeline.connect(self.settings)
+        for path in paths:
+            logger.info(f"Loading relations from {path}")
+            pipeline.load_relations(path)
+
+        pipeline.finalize_relations(logger)
+        pipeline.db.close()
+
+        for path in paths:
+            os.remove(path)
+        logger.info(f"Merged relations of {len(paths)} shards")
@@ -47,6 +47,8 @@ class DocumentItem(SessionNetItem):
     file_urls = Field()
     files = Field()
     title = Field()
+    content_length = Field()
+    etag = Field()
 
 
 class OrganizationItem(SessionNetItem):
@@ -1,13 +1,29 @@
+import datetime
+import inspect
+import json
 import os
+import time
+from email.utils import formatdate
 
+import pytz
 import scrapy.pipelines.files
 from itemadapter import ItemAdapter
 
 from peewee import *
 from sessionnet.items import OrganizationItem, MeetingItem, DocumentItem, ConsultationItem, AgendaItem
+from sessionnet.profiles import FILES_DOWNLOAD_SLOT, PRIORITY_FILE
 from sessionnet.utils import get_url_params
 
 
+def connect_database(settings):
+    return PostgresqlDatabase(
+        settings.get("DB_NAME"),
+        user=settings.get("DB_USER"),
+        password=settings.get("DB_PASSWORD"),
+        host=settings.get("DB_HOST"),
+        port=settings.get("DB_PORT"))
+
+
 class HTMLFilterPipeline:
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
@@ -21,23 +37,135 @@ class HTMLFilterPipeline:
 
 
 class MyFilesPipeline(scrapy.pipelines.files.FilesPipeline):
+    """Files pipeline that uses the documents table to decide whether a file
+    needs to be downloaded.
+
+    Files whose HEAD metadata (Content-Length, ETag) matches the known document
+    are not downloaded again. Once such a file is older than FILES_EXPIRES, it is
+    revalidated with a conditional GET instead of a full download."""
+
+    def open_spider(self, spider=None):
+        super().open_spider()
+        self.db = connect_database(self.crawler.settings)
+        self.Document = Table("documents", ("id", "document_id", "uri", "size", "checksum", "etag")).bind(self.db)
+
+    def close_spider(self, spider=None):
+        self.db.close()
 
     def file_path(self, request, response=None, info=None, *, item=None):
         file_id = get_url_params(request.url)["id"]
         ending = ItemAdapter(item).get("file_name").split(".")[-1]
         return f"{file_id}.{ending}"
 
+    def get_media_requests(self, item, info):
+        requests = super().get_media_requests(item, info)
+        for request in requests:
+            request.meta["download_slot"] = FILES_DOWNLOAD_SLOT
+            request.priority = PRIORITY_FILE
+        return requests
+
+    def get_known_document(self, item):
+        # single lookup on the unique document_id index
+        return self.Document.select(
+            self.Document.uri,
+            self.Document.size,
+            self.Document.checksum,
+            self.Document.etag
+        ).where(self.Document.document_id == int(item.get("id"))).first()
+
+    def media_to_download(self, request, info, *, item=None):
+        known = self.get_known_document(item)
+        if known is None:
+            return None  # new document
+
+        path = self.file_path(request, info=info, item=item)
+        if known["uri"] != path:
+            return None  # file name/ending changed
+
+        content_length = item.get("content_length")
+        if content_length is not None and content_length != known["size"]:
+            return None  # file changed
+        etag = item.get("etag")
+        if etag is not None and known["etag"] is not None and etag != known["etag"]:
+            return None  # file changed
+
+        try:
+            last_modified = os.stat(os.path.join(self.store.basedir, path)).st_mtime
+        except OSError:
+            return None  # file missing in store
+
+        age_days = (time.time() - last_modified) / 60 / 60 / 24
+        if age_days > self.expires:
+            # revalidate instead of downloading the whole file again
+            request.meta["known_document"] = known
+            if known["etag"] is not None:
+                request.headers["If-None-Match"] = known["etag"]
+            request.headers["If-Modified-Since"] = formatdate(last_modified, usegmt=True)
+            return None
+
+        self.inc_stats("uptodate")
+        return {
+            "url": request.url,
+            "path": path,
+            "checksum": known["checksum"],
+            "size": known["size"],
+            "status": "uptodate",
+        }
+
+    def media_downloaded(self, response, request, info, *, item=None):
+        if response.status == 304 and "known_document" in request.meta:
+            known = request.meta["known_document"]
+            path = self.file_path(request, response=response, info=info, item=item)
+            # reset the expiry of the stored file
+            os.utime(os.path.join(self.store.basedir, path))
+            self.inc_stats("revalidated")
+            return {
+                "url": request.url,
+                "path": path,
+                "checksum": known["checksum"],
+                "size": known["size"],
+                "status": "revalidated",
+            }
+
+        result = super().media_downloaded(response, request, info, item=item)
+        if inspect.isawaitable(result):
+            # a coroutine since Scrapy 2.15, which awaits the result of this method
+            return self._with_size(result, response)
+        result["size"] = len(response.body)
+        return result
+
+    async def _with_size(self, result, response):
+        result = await result
+        result["size"] = len(response.body)
+        return result
+
+
+# relations between scraped entities collected during the crawl. they are resolved
+# to foreign keys once all entities are written to the database.
+RELATIONS = [
+    "meetings_organizations",
+    "meetings_documents",
+    "meetings_consultations",
+    "meetings_agenda_items",
+    "consultations_documents",
+    "consultations_agenda_items",
+    "agenda_items_documents",
+    "agenda_items_consultations",
+]
+
+
+def get_shard_relations_path(settings, shard_index):
+    return os.path.join(settings.get("SHARD_RELATIONS_DIR"), f"relations-{shard_index}.json")
+
 
 class PsqlExportPipeline:
 
     def open_spider(self, spider):
         spider.logger.info("Opening database connection")
-        db = PostgresqlDatabase(
-            spider.settings.get("DB_NAME"),
-            user=spider.settings.get("DB_USER"),
-            password=spider.settings.get("DB_PASSWORD"),
-            host=spider.settings.get("DB_HOST"),
-            port=spider.settings.get("DB_PORT"))
+        self.connect(spider.settings)
+
+    def connect(self, settings):
+        db = connect_database(settings)
         self.db = db
 
         self.Person = Table("persons", ("id", "person_id", "name", "created_at", "last_modified")).bind(db)
@@ -50,79 +178,135 @@ class PsqlExportPipeline:
         self.Consultation_Document = Table("consultations_documents", ("id", "consultation_id", "document_id")).bind(db)
         self.AgendaItem = Table("agendaitems", ("id", "agenda_item_id", "title", "decision", "vote", "text", "consultation_id", "meeting_id", "created_at", "last_modified")).bind(db)
         self.AgendaItem_Document = Table("agendaitems_documents", ("id", "agendaitem_id", "document_id")).bind(db)
-        self.Document = Table("documents", ("id", "document_id", "file_name", "uri", "content_type", "size", "title", "checksum", "created_at", "last_modified")).bind(db)
+        self.Document = Table("documents", ("id", "document_id", "file_name", "uri", "content_type", "size", "title", "checksum", "etag", "created_at", "last_modified")).bind(db)
+
+        # outbox of changed entities, consumed by the indexer
+        self.EntityChange = Table("entity_changes", ("id", "entity_type", "entity_id", "created_at")).bind(db)
 
-        self.meetings_organizations = []
-        self.meetings_documents = []
-        self.meetings_consultations = []
-        self.meetings_agenda_items = []
-        self.consultations_documents = []
-        self.consultations_agenda_items = []
-        self.agenda_items_documents = []
-        self.agenda_items_consultations = []
+        for relation in RELATIONS:
+            setattr(self, relation, [])
+        # changes are written to the outbox together with the relations, so that
+        # the indexer doesn't consume them before the relations are updated
+        self.changes = []
 
     def close_spider(self, spider):
-        spider.logger.info("Updating meeting organizations")
-        for (meeting_id, organization_name) in self.meetings_organizations:
-            organization_fk = self.Organization.select(self.Organization.id).where(self.Organization.name == organization_name).first()['id']
-            self.Meeting.update(organization_id=organization_fk).where(self.Meeting.meeting_id == int(meeting_id)).execute()
+        if spider.settings.getint("SHARD_COUNT") > 1:
+            # sharded crawl: relations are finalized by `scrapy merge_relations`
+            # once all shards are done
+            self.dump_relations(get_shard_relations_path(spider.settings, spider.settings.getint("SHARD_INDEX")))
+            spider.logger.info("Stored relations of this shard for merging")
+        else:
+            self.finalize_relations(spider.logger)
+
+        spider.logger.info("Closing database connection")
+        self.db.close()
 
-        spider.logger.info("Updating meeting relations")
+    def dump_relations(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"changes": self.changes, **{relation: getattr(self, relation) for relation in RELATIONS}}, f)
+
+    def load_relations(self, path):
+        with open(path) as f:
+            relations = json.load(f)
+        for relation in RELATIONS:
+            getattr(self, relation).extend(relations[relation])
+        self.changes.extend(relations.get("changes", []))
+
+    def record_change(self, entity_type, entity_id):
+        self.changes.append((entity_type, int(entity_id)))
+
+    def write_changes(self):
+        created_at = datetime.datetime.now().astimezone(pytz.utc)
+        changes = sorted(set(map(tuple, self.changes)))
+        for batch in chunked(changes, 1000):
+            self.EntityChange.insert([{
+                self.EntityChange.entity_type: entity_type,
+                self.EntityChange.entity_id: entity_id,
+                self.EntityChange.created_at: created_at
+            } for (entity_type, entity_id) in batch]).execute()
+        self.changes = []
+        return len(changes)
+
+    def finalize_relations(self, logger):
         self.db.begin()
+        logger.info("Updating meeting organizations")
+        for (meeting_id, organization_name) in self.meetings_organizations:
+            organization_fk = self.Organization.select(self.Organization.id).where(self.Organization.name == organization_name).first()['id']
+            updated = self.Meeting.update(organization_id=organization_fk).where(
+                (self.Meeting.meeting_id == int(meeting_id)) &
+                (self.Meeting.organization_id.is_null() | (self.Meeting.organization_id != organization_fk))
+            ).returning(self.Meeting.meeting_id).execute()
+            if len(list(updated)) > 0:
+                self.record_change("meeting", meeting_id)
+
+        logger.info("Updating meeting relations")
         for (meeting_id, document_ids) in self.meetings_documents:
             meeting_fk = self.Meeting.select(self.Meeting.id).where(self.Meeting.meeting_id == meeting_id).first()['id']
             for document_id in document_ids:
                 document_fk = self.Document.select(self.Document.id).where(self.Document.document_id == document_id).first()['id']
-                if not self.Meeting_Document.select("id").where((self.Meeting_Document.meeting_id == meeting_fk) & (self.Meeting_Document.document_id == document_fk)).exists():
-                    self.Meeting_Document.insert({
-                        self.Meeting_Document.meeting_id: meeting_fk,
-                        self.Meeting_Document.document_id: document_fk
-                    }).execute()
+                inserted = self.Meeting_Document.insert({
+                    self.Meeting_Document.meeting_id: meeting_fk,
+                    self.Meeting_Document.document_id: document_fk
+                }).on_conflict_ignore().returning(self.Meeting_Document.id).execute()
+                if len(list(inserted)) > 0:
+                    self.record_change("document_relations", document_id)
         for (meeting_id, consultation_ids) in self.meetings_consultations:
             meeting_fk = self.Meeting.select(self.Meeting.id).where(self.Meeting.meeting_id == meeting_id).first()['id']
             for consultation_id in consultation_ids:
                 consultation_fk = self.Consultation.select(self.Consultation.id).where(self.Consultation.consultation_id == consultation_id).first()['id']
-                if not self.Meeting_Consultation.select("id").where((self.Meeting_Consultation.meeting_id == meeting_fk) & (self.Meeting_Consultation.consultation_id == consultation_fk)).exists():
-                    self.Meeting_Consultation.insert({
-                        self.Meeting_Consultation.meeting_id: meeting_fk,
-                        self.Meeting_Consultation.consultation_id: consultation_fk
-                    }).execute()
-
-        spider.logger.info("Updating consultation relations")
+                inserted = self.Meeting_Consultation.insert({
+                    self.Meeting_Consultation.meeting_id: meeting_fk,
+                    self.Meeting_Consultation.consultation_id: consultation_fk
+                }).on_conflict_ignore().returning(self.Meeting_Consultation.id).execute()
+                if len(list(inserted)) > 0:
+                    self.record_change("consultation", consultation_id)
+
+        logger.info("Updating consultation relations")
         for (consultation_id, document_ids) in self.consultations_documents:
             consultation_fk = self.Consultation.select(self.Consultation.id).where(self.Consultation.consultation_id == consultation_id).first()['id']
             for document_id in document_ids:
                 document_fk = self.Document.select(self.Document.id).where(self.Document.document_id == document_id).first()['id']
-                if not self.Consultation_Document.select("id").where((self.Consultation_Document.consultation_id == consultation_fk) & (self.Consultation_Document.document_id == document_fk)).exists():
-                    self.Consultation_Document.insert({
-                        self.Consultation_Document.consultation_id: consultation_fk,
-                        self.Consultation_Document.document_id: document_fk
-                    }).execute()
-
-        spider.logger.info("Updating agenda item relations")
+                inserted = self.Consultation_Document.insert({
+                    self.Consultation_Document.consultation_id: consultation_fk,
+                    self.Consultation_Document.document_id: document_fk
+                }).on_conflict_ignore().returning(self.Consultation_Document.id).execute()
+                if len(list(inserted)) > 0:
+                    self.record_change("document_relations", document_id)
+
+        logger.info("Updating agenda item relations")
         for (meeting_id, agenda_ids) in self.meetings_agenda_items:
             meeting_fk = self.Meeting.select(self.Meeting.id).where(self.Meeting.meeting_id == meeting_id).first()['id']
-            self.AgendaItem.update(meeting_id=meeting_fk).where(self.AgendaItem.agenda_item_id << agenda_ids).execute()
+            updated = self.AgendaItem.update(meeting_id=meeting_fk).where(
+                (self.AgendaItem.agenda_item_id << agenda_ids) &
+                (self.AgendaItem.meeting_id.is_null() | (self.AgendaItem.meeting_id != meeting_fk))
+            ).returning(self.AgendaItem.agenda_item_id).execute()
+            for row in updated:
+                self.record_change("agenda_item", row["agenda_item_id"])
 
         for (agenda_item_id, document_ids) in self.agenda_items_documents:
             agenda_item_fk = self.AgendaItem.select(self.AgendaItem.id).where(self.AgendaItem.agenda_item_id == agenda_item_id).first()['id']
             for document_id in document_ids:
                 document_fk = self.Document.select(self.Document.id).where(self.Document.document_id == document_id).first()['id']
-                if not self.AgendaItem_Document.select("id").where((self.AgendaItem_Document.agendaitem_id == agenda_item_fk) & (self.AgendaItem_Document.document_id == document_fk)).exists():
-                    self.AgendaItem_Document.insert({
-                        self.AgendaItem_Document.agendaitem_id: agenda_item_fk,
-                        self.AgendaItem_Document.document_id: document_fk
-                    }).execute()
+                inserted = self.AgendaItem_Document.insert({
+                    self.AgendaItem_Document.agendaitem_id: agenda_item_fk,
+                    self.AgendaItem_Document.document_id: document_fk
+                }).on_conflict_ignore().returning(self.AgendaItem_Document.id).execute()
+                if len(list(inserted)) > 0:
+                    self.record_change("document_relations", document_id)
         for (agenda_item_id, consultation_ids) in self.agenda_items_consultations:
             assert len(consultation_ids) <= 1
             if len(consultation_ids) == 1:
-                self.AgendaItem.update(consultation_id=consultation_ids[0]).where(self.AgendaItem.agenda_item_id == agenda_item_id).execute()
-
+                updated = self.AgendaItem.update(consultation_id=consultation_ids[0]).where(
+                    (self.AgendaItem.agenda_item_id == agenda_item_id) &
+                    (self.AgendaItem.consultation_id.is_null() | (self.AgendaItem.consultation_id != consultation_ids[0]))
+                ).returning(self.AgendaItem.agenda_item_id).execute()
+                if len(list(updated)) > 0:
+                    self.record_change("agenda_item", agenda_item_id)
+
+        logger.info(f"Recorded {self.write_changes()} changed entities")
         self.db.commit()
 
-        spider.logger.info("Closing database connection")
-        self.db.close()
-
     def process_item(self, item, spider):
         if isinstance(item, OrganizationItem):
             self.process_organization(item, spider)
@@ -171,6 +355,7 @@ class PsqlExportPipeline:
                 self.Meeting.last_modified: item.get("last_updated")
             }
         ).execute()
+        self.record_change("meeting", item.get("id"))
         spider.crawler.stats.inc_value("db.meetings_upserted", spider=spider)
 
 
@@ -209,6 +394,7 @@ class PsqlExportPipeline:
                 self.Consultation.last_modified: item.get("last_updated")
             }
         ).execute()
+        self.record_change("consultation", item.get("id"))
         spider.crawler.stats.inc_value("db.consultations_upserted", spider=spider)
 
 
@@ -247,24 +433,37 @@ class PsqlExportPipeline:
                 self.AgendaItem.last_modified: item.get("last_updated")
             }
         ).execute()
+        self.record_change("agenda_item", item.get("id"))
         spider.crawler.stats.inc_value("db.agenda_items_upserted", spider=spider)
 
 
     def process_document(self, item, spider):
-        path = os.path.join(spider.settings.get("FILES_STORE"), item.get("files")[0].get("path"))
-        size = os.path.getsize(path)
-
-        exists = self.Document.select().where(
-            (self.Document.document_id == item.get("id")) &
-            (self.Document.file_name == item.get("file_name")) &
-            (self.Document.content_type == item.get("content_type")) &
-            (self.Document.checksum == item.get("files")[0]["checksum"]) &
-            (self.Document.uri == item.get("files")[0]["path"]) &
-            (self.Document.size == size) &
-            (self.Document.title == item.get("title"))
-        ).exists()
-
-        if exists:
+        file = item.get("files")[0]
+        if "size" in file:
+            size = file["size"]
+        else:
+            size = os.path.getsize(os.path.join(spider.settings.get("FILES_STORE"), file["path"]))
+
+        known = self.Document.select(
+            self.Document.file_name,
+            self.Document.content_type,
+            self.Document.checksum,
+            self.Document.uri,
+            self.Document.size,
+            self.Document.title,
+            self.Document.etag
+        ).where(self.Document.document_id == int(item.get("id"))).first()
+
+        values = {
+            "file_name": item.get("file_name"),
+            "content_type": item.get("content_type"),
+            "checksum": file["checksum"],
+            "uri": file["path"],
+            "size": size,
+            "title": item.get("title"),
+            "etag": item.get("etag"),
+        }
+        if known == values:
             return
 
         spider.logger.info(f"Upserting document {item.get('title')} ({item.get('id')})")
@@ -272,10 +471,11 @@ class PsqlExportPipeline:
             self.Document.document_id: item.get("id"),
             self.Document.file_name: item.get("file_name"),
             self.Document.content_type: item.get("content_type"),
-            self.Document.checksum: item.get("files")[0]["checksum"],
-            self.Document.uri: item.get("files")[0]["path"],
+            self.Document.checksum: file["checksum"],
+            self.Document.uri: file["path"],
             self.Document.size: size,
             self.Document.title: item.get("title"),
+            self.Document.etag: item.get("etag"),
             self.Document.created_at: item.get("last_updated"),
             self.Document.last_modified: item.get("last_updated")
         }).on_conflict(
@@ -284,13 +484,15 @@ class PsqlExportPipeline:
             update={
                 self.Document.file_name: item.get("file_name"),
                 self.Document.content_type: item.get("content_type"),
-                self.Document.checksum: item.get("files")[0]["checksum"],
-                self.Document.uri: item.get("files")[0]["path"],
+                self.Document.checksum: file["checksum"],
+                self.Document.uri: file["path"],
                 self.Document.size: size,
                 self.Document.title: item.get("title"),
+                self.Document.etag: item.get("etag"),
                 self.Document.last_modified: item.get("last_updated")
             }
         ).execute()
+        self.record_change("document", item.get("id"))
         spider.crawler.stats.inc_value("db.documents_upserted", spider=spider)
 
     def process_organization(self, item, spider):
@@ -0,0 +1,70 @@
+# Crawl profiles for the sessionnet spider.
+#
+# A profile is a set of scrapy settings selected with `-s CRAWL_PROFILE=<name>`.
+# Settings passed explicitly on the command line still take precedence over the
+# values of the selected profile.
+#
+# HTML pages are fetched through the default slot of the SessionNet host, file
+# HEAD and download requests through a separate FILES_DOWNLOAD_SLOT, so that large
+# file transfers cannot starve the page crawl (and vice versa).
+#
+# AutoThrottle sends a request every `latency / AUTOTHROTTLE_TARGET_CONCURRENCY`
+# seconds per slot. AUTOTHROTTLE_MAX_DELAY and DOWNLOAD_TIMEOUT bound the latency
+# budget of a single request if the upstream server becomes slow.
+
+SESSIONNET_HOST = "sessionnet.owl-it.de"
+FILES_DOWNLOAD_SLOT = "sessionnet-files"
+
+CRAWL_PROFILES = {
+    # frequent sync of a few months around today
+    "incremental": {
+        "CONCURRENT_REQUESTS": 8,
+        "AUTOTHROTTLE_ENABLED": True,
+        "AUTOTHROTTLE_START_DELAY": 0.5,
+        "AUTOTHROTTLE_MAX_DELAY": 10,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 2.0,
+        "DOWNLOAD_TIMEOUT": 60,
+        "DOWNLOAD_SLOTS": {
+            SESSIONNET_HOST: {"concurrency": 4, "delay": 0.25},
+            FILES_DOWNLOAD_SLOT: {"concurrency": 2, "delay": 0.5},
+        },
+        # stop before the next incremental run is started by cron
+        "CLOSESPIDER_TIMEOUT": 2 * 60 * 60 + 45 * 60,
+    },
+    # nightly full sync / backfill of the whole archive
+    "full": {
+        "CONCURRENT_REQUESTS": 16,
+        "AUTOTHROTTLE_ENABLED": True,
+        "AUTOTHROTTLE_START_DELAY": 1.0,
+        "AUTOTHROTTLE_MAX_DELAY": 30,
+        "AUTOTHROTTLE_TARGET_CONCURRENCY": 4.0,
+        "DOWNLOAD_TIMEOUT": 180,
+        "DOWNLOAD_SLOTS": {
+            SESSIONNET_HOST: {"concurrency": 8, "delay": 0.1},
+            FILES_DOWNLOAD_SLOT: {"concurrency": 4, "delay": 0.25},
+        },
+    },
+}
+
+# request priorities (higher is scheduled first)
+PRIORITY_MEETING = 20
+PRIORITY_DETAILS = 10  # agenda items and consultations
+PRIORITY_FILE = 0
+
+
+def apply_crawl_profile(settings):
+    profile = settings.get("CRAWL_PROFILE")
+    if profile not in CRAWL_PROFILES:
+        raise ValueError(f"Unknown CRAWL_PROFILE {profile}. Valid profiles: {', '.join(CRAWL_PROFILES)}")
+    profile_settings = dict(CRAWL_PROFILES[profile])
+
+    # in a sharded crawl, the slot limits are split across the shards so that
+    # the load on the upstream server stays the same
+    shard_count = settings.getint("SHARD_COUNT")
+    if shard_count > 1:
+        profile_settings["DOWNLOAD_SLOTS"] = {
+            slot: dict(slot_settings, concurrency=max(1, slot_settings["concurrency"] // shard_count))
+            for slot, slot_settings in profile_settings["DOWNLOAD_SLOTS"].items()
+        }
+
+    settings.setdict(profile_settings, priority="spider")
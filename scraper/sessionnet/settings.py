@@ -21,16 +21,9 @@ USER_AGENT = "griesheim-transparent/scrapy (+https://griesheim-transparent.de)"
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = False
 
-# Configure maximum concurrent requests performed by Scrapy (default: 16)
-#CONCURRENT_REQUESTS = 32
-
-# Configure a delay for requests for the same website (default: 0)
-# See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
-# See also autothrottle settings and docs
-#DOWNLOAD_DELAY = 3
-# The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
-#CONCURRENT_REQUESTS_PER_IP = 16
+# Concurrency, download slots and AutoThrottle are configured by crawl profiles,
+# see sessionnet/profiles.py. Select a profile with -s CRAWL_PROFILE=<name>.
+CRAWL_PROFILE = "incremental"
 
 # Disable cookies (enabled by default)
 #COOKIES_ENABLED = False
@@ -57,16 +50,8 @@ FILES_STORE = os.path.join(os.getcwd(), "filestore")
 FILES_EXPIRES = 90
 MYFILESPIELINE_FILES_EXPIRES = FILES_EXPIRES
 
-# Enable and configure the AutoThrottle extension (disabled by default)
+# AutoThrottle is enabled by the crawl profiles (sessionnet/profiles.py)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
-#AUTOTHROTTLE_ENABLED = True
-# The initial download delay
-#AUTOTHROTTLE_START_DELAY = 5
-# The maximum download delay to be set in case of high latencies
-#AUTOTHROTTLE_MAX_DELAY = 60
-# The average number of requests Scrapy should be sending in parallel to
-# each remote server
-#AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 # Enable showing throttling stats for every response received:
 #AUTOTHROTTLE_DEBUG = False
 
@@ -90,6 +75,15 @@ SCRAPE_MEETINGS = True
 SCRAPE_START = "01/2011"
 SCRAPE_END = month_from_now(3)
 
+# Sharded backfill: the calendar months are split across SHARD_COUNT spider
+# processes. Each shard stores its collected relations in SHARD_RELATIONS_DIR,
+# `scrapy merge_relations` finalizes them once all shards are done (see backfill.sh).
+SHARD_INDEX = 0
+SHARD_COUNT = 1
+SHARD_RELATIONS_DIR = os.path.join(os.getcwd(), "shards")
+
+COMMANDS_MODULE = "sessionnet.commands"
+
 DB_HOST = environ.get("DB_HOST", default="localhost")
 DB_PORT = int(environ.get("DB_PORT", default="5432"))
 DB_NAME = environ.get("DB_NAME", default="")
@@ -4,6 +4,7 @@ from collections import namedtuple
 
 import pytz as pytz
 import scrapy
+from lxml import etree
 
 from sessionnet.items import MeetingItem, DocumentItem, AgendaItem, ConsultationItem, OrganizationItem
 from sessionnet.utils import add_url_parameters, get_url_params, clean_text, remove_url_parameters
@@ -11,9 +12,21 @@ from sessionnet.url_suffices import meeting_url_to_suffix, meeting_document_link
     consultation_url_link_suffix, meeting_url_top_suffix, meeting_url_attendence_suffix, \
     organizations_details_url_suffix
 from sessionnet.urls import get_meeting_url
+from sessionnet.profiles import apply_crawl_profile, FILES_DOWNLOAD_SLOT, PRIORITY_MEETING, PRIORITY_DETAILS, \
+    PRIORITY_FILE
 
 Link = namedtuple("Link", "link text")
 
+# compiled selectors, evaluated directly on the lxml tree of the response
+INFO_TABLE_CELLS = etree.XPath("//div[contains(@class, 'smc-table-cell') and not(contains(@class, 'smc-cell-head'))]")
+ANCHORS = etree.XPath("//a[@href]")
+TEXT = etree.XPath("text()")
+DESCENDANT_TEXT = etree.XPath(".//text()")
+
+MEETING_LINK_SUFFICES = (meeting_url_to_suffix, meeting_url_top_suffix, meeting_url_attendence_suffix)
+LINK_SUFFICES = (meeting_document_link_suffix, agenda_url_link_suffix, consultation_url_link_suffix) + \
+    MEETING_LINK_SUFFICES
+
 class SessionNetSpider(scrapy.Spider):
     name = "sessionnet"
 
@@ -21,8 +34,17 @@ class SessionNetSpider(scrapy.Spider):
     persons_base_url = "https://sessionnet.owl-it.de/griesheim/bi/kp0041.asp?__cwpall=1&"
     calendar_base_url = "https://sessionnet.owl-it.de/griesheim/bi/si0040.asp"
 
+    @classmethod
+    def update_settings(cls, settings):
+        super().update_settings(settings)
+        apply_crawl_profile(settings)
+
     def start_requests(self):
-        if self.settings.get("SCRAPE_ORGANIZATIONS"):
+        shard_index = self.settings.getint("SHARD_INDEX")
+        shard_count = self.settings.getint("SHARD_COUNT")
+
+        # organizations are seeded by the first shard only
+        if self.settings.get("SCRAPE_ORGANIZATIONS") and shard_index == 0:
             self.logger.info("Seeding organizations")
             yield scrapy.Request(url=self.organizations_base_url, callback=self.parse)
             self.logger.info("Seeding Persons")
@@ -32,8 +54,11 @@ class SessionNetSpider(scrapy.Spider):
             start_month, start_year = self.settings.get("SCRAPE_START").split("/")
             end_month, end_year = self.settings.get("SCRAPE_END").split("/")
             self.logger.info(f"Seeding calendar months from {start_month}/{start_year} to {end_month}/{end_year}")
+            if shard_count > 1:
+                self.logger.info(f"Crawling shard {shard_index + 1} of {shard_count}")
             years = range(int(start_year), int(end_year)+1)
             months = range(1, 13)
+            month_index = 0
             for year in years:
                 params = {'__cjahr': year}
                 for month in months:
@@ -41,6 +66,11 @@ class SessionNetSpider(scrapy.Spider):
                         continue
                     if year == int(end_year) and month > int(end_month):
                         continue
+                    # months are distributed round-robin, so that the busier
+                    # recent years are spread evenly across the shards
+                    month_index += 1
+                    if (month_index - 1) % shard_count != shard_index:
+                        continue
                     params["__cmonat"] = month
                     url = add_url_parameters(self.calendar_base_url, params)
                     yield scrapy.Request(url=url, callback=self.parse)
@@ -139,26 +169,53 @@ class SessionNetSpider(scrapy.Spider):
         self.logger.info(f"Seeding from calendar {params['__cmonat']}/{params['__cjahr']}")
         yield from self.scrape_dom_for_meetings(response)
 
-    def get_links(self, response, *links):
-        found_links = []
-        for link in links:
-            found_links += response.selector.xpath(f"//a[contains(@href, '{link}')]")
-        found_links = [Link(link.xpath("@href").get(), link.xpath("text()").get()) for link in found_links]
-        found_links = [link for link in found_links if link.text is not None]
-        return list(set(found_links))
-
-    def get_file_links(self, response):
-        file_links = self.get_links(response, meeting_document_link_suffix)
-        follows = [response.follow(file_link.link, callback=self.parse_file, method="HEAD", meta={"title": file_link.text}) for file_link in file_links]
+    def get_links(self, response):
+        # collects all anchors in a single pass and classifies them by url suffix
+        found_links = {suffix: {} for suffix in LINK_SUFFICES}
+        for anchor in ANCHORS(response.selector.root):
+            href = anchor.get("href")
+            suffices = [suffix for suffix in LINK_SUFFICES if suffix in href]
+            if not suffices:
+                continue
+            text = TEXT(anchor)
+            if not text:
+                continue
+            link = Link(href, str(text[0]))
+            for suffix in suffices:
+                found_links[suffix][link] = None
+        return {suffix: list(links) for suffix, links in found_links.items()}
+
+    def get_info_table(self, response, *classes):
+        # first text of the info table cells with the given classes, in a single pass over the cells
+        info = {}
+        for cell in INFO_TABLE_CELLS(response.selector.root):
+            cell_class = cell.get("class")
+            keys = [key for key in classes if key not in info and key in cell_class]
+            if not keys:
+                continue
+            text = DESCENDANT_TEXT(cell)
+            if not text:
+                continue
+            for key in keys:
+                info[key] = str(text[0])
+        return info
+
+    def get_file_links(self, response, links):
+        file_links = links[meeting_document_link_suffix]
+        follows = [response.follow(file_link.link, callback=self.parse_file, method="HEAD", priority=PRIORITY_FILE,
+                                   meta={"title": file_link.text, "download_slot": FILES_DOWNLOAD_SLOT}) for file_link in file_links]
         ids = [get_url_params(file_link.link)["id"] for file_link in file_links]
         return ids, follows
 
-    def scrape_dom_for_meetings(self, response):
-        meeting_links = [link.link for link in self.get_links(response, meeting_url_to_suffix, meeting_url_to_suffix, meeting_url_top_suffix, meeting_url_attendence_suffix)]
+    def scrape_dom_for_meetings(self, response, links=None):
+        if links is None:
+            links = self.get_links(response)
+        meeting_links = dict.fromkeys(link for suffix in MEETING_LINK_SUFFICES for link in links[suffix])
+        meeting_links = [link.link for link in meeting_links]
 
         for link in meeting_links:
             meeting_id = get_url_params(link)["__ksinr"]
-            yield response.follow(get_meeting_url(meeting_id), callback=self.parse_meeting)
+            yield response.follow(get_meeting_url(meeting_id), callback=self.parse_meeting, priority=PRIORITY_MEETING)
 
     def parse_meeting(self, response):
         id = get_url_params(response.url)["__ksinr"]
@@ -170,14 +227,14 @@ class SessionNetSpider(scrapy.Spider):
           self.logger.error(f"Error crawling meeting {id}! Message: {error.strip()}")
           return
 
-        info_table_selector_base = "//div[not(contains(@class, 'smc-cell-head')) and contains(@class, 'smc-table-cell') and contains(@class, '{0}')]//text()"
-        title_short = response.selector.xpath(info_table_selector_base.format("siname")).get()
-        organization = response.selector.xpath(info_table_selector_base.format("sigrname")).get()
+        info = self.get_info_table(response, "siname", "sigrname", "sidat", "yytime")
+        title_short = info.get("siname")
+        organization = info.get("sigrname")
 
-        date = response.selector.xpath(info_table_selector_base.format("sidat")).get()
+        date = info.get("sidat")
         if date:
             date = datetime.strptime(date, "%d.%m.%Y").replace(tzinfo=pytz.timezone("Europe/Berlin"))
-        time = response.selector.xpath(info_table_selector_base.format("yytime")).get()
+        time = info.get("yytime")
         if time:
             # 18:00-18:50 Uhr -> 18:00 18:50 Uhr
             time = re.sub("\\-", " ", time)
@@ -188,24 +245,24 @@ class SessionNetSpider(scrapy.Spider):
         if date and time:
             date = datetime.combine(date.date(), time.time()).astimezone(pytz.utc)
 
-
-        file_ids, file_follows = self.get_file_links(response)
+        links = self.get_links(response)
+        file_ids, file_follows = self.get_file_links(response, links)
         for follow in file_follows:
             yield follow
 
-        agenda_links = [link.link for link in self.get_links(response, agenda_url_link_suffix)]
+        agenda_links = [link.link for link in links[agenda_url_link_suffix]]
         agenda_ids = []
         for agenda_link in agenda_links:
             agenda_id = get_url_params(agenda_link)["__ktonr"]
             agenda_ids.append(agenda_id)
-            yield response.follow(agenda_link, callback=self.parse_agenda)
+            yield response.follow(agenda_link, callback=self.parse_agenda, priority=PRIORITY_DETAILS)
 
-        consultation_links = [link.link for link in self.get_links(response, consultation_url_link_suffix)]
+        consultation_links = [link.link for link in links[consultation_url_link_suffix]]
         consultation_ids = []
         for consultation_link in consultation_links:
             consultation_id = get_url_params(consultation_link)["__kvonr"]
             consultation_ids.append(consultation_id)
-            yield response.follow(consultation_link, callback=self.parse_consultation)
+            yield response.follow(consultation_link, callback=self.parse_consultation, priority=PRIORITY_DETAILS)
 
         yield MeetingItem(
             id=id,
@@ -219,7 +276,8 @@ class SessionNetSpider(scrapy.Spider):
         )
 
     def parse_agenda(self, response, **kwargs):
-        yield from self.scrape_dom_for_meetings(response)
+        links = self.get_links(response)
+        yield from self.scrape_dom_for_meetings(response, links)
 
         id = get_url_params(response.url)["__ktonr"]
 
@@ -230,16 +288,16 @@ class SessionNetSpider(scrapy.Spider):
         text = response.selector.xpath("//div[contains(@class, 'WordSection1')]//p//text()").getall()
         text = clean_text(text)
 
-        file_ids, file_follows = self.get_file_links(response)
+        file_ids, file_follows = self.get_file_links(response, links)
         for follow in file_follows:
             yield follow
 
-        consultation_links = [link.link for link in self.get_links(response, consultation_url_link_suffix)]
+        consultation_links = [link.link for link in links[consultation_url_link_suffix]]
         consultation_ids = []
         for consultation_link in consultation_links:
             consultation_id = get_url_params(consultation_link)["__kvonr"]
             consultation_ids.append(consultation_id)
-            yield response.follow(consultation_link, callback=self.parse_consultation)
+            yield response.follow(consultation_link, callback=self.parse_consultation, priority=PRIORITY_DETAILS)
 
         yield AgendaItem(
             id=id,
@@ -257,14 +315,15 @@ class SessionNetSpider(scrapy.Spider):
 
         topic = response.selector.xpath("//h1//text()").get()
 
-        info_table_selector_base = "//div[not(contains(@class, 'smc-cell-head')) and contains(@class, '{0}') and contains(@class, 'smc-table-cell')]//text()"
-        name = response.selector.xpath(info_table_selector_base.format("voname")).get()
-        consultation_type = response.selector.xpath(info_table_selector_base.format("vovaname")).get()
+        info = self.get_info_table(response, "voname", "vovaname")
+        name = info.get("voname")
+        consultation_type = info.get("vovaname")
 
         text = response.selector.xpath("//div[contains(@class, 'WordSection1')]//p//text()").getall()
         text = clean_text(text)
 
-        file_ids, file_follows = self.get_file_links(response)
+        links = self.get_links(response)
+        file_ids, file_follows = self.get_file_links(response, links)
         for follow in file_follows:
             yield follow
 
@@ -284,6 +343,14 @@ class SessionNetSpider(scrapy.Spider):
         content_type = response.headers["Content-Type"].decode("utf-8").split(";")[0]
         file_name = response.headers["Content-Disposition"].decode("utf-8").split('"')[1]
 
+        # HEAD metadata used by the files pipeline to skip unchanged files
+        content_length = response.headers.get("Content-Length")
+        if content_length:
+            content_length = int(content_length)
+        etag = response.headers.get("ETag")
+        if etag:
+            etag = etag.decode("utf-8")
+
         if "title" in response.meta:
             title = response.meta["title"]
         else:
@@ -294,5 +361,7 @@ class SessionNetSpider(scrapy.Spider):
             file_name=file_name,
             content_type=content_type,
             file_urls=[response.url],
-            title=title
+            title=title,
+            content_length=content_length,
+            etag=etag
         )
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+import inspect
+import os
+import tempfile
+import unittest
+
+from scrapy.http import Request, Response
+from scrapy.pipelines.files import FilesPipeline
+from scrapy.utils.reactor import install_reactor
+from scrapy.utils.test import get_crawler
+
+from sessionnet.pipelines import MyFilesPipeline
+
+URL = "https://example.org/getfile.asp?id=123&type=do"
+
+
+def setUpModule():
+    # the reactor of the crawl, required to create a crawler
+    install_reactor("twisted.internet.asyncioreactor.AsyncioSelectorReactor")
+
+
+class MyFilesPipelineTest(unittest.TestCase):
+    """Test cases for the file results of MyFilesPipeline, which works with the
+    synchronous media_downloaded of Scrapy < 2.15 and the coroutine of 2.15"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        crawler = get_crawler(settings_dict={"FILES_STORE": self.tmp.name})
+        self.pipeline = MyFilesPipeline.from_crawler(crawler)
+        self.info = MyFilesPipeline.SpiderInfo(None)
+        self.item = {"id": "123", "file_name": "Antrag.pdf"}
+
+    def media_downloaded(self, response, request):
+        """Calls media_downloaded and awaits the result like the installed Scrapy"""
+        result = self.pipeline.media_downloaded(response, request, self.info, item=self.item)
+        if not inspect.iscoroutinefunction(FilesPipeline.media_downloaded):
+            # Scrapy < 2.15 uses the result as is
+            self.assertIsInstance(result, dict)
+            return result
+        return asyncio.run(result) if inspect.isawaitable(result) else result
+
+    def test_downloaded_file_has_size(self):
+        body = b"%PDF-1.7\n" + b"x" * 100
+        request = Request(URL)
+
+        result = self.media_downloaded(Response(URL, body=body, request=request), request)
+
+        self.assertEqual(result["path"], "123.pdf")
+        self.assertEqual(result["size"], len(body))
+        self.assertEqual(result["checksum"], hashlib.md5(body).hexdigest())
+        with open(os.path.join(self.tmp.name, "123.pdf"), "rb") as f:
+            self.assertEqual(f.read(), body)
+
+    def test_revalidated_file_keeps_known_metadata(self):
+        path = os.path.join(self.tmp.name, "123.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7\n")
+        os.utime(path, (0, 0))
+        request = Request(URL, meta={"known_document": {"checksum": "abc", "size": 9}})
+
+        result = self.media_downloaded(Response(URL, status=304, request=request), request)
+
+        self.assertEqual(result["status"], "revalidated")
+        self.assertEqual((result["checksum"], result["size"]), ("abc", 9))
+        self.assertGreater(os.stat(path).st_mtime, 0)
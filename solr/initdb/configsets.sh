@@ -0,0 +1,5 @@
+#!/bin/bash
+# provide the configset for cores created with the CoreAdmin API (index rebuilds)
+mkdir -p /var/solr/data/configsets
+rm -rf /var/solr/data/configsets/ris
+cp -r /ris_config /var/solr/data/configsets/ris